@@ -1,11 +1,12 @@
 # mcp_filescan_no_db.py — 무DB 스캐너 (PDF/Docx 본문 미리보기/검색 지원)
 # pip install mcp python-dotenv chardet pymupdf python-docx
 
-import os, sys, fnmatch, json, re
+import os, sys, io, codecs, fnmatch, json, re
 import chardet
 from pathlib import Path
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
+import textcache  # 추출 텍스트 디스크 캐시(같은 폴더)
 
 # ===== PDF/Docx 추출기 준비 =====
 try:
@@ -94,13 +95,51 @@ def _iter_files(base: Path, max_items: int = 10000, ext_filter=None, name_glob=N
         except Exception:
             continue
 
+SNIFF_BYTES = 64 * 1024   # 인코딩 판별에 쓰는 앞부분 샘플 크기
+
+def _sniff_encoding(sample: bytes) -> str:
+    """BOM → utf-8 시도(대부분 여기서 끝) → 안 되면 샘플에만 chardet."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"        # 샘플 끝에서 잘린 멀티바이트 문자일 뿐
+    return (chardet.detect(sample).get("encoding") or "utf-8").lower()
+
 def _detect_text_bytes_to_str(data: bytes) -> str:
-    enc = (chardet.detect(data).get("encoding") or "utf-8").lower()
-    return data.decode(enc, errors="ignore")
+    return data.decode(_sniff_encoding(data[:SNIFF_BYTES]), errors="ignore")
+
+class _Limited(io.RawIOBase):
+    """앞에서 n 바이트까지만 읽히는 파일 래퍼(거대한 로그/CSV 보호)."""
+    def __init__(self, f, n: int):
+        self.f, self.left = f, n
+    def readable(self):
+        return True
+    def readinto(self, b):
+        if self.left <= 0:
+            return 0
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)]) or 0
+        self.left -= n
+        return n
+
+def iter_lines_plain(path: Path, max_bytes: int = 1_000_000):
+    """평문 파일을 줄 단위로 흘려 읽기 — 전체를 메모리에 올리지 않고, 멈추면 거기서 읽기도 멈춘다."""
+    with open(path, "rb") as f:
+        enc = _sniff_encoding(f.read(min(SNIFF_BYTES, max_bytes)))
+        f.seek(0)
+        reader = io.TextIOWrapper(io.BufferedReader(_Limited(f, max_bytes)), encoding=enc, errors="ignore")
+        for line in reader:
+            yield line.rstrip("\r\n")
 
 # ===== 본문 추출기 =====
 def extract_text_plain(path: Path, max_bytes: int = 1_000_000) -> str:
-    data = path.read_bytes()[:max_bytes]
+    with open(path, "rb") as f:          # 앞 max_bytes 만 읽음(read_bytes() 는 파일 전체를 읽는다)
+        data = f.read(max_bytes)
     return _detect_text_bytes_to_str(data)
 
 def extract_text_pdf(path: Path, max_pages: int = 10, max_chars: int = 200_000) -> str:
@@ -189,8 +228,8 @@ def head(path: str,
     if err: return json.dumps(err, ensure_ascii=False)
     
     try:
-        text = extract_text_any(p, max_bytes_plain=max_bytes_plain,
-                                pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+        text = textcache.cached_extract(extract_text_any, p, max_bytes_plain=max_bytes_plain,
+                                        pdf_max_pages=pdf_max_pages, max_chars=max_chars)
         lines = text.splitlines()[:max(1, n)]
         return "\n".join(lines) if lines else "(내용 없음)"
     except Exception as e:
@@ -238,12 +277,16 @@ def grep(q: str,
     for info in _iter_files(base, max_items=1_000_000, ext_filter=type_set, name_glob=name_glob or None):
         p = Path(info["path"])
         try:
-            text = extract_text_any(p, max_bytes_plain=max_bytes_plain,
-                                    pdf_max_pages=pdf_max_pages, max_chars=max_chars)
-            # 추출 불가/미지원 메시지인 경우 건너뜀
-            if text.startswith("(") and "미설치" in text or "미지원" in text or "실패" in text:
-                continue
-            for i, line in enumerate(text.splitlines(), 1):
+            if p.suffix.lower().lstrip(".") in PLAIN_TEXT_EXT:
+                lines = iter_lines_plain(p, max_bytes_plain)   # 평문: 줄 단위 스트리밍(limit 에 닿으면 읽기 중단)
+            else:
+                text = textcache.cached_extract(extract_text_any, p, max_bytes_plain=max_bytes_plain,
+                                                pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+                # 추출 불가/미지원 메시지인 경우 건너뜀
+                if text.startswith("(") and "미설치" in text or "미지원" in text or "실패" in text:
+                    continue
+                lines = text.splitlines()
+            for i, line in enumerate(lines, 1):
                 if match_line(line):
                     snippet = line.strip()
                     if len(snippet) > 240:
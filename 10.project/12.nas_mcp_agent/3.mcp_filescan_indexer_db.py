@@ -3,12 +3,18 @@
 # 의존성:
 #   pip install mcp python-dotenv chardet pymupdf python-docx
 # (PDF/Docx 추출 비사용이면 pymupdf/python-docx 생략 가능)
+# (선택) 한국어 형태소 색인 FTS_MORPH=1: pip install konlpy (JDK 필요)
+# (선택) 의미 검색 index_new(embed=True): pip install sentence-transformers
+# (선택) 변경 감시 watch_start(method='events'): pip install watchdog
 
-import os, sys, fnmatch, json, re, mimetypes, sqlite3, time
+import os, sys, io, codecs, fnmatch, json, re, mimetypes, sqlite3, time, queue, threading, importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 import chardet
 from pathlib import Path
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
+import textcache  # 추출 텍스트 디스크 캐시(같은 폴더)
 
 # ===== PDF/Docx 추출기 =====
 try:
@@ -23,6 +29,25 @@ try:
 except Exception:
     DOCX_AVAILABLE = False
 
+# ===== 문장 임베딩(선택) — import 가 무거워(torch) 실제 쓸 때 로드 =====
+EMBED_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+# ===== 파일 변경 감시(선택) — 리눅스 inotify / 윈도 ReadDirectoryChangesW =====
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except Exception:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+# ===== 한국어 형태소(선택) =====
+try:
+    from konlpy.tag import Okt  # pip install konlpy (JDK 필요)
+    KONLPY_AVAILABLE = True
+except Exception:
+    KONLPY_AVAILABLE = False
+
 # ===== 콘솔 인코딩 =====
 sys.stdout.reconfigure(encoding="utf-8")
 sys.stderr.reconfigure(encoding="utf-8")
@@ -33,6 +58,33 @@ load_dotenv()
 
 ROOT = Path(os.getenv("SCAN_ROOT", r"Z:\\")).resolve()  # 기본 Z:\  (역슬래시는 2개)
 INDEX_DB = Path(os.getenv("INDEX_DB", "nas_index.db")).resolve()  # DB 경로(기본: 현재 폴더)
+# 본문 추출 프로세스 수 / 추출·쓰기 대기열 깊이 (index_new 인자로도 지정 가능)
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+INDEX_QUEUE = int(os.getenv("INDEX_QUEUE", "256"))
+# DB 연결: 읽기 전용 연결 풀 크기 / 연결당 mmap·페이지 캐시(MB)
+INDEX_READERS = int(os.getenv("INDEX_READERS", "4"))
+INDEX_MMAP_MB = int(os.getenv("INDEX_MMAP_MB", "256"))
+INDEX_CACHE_MB = int(os.getenv("INDEX_CACHE_MB", "64"))
+# 디렉터리 탐색 스레드 수(SMB/NFS 는 목록·stat 이 네트워크 왕복이라 동시에 여러 폴더를 읽는 게 이득)
+WALK_THREADS = int(os.getenv("WALK_THREADS", "8"))
+# 들어가지 않을 폴더: 숨김(.xxx) + NAS 시스템 폴더. PRUNE_DIRS="a,b" 로 추가
+PRUNE_DIRS = {"#recycle", "#snapshot", "@eaDir", "@Recycle", "@Recently-Snapshot", ".@__thumb",
+              "$RECYCLE.BIN", "System Volume Information"} | \
+             {d.strip() for d in os.getenv("PRUNE_DIRS", "").split(",") if d.strip()}
+# FTS 토크나이저: 'unicode61'(단어 단위, 접두 검색/자동완성) | 'trigram'(부분 문자열 — 한국어 복합어·조사에 강함)
+# 바꾸면 index_reset 후 재색인해야 적용된다.
+FTS_TOKENIZER = os.getenv("FTS_TOKENIZER", "unicode61").strip().lower()
+# FTS_MORPH=1 이면 Okt 형태소(어간) 열(morph)도 색인 — '보고서를' 과 '보고서' 가 같은 토큰으로 만남
+FTS_MORPH = os.getenv("FTS_MORPH", "0") == "1" and KONLPY_AVAILABLE
+FTS_MORPH_CHARS = int(os.getenv("FTS_MORPH_CHARS", "50000"))   # 형태소 분석할 본문 앞부분 길이
+# bm25 열 가중치: name, path, content, morph
+FTS_WEIGHTS = [float(w) for w in os.getenv("FTS_WEIGHTS", "10,2,1,1").split(",")]
+# 의미(벡터) 색인: index_new(embed=True). CPU 로 도는 다국어 소형 모델 기본
+EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBED_CHUNK = int(os.getenv("EMBED_CHUNK", "800"))          # 청크 글자 수
+EMBED_OVERLAP = int(os.getenv("EMBED_OVERLAP", "100"))
+EMBED_MAX_CHUNKS = int(os.getenv("EMBED_MAX_CHUNKS", "64"))  # 파일당 최대 청크 수
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "64"))
 mcp = FastMCP("NAS-NoDB-Scanner+Index")
 
 ALLOWED_EXT = {
@@ -70,39 +122,184 @@ def _ensure_within_root(p: Path):
         }
     return None
 
+def _meta_of(path: str, name: str, st) -> dict:
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    return {
+        "path": path,
+        "name": name,
+        "ext": ext,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "mime": mimetypes.guess_type(path)[0] or "application/octet-stream",
+    }
+
+def _metas_of(paths):
+    """경로 목록 → 지금 존재하는 일반 파일의 meta."""
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        if os.path.isfile(p):
+            yield _meta_of(p, os.path.basename(p), st)
+
+def _pruned(name: str) -> bool:
+    return name.startswith(".") or name in PRUNE_DIRS
+
+def _list_dir(d: str, ext_filter=None, name_glob=None):
+    """폴더 하나 읽기: (조건에 맞는 파일 meta 목록, 하위 폴더 경로 목록).
+    DirEntry 의 타입 정보를 그대로 쓰고, stat 은 필터를 통과한 파일에만 한 번."""
+    files, subdirs = [], []
+    try:
+        with os.scandir(d) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        if not _pruned(e.name):
+                            subdirs.append(e.path)
+                        continue
+                    if not e.is_file():
+                        continue
+                    ext = os.path.splitext(e.name)[1].lower().lstrip(".")
+                    if ext_filter and ext not in ext_filter:
+                        continue
+                    if name_glob and not fnmatch.fnmatch(e.name, name_glob):
+                        continue
+                    files.append(_meta_of(e.path, e.name, e.stat()))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
 def _iter_files(base: Path, max_items: int = 10000, ext_filter=None, name_glob=None):
+    """
+    base 아래 파일 meta 를 yield. os.scandir 기반 + 형제 폴더들을 스레드 풀(WALK_THREADS)로 동시에 읽음.
+    순서는 보장하지 않음(결정적 순서가 필요하면 _walk_sorted — 같은 스레드 풀 방식, 순서만 고정). 숨김/NAS 시스템 폴더는 건너뜀(PRUNE_DIRS).
+    """
     n = 0
-    for p in base.rglob("*"):
+    pool = ThreadPoolExecutor(max_workers=max(1, WALK_THREADS), thread_name_prefix="walk")
+    try:
+        pending = {pool.submit(_list_dir, str(base), ext_filter, name_glob)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                files, subdirs = fut.result()
+                for d in subdirs:
+                    pending.add(pool.submit(_list_dir, d, ext_filter, name_glob))
+                for meta in files:
+                    yield meta
+                    n += 1
+                    if n >= max_items:
+                        return
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _list_sorted(d: str, ext_filter=None) -> list:
+    """폴더 하나를 이름순으로: [(name, path, meta)] — 하위 폴더는 meta=None. stat 은 필터 통과 파일만."""
+    out = []
+    try:
+        with os.scandir(d) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return out
+    for e in entries:
         try:
-            if not p.is_file():
-                continue
-            ext = p.suffix.lower().lstrip(".")
-            if ext_filter and ext not in ext_filter:
-                continue
-            if name_glob and not fnmatch.fnmatch(p.name, name_glob):
-                continue
-            st = p.stat()
-            yield {
-                "path": str(p),
-                "name": p.name,
-                "ext": ext,
-                "size": st.st_size,
-                "mtime": st.st_mtime,
-                "mime": mimetypes.guess_type(str(p))[0] or "application/octet-stream",
-            }
-            n += 1
-            if n >= max_items:
-                break
-        except Exception:
+            if e.is_dir(follow_symlinks=False):
+                if not _pruned(e.name):
+                    out.append((e.name, e.path, None))
+            elif e.is_file():
+                ext = os.path.splitext(e.name)[1].lower().lstrip(".")
+                if ext_filter and ext not in ext_filter:
+                    continue
+                out.append((e.name, e.path, _meta_of(e.path, e.name, e.stat())))
+        except OSError:
             continue
+    return out
+
+def _walk_sorted(base: Path, ext_filter=None, after: tuple | None = None):
+    """
+    base 아래 파일을 '상대경로 parts 사전순'으로 DFS (체크포인트 재개용 결정적 순서).
+    after(parts) 이하 경로는 건너뜀 — 통째로 앞선 디렉터리는 들어가지도 않음(가지치기).
+    폴더 읽기(scandir+stat)는 스레드 풀(WALK_THREADS)이 '다음에 들어갈 형제 폴더' 몇 개를 미리 읽어 두고,
+    순서는 DFS 가 결과를 꺼내는 쪽에서 지킨다 → 병렬로 읽어도 yield 순서와 재개 키는 그대로.
+    yield: (meta, parts)
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, WALK_THREADS), thread_name_prefix="walk")
+    ahead = max(1, WALK_THREADS) * 2                   # 폴더마다 미리 읽어 둘 하위 폴더 수(메모리 상한)
+
+    def rec(fut, prefix: tuple):
+        entries = fut.result()
+        dirs = [(prefix + (name,), path) for name, path, meta in entries if meta is None]
+        dirs = [(parts, path) for parts, path in dirs if after is None or parts >= after[:len(parts)]]
+        futs = {}
+        def prefetch(i):
+            if i < len(dirs) and i not in futs:
+                futs[i] = pool.submit(_list_sorted, dirs[i][1], ext_filter)
+        for i in range(ahead):
+            prefetch(i)
+        di = 0
+        for name, path, meta in entries:
+            parts = prefix + (name,)
+            if meta is None:
+                if di < len(dirs) and dirs[di][0] == parts:
+                    prefetch(di + ahead)
+                    sub = futs.pop(di)
+                    di += 1
+                    yield from rec(sub, parts)
+            elif after is None or parts > after:
+                yield meta, parts
+
+    try:
+        yield from rec(pool.submit(_list_sorted, str(base), ext_filter), ())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+SNIFF_BYTES = 64 * 1024   # 인코딩 판별에 쓰는 앞부분 샘플 크기
+
+def _sniff_encoding(sample: bytes) -> str:
+    """BOM → utf-8 시도(대부분 여기서 끝) → 안 되면 샘플에만 chardet."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"        # 샘플 끝에서 잘린 멀티바이트 문자일 뿐
+    return (chardet.detect(sample).get("encoding") or "utf-8").lower()
 
 def _detect_text_bytes_to_str(data: bytes) -> str:
-    enc = (chardet.detect(data).get("encoding") or "utf-8").lower()
-    return data.decode(enc, errors="ignore")
+    return data.decode(_sniff_encoding(data[:SNIFF_BYTES]), errors="ignore")
+
+class _Limited(io.RawIOBase):
+    """앞에서 n 바이트까지만 읽히는 파일 래퍼(거대한 로그/CSV 보호)."""
+    def __init__(self, f, n: int):
+        self.f, self.left = f, n
+    def readable(self):
+        return True
+    def readinto(self, b):
+        if self.left <= 0:
+            return 0
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)]) or 0
+        self.left -= n
+        return n
+
+def iter_lines_plain(path: Path, max_bytes: int = 1_000_000):
+    """평문 파일을 줄 단위로 흘려 읽기 — 전체를 메모리에 올리지 않고, 멈추면 거기서 읽기도 멈춘다."""
+    with open(path, "rb") as f:
+        enc = _sniff_encoding(f.read(min(SNIFF_BYTES, max_bytes)))
+        f.seek(0)
+        reader = io.TextIOWrapper(io.BufferedReader(_Limited(f, max_bytes)), encoding=enc, errors="ignore")
+        for line in reader:
+            yield line.rstrip("\r\n")
 
 # ===== 본문 추출 =====
 def extract_text_plain(path: Path, max_bytes: int = 1_000_000) -> str:
-    data = path.read_bytes()[:max_bytes]
+    with open(path, "rb") as f:          # 앞 max_bytes 만 읽음(read_bytes() 는 파일 전체를 읽는다)
+        data = f.read(max_bytes)
     return _detect_text_bytes_to_str(data)
 
 def extract_text_pdf(path: Path, max_pages: int = 10, max_chars: int = 200_000) -> str:
@@ -174,13 +371,25 @@ def head(path: str,
     if err: return json.dumps(err, ensure_ascii=False)
     
     try:
-        text = extract_text_any(p, max_bytes_plain=max_bytes_plain,
-                                pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+        text = textcache.cached_extract(extract_text_any, p, max_bytes_plain=max_bytes_plain,
+                                        pdf_max_pages=pdf_max_pages, max_chars=max_chars)
         lines = text.splitlines()[:max(1, n)]
         return "\n".join(lines) if lines else "(내용 없음)"
     except Exception as e:
         return f"(미리보기 실패: {e})"
 
+def _line_matches(path: str, lines, match_line, results: list, limit: int) -> bool:
+    """lines(리스트 또는 줄 스트림)에서 맞는 줄을 results 에 추가. limit 에 닿으면 True(남은 줄은 읽지 않음)."""
+    for i, line in enumerate(lines, 1):
+        if match_line(line):
+            snippet = line.strip()
+            if len(snippet) > 240:
+                snippet = snippet[:240] + "…"
+            results.append({"path": path, "line": i, "snippet": snippet})
+            if len(results) >= limit:
+                return True
+    return False
+
 @mcp.tool()
 def grep(q: str,
          dir: str = "",
@@ -191,7 +400,15 @@ def grep(q: str,
          max_chars: int = 200_000,
          max_bytes_plain: int = 1_000_000,
          regex: bool = False,
-         ignore_case: bool = True) -> str:
+         ignore_case: bool = True,
+         use_index: bool = True) -> str:
+    """
+    본문 줄 단위 검색.
+    use_index=True 이고 dir 아래가 본문 인덱싱(index_new include='light')돼 있으면
+    인덱스가 본문을 가진 파일은 다시 열지 않고 저장된 추출 본문에서 찾는다(FTS/LIKE 로 후보만 추림).
+    인덱스에 없는 파일(다른 형식, 인덱스 이후 추가·수정된 파일, 본문 없이 인덱싱된 파일)은
+    폴더를 훑어 직접 추출한다 → 결과는 use_index=False 와 같고, 인덱스는 건너뛸 파일을 알려 줄 뿐.
+    """
     base = (ROOT / dir)
     err = _ensure_within_root(base)
     if err: return json.dumps(err, ensure_ascii=False)
@@ -209,21 +426,38 @@ def grep(q: str,
             hay = line.casefold() if ignore_case else line
             return needle in hay
 
+    held = {}                                       # 인덱스가 본문을 가진 파일 {path: (size, mtime)}
+    if use_index and INDEX_DB.exists():
+        with _DB.read() as db:
+            if db.has_content(base.resolve()):
+                held = db.content_fingerprints(base.resolve(), type_set)
+                literals = _regex_literals(q) if regex else [q]
+                for path, size, mtime, text in db.grep_candidates(base.resolve(), type_set, literals,
+                                                                  ignore_case, name_glob or None):
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue                        # 인덱스 이후 삭제된 파일
+                    if st.st_size != size or st.st_mtime != mtime:
+                        continue                        # 인덱스 이후 수정 → 아래 탐색에서 재추출
+                    if _line_matches(path, text.splitlines(), match_line, results, limit):
+                        return json.dumps(results, ensure_ascii=False)
+
     for info in _iter_files(base, max_items=1_000_000, ext_filter=type_set, name_glob=name_glob or None):
+        if held.get(info["path"]) == (info["size"], info["mtime"]):
+            continue                                    # 인덱스 본문으로 이미 판정(후보였거나, 후보가 아니면 불일치)
         p = Path(info["path"])
         try:
-            text = extract_text_any(p, max_bytes_plain=max_bytes_plain,
-                                    pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+            if info["ext"] in PLAIN_TEXT_EXT:      # 평문은 통째로 읽지 않고 줄 단위로 흘려 본다
+                if _line_matches(str(p), iter_lines_plain(p, max_bytes_plain), match_line, results, limit):
+                    break
+                continue
+            text = textcache.cached_extract(extract_text_any, p, max_bytes_plain=max_bytes_plain,
+                                            pdf_max_pages=pdf_max_pages, max_chars=max_chars)
             if text.startswith("(") and ("미설치" in text or "미지원" in text or "실패" in text):
                 continue
-            for i, line in enumerate(text.splitlines(), 1):
-                if match_line(line):
-                    snippet = line.strip()
-                    if len(snippet) > 240:
-                        snippet = snippet[:240] + "…"
-                    results.append({"path": str(p), "line": i, "snippet": snippet})
-                    if len(results) >= limit:
-                        return json.dumps(results, ensure_ascii=False)
+            if _line_matches(str(p), text.splitlines(), match_line, results, limit):
+                break
         except Exception:
             continue
     return json.dumps(results, ensure_ascii=False)
@@ -237,6 +471,94 @@ def where_db() -> str:
     return str(INDEX_DB)
 
 # ===== DB(FTS5) — 수동 인덱싱 & 검색 =====
+def _prefix_range(base: Path) -> tuple:
+    """base 아래 경로의 [lo, hi) 문자열 범위 → path UNIQUE 인덱스로 범위 검색."""
+    lo = str(base).rstrip("\\/") + os.sep
+    return lo, lo[:-1] + chr(ord(os.sep) + 1)
+
+def _regex_literals(pat: str) -> list:
+    """
+    정규식이 매치되려면 반드시 들어 있어야 하는 리터럴 조각들(보수적으로).
+    대안(|)이 있으면 빈 목록 → 후보 필터 없이 인덱스 본문 전체를 훑는다.
+    """
+    if "|" in pat:
+        return []
+    lits, cur, depth, i = [], "", 0, 0
+    def cut():
+        nonlocal cur
+        if depth == 0:
+            lits.append(cur)
+        cur = ""
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            nxt = pat[i + 1:i + 2]
+            if nxt and not nxt.isalnum():          # \. \( 같은 이스케이프된 글자는 리터럴
+                cur += nxt
+            else:                                  # \d \w \b … 는 끊김
+                cut()
+            i += 2
+        elif c == "[":
+            cut()
+            j = pat.find("]", i + 2)
+            i = j + 1 if j != -1 else len(pat)
+        elif c in "?*{":                           # 앞 글자는 없어도 됨
+            cur = cur[:-1]
+            cut()
+            j = pat.find("}", i) if c == "{" else i
+            i = (j if j != -1 else len(pat)) + 1
+        elif c == "(":
+            cut()
+            depth += 1                             # 그룹 안은 선택적일 수 있어 건너뜀
+            i += 1
+        elif c == ")":
+            cur = ""
+            depth = max(0, depth - 1)
+            i += 1
+        elif c in ".^$+":
+            cut()
+            i += 1
+        else:
+            cur += c
+            i += 1
+    cut()
+    return [l for l in lits if len(l) >= 2]
+
+def _fts_quote(t: str) -> str:
+    return '"' + t.replace('"', '""') + '"'
+
+def _fts_tokens(literal: str, trigram: bool = False) -> list:
+    """리터럴이 들어 있는 문서라면 반드시 갖는 FTS 토큰들.
+    trigram 이면 리터럴 자체(3글자 이상)가 부분 문자열 검색 토큰.
+    unicode61 이면 맨 앞 토큰은 더 긴 단어의 뒷부분일 수 있어 빼고, 맨 끝 토큰은 접두 검색(*)."""
+    if trigram:
+        return [_fts_quote(literal)] if len(literal) >= 3 else []
+    out = []
+    for m in re.finditer(r"[^\W_]+", literal):
+        if m.start() == 0:
+            continue
+        out.append(f'"{m.group()}"' + ("*" if m.end() == len(literal) else ""))
+    return out
+
+def _like(s: str) -> str:
+    return "%" + s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+_okt = None
+
+def _morphs(text: str) -> str:
+    """Okt 형태소(어간 원형) 를 공백으로 이은 문자열. FTS_MORPH 꺼져 있으면 ''."""
+    global _okt
+    if not FTS_MORPH or not text:
+        return ""
+    if _okt is None:                    # 프로세스마다 하나(JVM 기동이 무거움)
+        _okt = Okt()
+    return " ".join(_okt.morphs(text[:FTS_MORPH_CHARS], stem=True))
+
+def _tokenize_clause(trigram: bool) -> str:
+    if trigram:
+        return "tokenize='trigram'"
+    return "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"   # 2·3글자 접두 인덱스 → 자동완성
+
 SCHEMA = """
 PRAGMA journal_mode=WAL;
 PRAGMA synchronous=NORMAL;
@@ -252,17 +574,60 @@ CREATE TABLE IF NOT EXISTS files(
   indexed_at REAL
 );
 CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
-  name, path, content, content_rowid='id'
+  name, path, content, morph, content_rowid='id', {tokenize}
+);
+-- 의미 검색용 청크 임베딩(index_new embed=True). vec = L2 정규화 float16
+CREATE TABLE IF NOT EXISTS chunks(
+  id INTEGER PRIMARY KEY,
+  file_id INTEGER NOT NULL,
+  seq INTEGER,
+  text TEXT,
+  model TEXT,
+  vec BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks(file_id);
+-- 증분 동기화(mode='sync') 진행 상황. 중단돼도 last_rel 다음부터 재개
+CREATE TABLE IF NOT EXISTS scan_checkpoint(
+  base TEXT PRIMARY KEY,      -- 동기화 대상 디렉터리(절대경로)
+  last_rel TEXT,              -- 마지막으로 커밋된 파일의 base 기준 상대경로 parts(JSON)
+  started_at REAL,
+  updated_at REAL,
+  stats TEXT                  -- 지금까지의 카운터(JSON)
 );
 """
 
 class IndexDB:
-    def __init__(self, db_path: Path):
-        self.conn = sqlite3.connect(str(db_path))
-        self.conn.executescript(SCHEMA)
+    def __init__(self, db_path: Path, readonly: bool = False):
+        # 연결을 재사용하므로 sqlite3 의 연결별 prepared statement 캐시(cached_statements)가 그대로 살아 있다
+        if readonly:
+            self.conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True,
+                                        check_same_thread=False, cached_statements=256)
+            self.conn.execute("PRAGMA query_only=1")
+        else:
+            self.conn = sqlite3.connect(str(db_path), check_same_thread=False, cached_statements=256)
+        self.conn.execute(f"PRAGMA mmap_size={INDEX_MMAP_MB * 1024 * 1024}")
+        self.conn.execute(f"PRAGMA cache_size=-{INDEX_CACHE_MB * 1024}")   # 음수 = KB
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        if readonly:
+            self._inspect()
+        else:
+            self._create()
+
+    def _create(self):
+        try:
+            self.conn.executescript(SCHEMA.format(tokenize=_tokenize_clause(FTS_TOKENIZER == "trigram")))
+        except sqlite3.OperationalError:     # SQLite < 3.34 는 trigram 없음 → unicode61
+            self.conn.executescript(SCHEMA.format(tokenize=_tokenize_clause(False)))
         self.conn.commit()
+        self._inspect()
+
+    def _inspect(self):
+        # 이미 만들어진 files_fts 기준(예전 DB 는 morph 열 없음/다른 토크나이저일 수 있음)
+        self.fts_cols = [r[1] for r in self.conn.execute("PRAGMA table_info(files_fts)")]
+        sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE name='files_fts'").fetchone()[0]
+        self.trigram = "trigram" in sql
 
-    def upsert_meta_and_fts(self, meta: dict, content: str):
+    def upsert_meta_and_fts(self, meta: dict, content: str, morph: str = ""):
         cur = self.conn.cursor()
         cur.execute(
             "INSERT INTO files(path,name,ext,size,mtime,mime,indexed_at) VALUES(?,?,?,?,?,?,?) "
@@ -274,11 +639,116 @@ class IndexDB:
         cur.execute("SELECT id FROM files WHERE path=?", (meta["path"],))
         rowid = cur.fetchone()[0]
         # FTS5는 INSERT OR REPLACE 사용
-        cur.execute(
-            "INSERT OR REPLACE INTO files_fts(rowid,name,path,content) VALUES(?,?,?,?)",
-            (rowid, meta["name"], meta["path"], content or "")
+        if "morph" in self.fts_cols:
+            cur.execute(
+                "INSERT OR REPLACE INTO files_fts(rowid,name,path,content,morph) VALUES(?,?,?,?,?)",
+                (rowid, meta["name"], meta["path"], content or "", morph or "")
+            )
+        else:
+            cur.execute(
+                "INSERT OR REPLACE INTO files_fts(rowid,name,path,content) VALUES(?,?,?,?)",
+                (rowid, meta["name"], meta["path"], content or "")
+            )
+        return rowid
+
+    def replace_chunks(self, file_id: int, chunks: list, vecs, model: str):
+        self.conn.execute("DELETE FROM chunks WHERE file_id=?", (file_id,))
+        self.conn.executemany(
+            "INSERT INTO chunks(file_id,seq,text,model,vec) VALUES(?,?,?,?,?)",
+            [(file_id, i, t, model, v.tobytes()) for i, (t, v) in enumerate(zip(chunks, vecs))])
+
+    def embedded_file_ids(self, model: str) -> set:
+        return {r[0] for r in self.conn.execute("SELECT DISTINCT file_id FROM chunks WHERE model=?", (model,))}
+
+    def load_fingerprints(self, base: Path) -> dict:
+        """base 아래 인덱스된 파일 {path: (id, size, mtime, ext)} 를 쿼리 한 번으로 메모리에 적재."""
+        lo, hi = _prefix_range(base)
+        cur = self.conn.execute("SELECT path, id, size, mtime, ext FROM files WHERE path >= ? AND path < ?", (lo, hi))
+        return {r[0]: (r[1], r[2], r[3], r[4]) for r in cur}
+
+    def fingerprints_of(self, paths: list, chunk: int = 500) -> dict:
+        """지정한 경로들만 {path: (id, size, mtime, ext)} (watch 에서 바뀐 파일만 볼 때)."""
+        out = {}
+        for i in range(0, len(paths), chunk):
+            part = paths[i:i + chunk]
+            cur = self.conn.execute(f"SELECT path, id, size, mtime, ext FROM files WHERE path IN ({','.join('?' * len(part))})", part)
+            out.update({r[0]: (r[1], r[2], r[3], r[4]) for r in cur})
+        return out
+
+    def delete_ids(self, ids: list, chunk: int = 500):
+        for i in range(0, len(ids), chunk):
+            part = ids[i:i + chunk]
+            marks = ",".join("?" * len(part))
+            self.conn.execute(f"DELETE FROM files_fts WHERE rowid IN ({marks})", part)
+            self.conn.execute(f"DELETE FROM chunks WHERE file_id IN ({marks})", part)
+            self.conn.execute(f"DELETE FROM files WHERE id IN ({marks})", part)
+
+    def get_checkpoint(self, base: Path):
+        r = self.conn.execute("SELECT last_rel, started_at, stats FROM scan_checkpoint WHERE base=?",
+                              (str(base),)).fetchone()
+        if not r:
+            return None
+        return {"after": tuple(json.loads(r[0])) if r[0] else None, "started_at": r[1],
+                "stats": json.loads(r[2] or "{}")}
+
+    def save_checkpoint(self, base: Path, last_parts: tuple, started_at: float, stats: dict):
+        self.conn.execute(
+            "INSERT INTO scan_checkpoint(base,last_rel,started_at,updated_at,stats) VALUES(?,?,?,?,?) "
+            "ON CONFLICT(base) DO UPDATE SET last_rel=excluded.last_rel, updated_at=excluded.updated_at, "
+            "stats=excluded.stats",
+            (str(base), json.dumps(list(last_parts), ensure_ascii=False), started_at, time.time(),
+             json.dumps(stats))
         )
 
+    def clear_checkpoint(self, base: Path):
+        self.conn.execute("DELETE FROM scan_checkpoint WHERE base=?", (str(base),))
+
+    def has_content(self, base: Path) -> bool:
+        """base 아래 본문까지 인덱싱된 파일이 하나라도 있는지."""
+        lo, hi = _prefix_range(base)
+        return self.conn.execute(
+            "SELECT 1 FROM files f JOIN files_fts ft ON ft.rowid = f.id "
+            "WHERE f.path >= ? AND f.path < ? AND ft.content != '' LIMIT 1", (lo, hi)).fetchone() is not None
+
+    def content_fingerprints(self, base: Path, type_set) -> dict:
+        """base 아래 본문까지 인덱싱된 파일 {path: (size, mtime)} — grep 이 다시 열지 않아도 되는 파일."""
+        lo, hi = _prefix_range(base)
+        where, params = ["f.path >= ?", "f.path < ?", "ft.content != ''"], [lo, hi]
+        if type_set:
+            where.append(f"f.ext IN ({','.join('?' * len(type_set))})")
+            params += list(type_set)
+        cur = self.conn.execute("SELECT f.path, f.size, f.mtime FROM files f "
+                                f"JOIN files_fts ft ON ft.rowid = f.id WHERE {' AND '.join(where)}", params)
+        return {r[0]: (r[1], r[2]) for r in cur}
+
+    def grep_candidates(self, base: Path, type_set, literals: list, ignore_case: bool, name_glob=None):
+        """
+        literals 를 모두 포함하는 문서만 (path, size, mtime, 저장된 본문) 으로.
+        FTS MATCH(확실한 토큰) → LIKE(부분 문자열) 순으로 좁힌다. 최종 판정은 호출 쪽(줄 단위).
+        """
+        lo, hi = _prefix_range(base)
+        where, params = ["f.path >= ?", "f.path < ?", "ft.content != ''"], [lo, hi]
+        if type_set:
+            where.append(f"f.ext IN ({','.join('?' * len(type_set))})")
+            params += list(type_set)
+        toks = []
+        for lit in literals:
+            if ignore_case and any(ord(ch) > 127 and ch.lower() != ch.upper() for ch in lit):
+                continue                       # LIKE 는 ASCII 만 대소문자 무시 → 이런 조각은 필터에 안 씀
+            toks += _fts_tokens(lit, self.trigram)
+            where.append("ft.content LIKE ? ESCAPE '\\'")
+            params.append(_like(lit))
+        if toks:
+            where.append("ft.files_fts MATCH ?")
+            params.append(f"content : ({' AND '.join(toks)})")
+        cur = self.conn.execute(
+            "SELECT f.path, f.size, f.mtime, f.name, ft.content FROM files f "
+            f"JOIN files_fts ft ON ft.rowid = f.id WHERE {' AND '.join(where)} ORDER BY f.path", params)
+        for path, size, mtime, name, content in cur:
+            if name_glob and not fnmatch.fnmatch(name, name_glob):
+                continue
+            yield path, size, mtime, content
+
     def exists_by_path(self, path: str) -> bool:
         cur = self.conn.cursor()
         cur.execute("SELECT 1 FROM files WHERE path=? LIMIT 1", (path,))
@@ -290,26 +760,382 @@ class IndexDB:
         c, s = cur.fetchone()
         cur.execute("SELECT ext, COUNT(*) FROM files GROUP BY ext ORDER BY COUNT(*) DESC")
         by_ext = cur.fetchall()
-        return {"count": c or 0, "total_bytes": s or 0, "by_ext": by_ext}
+        fts = {"tokenizer": "trigram" if self.trigram else "unicode61", "morph": "morph" in self.fts_cols}
+        if fts["tokenizer"] != FTS_TOKENIZER or (FTS_MORPH and not fts["morph"]):
+            fts["hint"] = "환경설정(FTS_TOKENIZER/FTS_MORPH)과 현재 인덱스가 다릅니다 — index_reset 후 재색인하면 적용"
+        n_chunks, n_vfiles = cur.execute("SELECT COUNT(*), COUNT(DISTINCT file_id) FROM chunks").fetchone()
+        return {"count": c or 0, "total_bytes": s or 0, "by_ext": by_ext, "fts": fts,
+                "vectors": {"chunks": n_chunks, "files": n_vfiles, "model": EMBED_MODEL}}
 
     def reset(self):
         cur = self.conn.cursor()
-        cur.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS files_fts;")
-        self.conn.executescript(SCHEMA)
-        self.conn.commit()
+        cur.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS files_fts; "
+                          "DROP TABLE IF EXISTS scan_checkpoint; DROP TABLE IF EXISTS chunks;")
+        self._create()
+
+class _Connections:
+    """
+    프로세스 전체가 공유하는 IndexDB 연결.
+    - 쓰기: 연결 1개를 잠금으로 직렬화(인덱싱 writer 스레드, index_reset)
+    - 읽기: query_only 연결 풀. 빌릴 때 읽기 트랜잭션을 열어 그 호출 동안 같은 스냅샷을 본다.
+            WAL 이라 인덱싱이 쓰는 중에도 검색이 막히지 않는다.
+    매 호출마다 연결을 새로 열고 SCHEMA 를 다시 돌리던 것을 없앰(스키마는 쓰기 연결이 처음 한 번).
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._writer = None
+        self._wlock = threading.RLock()
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._gen = 0                     # index_reset 마다 증가 → 예전 읽기 연결은 반납 때 닫음
+
+    @contextmanager
+    def write(self):
+        with self._wlock:
+            if self._writer is None:
+                self._writer = IndexDB(self.path)
+            yield self._writer
+
+    @contextmanager
+    def read(self):
+        if self._writer is None:
+            with self.write():            # DB/스키마가 없으면 먼저 만든다
+                pass
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            db = IndexDB(self.path, readonly=True)
+        gen = self._gen
+        db.conn.execute("BEGIN")
+        try:
+            yield db
+        finally:
+            db.conn.rollback()
+            if gen == self._gen and self._idle.qsize() < INDEX_READERS:
+                self._idle.put(db)
+            else:
+                db.conn.close()
+
+    def refresh_readers(self):
+        """스키마가 바뀐 뒤(index_reset) 읽기 연결을 새로 열게 한다."""
+        self._gen += 1
+        while True:
+            try:
+                self._idle.get_nowait().conn.close()
+            except queue.Empty:
+                break
+
+_DB = _Connections(INDEX_DB)
 
 @mcp.tool()
 def index_reset() -> str:
     """인덱스 DB를 초기화합니다."""
-    db = IndexDB(INDEX_DB)
-    db.reset()
+    if not _RUN_LOCK.acquire(blocking=False):
+        return json.dumps({"error": "인덱싱/감시 반영 중에는 초기화할 수 없습니다."}, ensure_ascii=False)
+    try:
+        with _DB.write() as db:
+            db.reset()
+        _DB.refresh_readers()
+    finally:
+        _RUN_LOCK.release()
     return "OK"
 
 @mcp.tool()
 def index_stat() -> str:
     """인덱스 통계를 확인합니다."""
-    db = IndexDB(INDEX_DB)
-    return json.dumps(db.stat(), ensure_ascii=False)
+    with _DB.read() as db:
+        return json.dumps({**db.stat(), "text_cache": textcache.stat()}, ensure_ascii=False)
+
+class _ExtractError(Exception):
+    """본문 추출 실패 — 이 파일은 이번에 DB 에 쓰지 않는다(기존 행/지문 유지 → 다음 동기화 때 재시도)."""
+
+def _extract_for_index(meta: dict, include: str, pdf_max_pages: int, max_chars: int, max_bytes_plain: int) -> str:
+    if include.lower() != "light":
+        return ""
+    text = textcache.cached_extract(extract_text_any, Path(meta["path"]), max_bytes_plain=max_bytes_plain,
+                                    pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+    if text.startswith("(") and "실패" in text:
+        raise _ExtractError(text)
+    # 미설치/미지원 형식은 비우고 넘어감(이름/경로만 인덱스)
+    if text.startswith("(") and ("미설치" in text or "미지원" in text):
+        return ""
+    return text
+
+def _index_payload(meta: dict, include: str, pdf_max_pages: int, max_chars: int, max_bytes_plain: int) -> tuple:
+    """추출 프로세스에서 하는 일: (본문, 형태소열). 형태소 분석도 무거워서 워커에서 같이 한다."""
+    text = _extract_for_index(meta, include, pdf_max_pages, max_chars, max_bytes_plain)
+    return text, _morphs(f"{Path(meta['name']).stem}\n{text}")
+
+# ===== 의미(벡터) 색인 — 청크 임베딩은 chunks 테이블(float16), 검색 때 행렬로 올려 내적 =====
+_embed_model = None
+_VEC: dict = {}                 # 검색용 행렬 캐시 {"key", "ids", "file_ids", "exts", "mat"}
+_VEC_LOCK = threading.Lock()
+
+def _embedder():
+    global _embed_model
+    if _embed_model is None:
+        from sentence_transformers import SentenceTransformer
+        _embed_model = SentenceTransformer(EMBED_MODEL, device="cpu")
+    return _embed_model
+
+def _encode(texts: list):
+    """→ (n, dim) float16, L2 정규화(내적 = 코사인)."""
+    import numpy as np
+    v = _embedder().encode(texts, batch_size=EMBED_BATCH, normalize_embeddings=True, convert_to_numpy=True)
+    return np.asarray(v, dtype=np.float16)
+
+def _chunk_text(text: str) -> list:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    step = max(1, EMBED_CHUNK - EMBED_OVERLAP)
+    return [text[i:i + EMBED_CHUNK] for i in range(0, len(text), step)][:EMBED_MAX_CHUNKS]
+
+def _vec_matrix(db: "IndexDB") -> dict:
+    """chunks 전체를 행렬로(모델 기준). 청크 수/최대 id 가 그대로면 캐시 재사용."""
+    import numpy as np
+    key = db.conn.execute("SELECT COUNT(*), IFNULL(MAX(id),0) FROM chunks WHERE model=?", (EMBED_MODEL,)).fetchone()
+    with _VEC_LOCK:
+        if _VEC.get("key") == key:
+            return _VEC
+        rows = db.conn.execute(
+            "SELECT c.id, c.file_id, f.ext, c.vec FROM chunks c JOIN files f ON f.id = c.file_id "
+            "WHERE c.model=? ORDER BY c.id", (EMBED_MODEL,)).fetchall()
+        _VEC.clear()
+        _VEC.update({"key": key,
+                     "ids": np.array([r[0] for r in rows], dtype=np.int64),
+                     "file_ids": np.array([r[1] for r in rows], dtype=np.int64),
+                     "exts": np.array([r[2] or "" for r in rows]),
+                     "mat": (np.frombuffer(b"".join(r[3] for r in rows), dtype=np.float16).reshape(len(rows), -1)
+                             if rows else np.zeros((0, 0), dtype=np.float16))})
+        return _VEC
+
+def _vector_hits(db: "IndexDB", q: str, k: int, type_set=None) -> list:
+    """질의와 가까운 파일 top-k (파일 점수 = 가장 가까운 청크 점수)."""
+    import numpy as np
+    v = _vec_matrix(db)
+    if not len(v["ids"]):
+        return []
+    qv = _encode([q])[0].astype(np.float32)
+    mat = v["mat"]
+    scores = np.concatenate([mat[i:i + 65536].astype(np.float32) @ qv for i in range(0, len(mat), 65536)])
+    if type_set:
+        scores[~np.isin(v["exts"], list(type_set))] = -np.inf
+    best: dict = {}
+    for i in np.argsort(-scores)[:k * 8]:           # 파일당 여러 청크가 걸릴 수 있어 넉넉히 본 뒤 파일로 묶음
+        if not np.isfinite(scores[i]):
+            break
+        fid = int(v["file_ids"][i])
+        if fid not in best:
+            best[fid] = (float(scores[i]), int(v["ids"][i]))
+            if len(best) >= k:
+                break
+    out = []
+    for fid, (score, cid) in best.items():
+        r = db.conn.execute("SELECT f.path, f.name, f.ext, f.size, f.mtime, f.mime, c.text FROM files f "
+                            "JOIN chunks c ON c.id=? WHERE f.id=?", (cid, fid)).fetchone()
+        if r:
+            out.append({"path": r[0], "name": r[1], "ext": r[2], "size": r[3], "mtime": r[4], "mime": r[5],
+                        "score": round(score, 4), "snippet": r[6][:240]})
+    return out
+
+# ===== 인덱싱 파이프라인: walker(호출 스레드) → 추출 프로세스 풀 → writer 스레드(단일 SQLite 쓰기) =====
+_PROGRESS: dict = {}            # 현재/마지막 인덱싱 진행 상황 (index_progress 로 조회)
+_RUN_LOCK = threading.Lock()    # 인덱싱은 한 번에 하나만
+
+class _Watermark:
+    """walk 순서(seq)대로 '앞쪽이 모두 끝난' 마지막 항목을 추적 → 체크포인트는 여기까지만 저장."""
+    def __init__(self, start):
+        self.next = 0
+        self.done = set()
+        self.parts = {}
+        self.last = start
+
+    def add(self, seq: int, parts):
+        self.parts[seq] = parts
+
+    def finish(self, seq: int):
+        self.done.add(seq)
+        while self.next in self.done:
+            self.done.discard(self.next)
+            self.last = self.parts.pop(self.next, None) or self.last
+            self.next += 1
+
+def _run_index(base: Path, ext_filter, include: str, limit: int, batch_commit: int,
+               opts: tuple, mode: str, resume: bool, workers: int, queue_depth: int, embed: bool = False,
+               paths: list | None = None, stop: threading.Event | None = None) -> dict:
+    """stop 이 켜지면 탐색을 멈추고 진행 중인 추출은 취소 → 체크포인트까지 저장하고 돌아온다(sync 는 이어하기로)."""
+    sync = mode == "sync"
+    live = paths is not None          # watch: 바뀐 파일 경로만 (없는 경로 = 삭제)
+    embed = embed and include.lower() == "light"
+    with _DB.read() as rdb:
+        known = rdb.fingerprints_of(paths) if live else rdb.load_fingerprints(base)
+        embedded = rdb.embedded_file_ids(EMBED_MODEL) if embed else set()   # 벡터 없는 기존 파일도 다시 처리
+        ck = rdb.get_checkpoint(base) if (sync and resume) else None
+    if ext_filter and not live:       # 이번에 훑지 않는 형식은 비교 대상에서 뺀다(안 보였다고 지우면 안 됨)
+        known = {p: v for p, v in known.items() if v[3] in ext_filter}
+    after = ck["after"] if ck else None
+    started_at = ck["started_at"] if ck else time.time()
+    st = _PROGRESS
+    st.clear()
+    st.update({"status": "running", "base": str(base), "mode": mode, "include": include,
+               "workers": workers if include.lower() == "light" else 0, "queue_depth": queue_depth,
+               "scanned": 0, "added": 0, "updated": 0, "unchanged": 0, "deleted": 0, "errors": 0,
+               "in_flight": 0, "written": 0, "embedded": 0, "started": time.time(), "resumed": ck is not None})
+    if ck:
+        for k in ("scanned", "added", "updated", "unchanged"):
+            st[k] = ck["stats"].get(k, 0)
+
+    q: queue.Queue = queue.Queue()
+    slots = threading.BoundedSemaphore(queue_depth)   # 추출 대기 + 쓰기 대기 합계 상한(메모리 보호)
+    wm = _Watermark(after)
+    counters = lambda: {k: st[k] for k in ("scanned", "added", "updated", "unchanged")}
+
+    def flush_embeds(wdb, todo: list):
+        """[(file_id, chunks)] → 한 번에 임베딩(배치) 후 청크 교체. 실패해도 writer 는 계속 돈다."""
+        texts = [c for _, chunks in todo for c in chunks]
+        try:
+            vecs = _encode(texts) if texts else []
+            i = 0
+            for fid, chunks in todo:
+                wdb.replace_chunks(fid, chunks, vecs[i:i + len(chunks)], EMBED_MODEL)
+                i += len(chunks)
+            st["embedded"] += len(texts)
+        except Exception:
+            st["errors"] += len(todo)
+        todo.clear()
+
+    def writer():
+        with _DB.write() as wdb:
+            write_loop(wdb)
+
+    def write_loop(wdb):
+        pending, last_commit = 0, time.time()
+        todo = []                                      # 임베딩 대기 (file_id, chunks)
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            kind = item[0]
+            if kind == "cancelled":                    # 추출이 취소됨 → 워터마크를 넘기지 않아 이어하기 때 다시
+                slots.release()
+                continue
+            if kind == "delete":
+                wdb.delete_ids(item[1])
+                if sync:
+                    wdb.clear_checkpoint(base)
+                continue
+            _, seq, meta, text, morph = item
+            if meta is not None:
+                try:
+                    rowid = wdb.upsert_meta_and_fts(meta, text, morph)
+                    if embed:
+                        todo.append((rowid, _chunk_text(text)))
+                    st["written"] += 1
+                    pending += 1
+                except Exception:
+                    st["errors"] += 1
+            wm.finish(seq)
+            slots.release()
+            if todo and sum(len(c) for _, c in todo) >= EMBED_BATCH * 4:
+                flush_embeds(wdb, todo)
+            if pending >= batch_commit or (pending and time.time() - last_commit > 5):
+                if todo:                               # 체크포인트 전에 임베딩까지 반영
+                    flush_embeds(wdb, todo)
+                if sync and wm.last is not None:
+                    wdb.save_checkpoint(base, wm.last, started_at, counters())
+                wdb.conn.commit()
+                pending, last_commit = 0, time.time()
+        if todo:
+            flush_embeds(wdb, todo)
+        if sync and st["status"] != "done" and wm.last is not None:
+            wdb.save_checkpoint(base, wm.last, started_at, counters())
+        wdb.conn.commit()
+
+    wt = threading.Thread(target=writer, name="index-writer", daemon=True)
+    wt.start()
+    pool = ProcessPoolExecutor(max_workers=workers) if (include.lower() == "light" and workers > 1) else None
+
+    def failed(seq: int, counter: str):
+        """추출 실패 — 빈 본문으로 덮어쓰지 않는다. 기존 행과 (mtime, size) 지문이 그대로 남으므로
+        다음 동기화에서 '변경됨' 으로 다시 시도된다."""
+        st["errors"] += 1
+        st[counter] -= 1
+        q.put(("skip", seq, None, None, None))
+
+    def submit(seq: int, meta: dict, counter: str):
+        if pool is None:                               # workers<=1 / 본문 미포함 → 호출 스레드에서 바로
+            try:
+                payload = _index_payload(meta, include, *opts)
+            except Exception:
+                failed(seq, counter)
+                return
+            q.put(("upsert", seq, meta, *payload))
+            return
+        st["in_flight"] += 1
+        def done(fut, seq=seq, meta=meta):
+            st["in_flight"] -= 1
+            if fut.cancelled():                        # 중단(pool.shutdown(cancel_futures=True))
+                st[counter] -= 1
+                q.put(("cancelled", seq))
+                return
+            try:
+                text, morph = fut.result()
+            except Exception:
+                failed(seq, counter)
+                return
+            q.put(("upsert", seq, meta, text, morph))
+        pool.submit(_index_payload, meta, include, *opts).add_done_callback(done)
+
+    seen = set()
+    complete = True
+    try:
+        if live:
+            walk = ((m, None) for m in _metas_of(paths))
+        elif sync:
+            walk = _walk_sorted(base, ext_filter=ext_filter, after=after)
+        else:
+            walk = ((m, None) for m in _iter_files(base, max_items=int(limit), ext_filter=ext_filter))
+        for seq, (meta, parts) in enumerate(walk):
+            if (sync and len(seen) >= int(limit)) or (stop is not None and stop.is_set()):
+                complete = False
+                break
+            slots.acquire()
+            wm.add(seq, parts)
+            path = meta["path"]
+            seen.add(path)
+            st["scanned"] += 1
+            old = known.get(path)
+            if old and (not embed or old[0] in embedded) and \
+                    (not (sync or live) or (old[1] == meta["size"] and old[2] == meta["mtime"])):
+                if sync or live:
+                    st["unchanged"] += 1
+                q.put(("skip", seq, None, None, None))     # 이미 있음/변경 없음 → 순서 표시만
+                continue
+            counter = "updated" if old else "added"
+            st[counter] += 1
+            submit(seq, meta, counter)
+        stopped = stop is not None and stop.is_set()
+        if pool is not None:                           # 남은 추출 완료 → 콜백이 모두 writer 로 (중단이면 대기분은 취소)
+            pool.shutdown(wait=True, cancel_futures=stopped)
+        if (sync or live) and complete:
+            rel = lambda p: Path(p).relative_to(base).parts
+            gone = [v[0] for p, v in known.items() if p not in seen and (live or after is None or rel(p) > after)]
+            st["deleted"] = len(gone)
+            q.put(("delete", gone))
+        st["status"] = "done" if complete else ("stopped" if stopped else "partial")
+    except BaseException as e:
+        st["status"] = f"failed: {e}"
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        q.put(None)
+        wt.join()
+        st["finished"] = time.time()
+    out = {k: st[k] for k in ("scanned", "added", "updated", "unchanged", "deleted", "errors")}
+    if sync:
+        out.update({"complete": complete, "resumed": ck is not None})
+    if embed:
+        out["embedded_chunks"] = st["embedded"]
+    return {**out, "mode": mode, "include": include, "db": str(INDEX_DB)}
 
 @mcp.tool()
 def index_new(dir: str = "",
@@ -319,55 +1145,292 @@ def index_new(dir: str = "",
               batch_commit: int = 200,
               pdf_max_pages: int = 10,
               max_chars: int = 200_000,
-              max_bytes_plain: int = 1_000_000) -> str:
+              max_bytes_plain: int = 1_000_000,
+              mode: str = "new",       # 'new' | 'sync'
+              resume: bool = True,
+              workers: int = 0,        # 0 → INDEX_WORKERS
+              queue_depth: int = 0,    # 0 → INDEX_QUEUE
+              background: bool = False,
+              embed: bool = False) -> str:
     """
-    수동 인덱싱: DB에 없는 파일만 신규로 인덱스(이미 인덱싱된 파일은 건너뜀).
+    수동 인덱싱.
+    - mode='new' : DB에 없는 파일만 신규로 인덱스(이미 인덱싱된 파일은 건너뜀)
+    - mode='sync': 증분 동기화 — 새 파일 추가 + (mtime/size 가 바뀐) 수정 파일만 재추출
+                   + 사라진 파일은 files/files_fts 에서 삭제.
+                   진행 위치를 scan_checkpoint 에 저장 → 중단되거나 limit 에 걸리면 다음 호출이 이어서 진행
+                   (resume=False 면 처음부터). 삭제 반영은 끝까지 한 바퀴 돈 뒤에만 한다.
     - include='none': 파일명/경로만 FTS (가볍고 빠름)
     - include='light': 텍스트형+PDF/Docx 추출 본문(제한 크기)까지 FTS
+                       본문 추출은 프로세스 풀(workers)에서 병렬로, DB 쓰기는 writer 스레드 하나가 batch 로.
+    - background=True: 바로 반환하고 뒤에서 진행 → index_progress 로 확인
+    - embed=True (include='light' 필요, sentence-transformers 설치 시): 본문 청크 임베딩도 저장
+                 → search_semantic / search_hybrid. 벡터가 없는 기존 파일도 이번에 채운다.
+    기존 인덱스의 (path, mtime, size) 는 시작할 때 한 번에 메모리로 읽는다(파일마다 SELECT 하지 않음).
     """
     base = (ROOT / dir).resolve()
     if not str(base).startswith(str(ROOT)) or not base.exists():
         return json.dumps({"error":"경로 없음 또는 ROOT 바깥 접근 불가"}, ensure_ascii=False)
 
     ext_filter = {t.strip().lstrip(".").lower() for t in types.split(",") if t.strip()} or None
-    db = IndexDB(INDEX_DB)
-
-    added = 0
-    scanned = 0
-    for meta in _iter_files(base, max_items=int(limit), ext_filter=ext_filter, name_glob=None):
-        scanned += 1
-        if db.exists_by_path(meta["path"]):
-            continue  # 이미 인덱스된 파일은 건너뜀
-        content = ""
-        if include.lower() == "light":
-            p = Path(meta["path"])
-            text = extract_text_any(p, max_bytes_plain=max_bytes_plain,
-                                    pdf_max_pages=pdf_max_pages, max_chars=max_chars)
-            # 추출 실패/미설치 메시지는 비우고 넘어감(이름/경로만 인덱스)
-            if not (text.startswith("(") and ("미설치" in text or "미지원" in text or "실패" in text)):
-                content = text
-        db.upsert_meta_and_fts(meta, content)
-        added += 1
-        if added % batch_commit == 0:
-            db.conn.commit()
+    if embed and not EMBED_AVAILABLE:
+        return json.dumps({"error": "sentence-transformers 미설치: pip install sentence-transformers"}, ensure_ascii=False)
+    if not _RUN_LOCK.acquire(blocking=False):
+        return json.dumps({"error": "이미 인덱싱 중입니다. index_progress 로 확인하세요."}, ensure_ascii=False)
+    args = (base, ext_filter, include, int(limit), max(1, int(batch_commit)),
+            (pdf_max_pages, max_chars, max_bytes_plain), mode.lower(), resume,
+            int(workers) or INDEX_WORKERS, int(queue_depth) or INDEX_QUEUE, embed)
+
+    def run():
+        try:
+            return _run_index(*args)
+        finally:
+            _RUN_LOCK.release()
+
+    if background:
+        threading.Thread(target=run, name="index-run", daemon=True).start()
+        return json.dumps({"started": True, "base": str(base), "mode": mode,
+                           "hint": "index_progress 로 진행 상황 확인"}, ensure_ascii=False)
+    return json.dumps(run(), ensure_ascii=False)
+
+@mcp.tool()
+def index_progress() -> str:
+    """현재(또는 마지막) 인덱싱 진행 상황: 처리 건수, 추출 중인 파일 수, 처리 속도, 경과 시간."""
+    if not _PROGRESS:
+        return json.dumps({"status": "idle"}, ensure_ascii=False)
+    p = dict(_PROGRESS)
+    elapsed = p.get("finished", time.time()) - p["started"]
+    p["elapsed_sec"] = round(elapsed, 1)
+    p["files_per_sec"] = round(p["scanned"] / elapsed, 1) if elapsed > 0 else None
+    return json.dumps(p, ensure_ascii=False)
 
-    db.conn.commit()
-    return json.dumps({"scanned": scanned, "added": added, "include": include, "db": str(INDEX_DB)}, ensure_ascii=False)
+def _search_terms(q: str, trigram: bool) -> tuple:
+    """검색어 → (FTS 로 찾을 단어들, FTS 로 못 찾아 LIKE 로 볼 단어들). trigram 은 3글자 미만을 못 찾는다."""
+    terms = [t for t in q.split() if t]
+    if not trigram:
+        return terms, []
+    return [t for t in terms if len(t) >= 3], [t for t in terms if len(t) < 3]
+
+# ===== 실시간 감시(watch) — 바뀐 파일만 인덱스에 반영 =====
+# 이벤트 방식: watchdog(리눅스 inotify) 으로 변경 경로를 모아 debounce 초 동안 조용해지면 한꺼번에 처리.
+# 폴링 방식: interval 초마다 mode='sync'(mtime/size 비교 → 바뀐 파일만 재추출). 네트워크 마운트(SMB/NFS)는
+#            서버 쪽 변경이 inotify 로 오지 않으므로 폴링.
+# 이벤트 방식은 시작할 때 한 번만 sync(꺼져 있던 동안의 변경 보정) 하고 이후엔 이벤트만 쓴다.
+# 주기적 보정 sync 는 rescan=True 로 켤 때만(전체 트리를 다시 훑으므로 큰 공유 폴더에선 비쌈).
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "2"))
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "300"))
+NETWORK_FS = {"cifs", "smbfs", "smb3", "nfs", "nfs4", "afpfs", "fuse.sshfs", "davfs", "9p"}
+
+def _is_network_mount(path: Path) -> bool:
+    if os.name == "nt":
+        try:
+            import ctypes
+            drive = os.path.splitdrive(str(path))[0] + "\\"
+            return drive.startswith("\\\\") or ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    try:
+        best, fstype = "", ""
+        with open("/proc/mounts") as f:
+            for line in f:
+                _, mnt, fs = line.split()[:3]
+                if str(path).startswith(mnt) and len(mnt) > len(best):
+                    best, fstype = mnt, fs
+        return fstype in NETWORK_FS
+    except OSError:
+        return False
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher: "_Watcher"):
+        self.w = watcher
+
+    def on_any_event(self, e):
+        if e.is_directory and e.event_type == "modified":
+            return                                  # 폴더 mtime 변경은 의미 없음(안의 파일 이벤트가 따로 옴)
+        for p in (e.src_path, getattr(e, "dest_path", None)):
+            if p:
+                self.w.touch(os.fsdecode(p))
+
+class _Watcher:
+    def __init__(self, base: Path, ext_filter, include: str, opts: tuple, embed: bool,
+                 method: str, interval: float, debounce: float, rescan: bool = False):
+        self.base, self.ext_filter, self.include, self.opts, self.embed = base, ext_filter, include, opts, embed
+        self.interval, self.debounce = interval, debounce
+        if method == "auto":
+            method = "events" if WATCHDOG_AVAILABLE and not _is_network_mount(base) else "poll"
+        self.method = method
+        self.rescan = method == "poll" or rescan        # interval 마다 전체 sync 를 돌지
+        self.pending: dict = {}                     # path → 마지막 이벤트 시각 (같은 파일 연속 이벤트는 하나로)
+        self.lock = threading.Lock()
+        self.stop_ev = threading.Event()
+        self.observer = None
+        self.thread = None
+        self.stats = {"events": 0, "batches": 0, "polls": 0, "last": None, "last_error": None}
+
+    def touch(self, path: str):
+        rel = Path(path).parts[len(self.base.parts):]
+        if any(_pruned(x) for x in rel[:-1]):
+            return
+        with self.lock:
+            self.pending[path] = time.time()
+            self.stats["events"] += 1
+
+    def start(self):
+        if self.method == "events":
+            self.observer = Observer()
+            self.observer.schedule(_Handler(self), str(self.base), recursive=True)
+            self.observer.start()
+        self.thread = threading.Thread(target=self._loop, name="index-watch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """멈추고 루프/옵저버 스레드가 끝날 때까지 기다린다. 진행 중인 반영은 stop_ev 를 보고
+        체크포인트를 남긴 채 바로 멈춘다(긴 초기 sync 도 기다리지 않음, 다음 sync 가 이어서).
+        → 감시를 바꿔 시작할 때 두 루프가 같은 DB 에 겹쳐 쓰지 않는다."""
+        self.stop_ev.set()
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _expand(self, paths: list) -> list:
+        """폴더 이벤트 → 안의 파일들, 사라진 폴더 → 인덱스에 있던 그 아래 파일들(삭제 대상)."""
+        out, missing = [], []
+        for p in paths:
+            if os.path.isdir(p):
+                out += [m["path"] for m in _iter_files(Path(p), max_items=10**9, ext_filter=self.ext_filter)]
+            elif os.path.exists(p):
+                ext = os.path.splitext(p)[1].lower().lstrip(".")
+                if not self.ext_filter or ext in self.ext_filter:
+                    out.append(p)
+            else:
+                missing.append(p)
+        if missing:
+            with _DB.read() as db:
+                for p in missing:
+                    out.append(p)
+                    out += list(db.load_fingerprints(Path(p)))
+        return sorted(set(out))
+
+    def _run(self, **kw):
+        if not _RUN_LOCK.acquire(blocking=False):  # 수동 index_new 진행 중 → 다음 틱에 다시
+            return None
+        try:
+            r = _run_index(self.base, self.ext_filter, self.include, 10**9, 200, self.opts,
+                           resume=True, queue_depth=INDEX_QUEUE, embed=self.embed, stop=self.stop_ev, **kw)
+            self.stats["last"] = {**r, "at": time.time()}
+            return r
+        except Exception as e:
+            self.stats["last_error"] = str(e)
+            return None
+        finally:
+            _RUN_LOCK.release()
+
+    def _loop(self):
+        next_poll = time.time()                     # 시작하자마자 한 번 sync → 꺼져 있던 동안의 변경 반영
+        while not self.stop_ev.wait(min(1.0, self.debounce)):
+            now = time.time()
+            with self.lock:
+                ready = [p for p, t in self.pending.items() if now - t >= self.debounce]
+            if ready:
+                paths = self._expand(ready)
+                workers = INDEX_WORKERS if len(paths) >= 16 else 1   # 몇 개뿐이면 프로세스 풀 생략
+                if self._run(mode="live", workers=workers, paths=paths) is not None:
+                    with self.lock:
+                        for p in ready:
+                            if self.pending.get(p, now + 1) <= now:   # 처리 중 새 이벤트가 온 경로는 남김
+                                self.pending.pop(p, None)
+                    self.stats["batches"] += 1
+            if now >= next_poll:
+                if self._run(mode="sync", workers=INDEX_WORKERS) is not None:
+                    self.stats["polls"] += 1
+                    next_poll = now + self.interval if self.rescan else float("inf")   # events: 시작 때 1번만
+                else:
+                    next_poll = now + 10
+
+    def status(self) -> dict:
+        with self.lock:
+            pending = len(self.pending)
+        return {"running": not self.stop_ev.is_set(), "base": str(self.base), "method": self.method,
+                "include": self.include, "interval": self.interval if self.rescan else None,
+                "debounce": self.debounce,
+                "pending": pending, **self.stats}
+
+_WATCHER = None
+
+@mcp.tool()
+def watch_start(dir: str = "",
+                types: str = "pdf,docx,md,txt",
+                include: str = "light",
+                method: str = "auto",     # 'auto' | 'events' | 'poll'
+                interval: float = 0,      # 0 → WATCH_INTERVAL
+                debounce: float = 0,      # 0 → WATCH_DEBOUNCE
+                pdf_max_pages: int = 10,
+                max_chars: int = 200_000,
+                max_bytes_plain: int = 1_000_000,
+                embed: bool = False,
+                rescan: bool = False) -> str:
+    """
+    변경 감시 시작 — 파일이 생기거나 바뀌거나 지워지면 그 파일만 인덱스에 반영(전체 재스캔 없음).
+    - method='events': 시작 때 sync 1번 후 watchdog(inotify) 이벤트만 → debounce 초 모아서 처리
+                       (rescan=True 면 interval 마다 보정 sync 도 — 빠진 이벤트가 걱정될 때만)
+    - method='poll'  : interval 초마다 mtime/size 비교(sync) — 네트워크 마운트용
+    - method='auto'  : watchdog 있고 로컬 디스크면 events, 아니면 poll
+    이미 감시 중이면 기존 감시를 멈추고(진행 중인 반영이 끝날 때까지 기다림) 새로 시작한다.
+    """
+    global _WATCHER
+    base = (ROOT / dir).resolve()
+    if not str(base).startswith(str(ROOT)) or not base.is_dir():
+        return json.dumps({"error":"경로 없음 또는 ROOT 바깥 접근 불가"}, ensure_ascii=False)
+    if method == "events" and not WATCHDOG_AVAILABLE:
+        return json.dumps({"error": "watchdog 미설치: pip install watchdog (또는 method='poll')"}, ensure_ascii=False)
+    if embed and not EMBED_AVAILABLE:
+        return json.dumps({"error": "sentence-transformers 미설치: pip install sentence-transformers"}, ensure_ascii=False)
+    if _WATCHER is not None:
+        _WATCHER.stop()
+    ext_filter = {t.strip().lstrip(".").lower() for t in types.split(",") if t.strip()} or None
+    _WATCHER = _Watcher(base, ext_filter, include, (pdf_max_pages, max_chars, max_bytes_plain), embed,
+                        method.lower(), float(interval) or WATCH_INTERVAL, float(debounce) or WATCH_DEBOUNCE,
+                        rescan)
+    _WATCHER.start()
+    return json.dumps(_WATCHER.status(), ensure_ascii=False)
+
+@mcp.tool()
+def watch_stop() -> str:
+    """변경 감시 중지."""
+    global _WATCHER
+    if _WATCHER is None:
+        return json.dumps({"running": False}, ensure_ascii=False)
+    _WATCHER.stop()
+    st, _WATCHER = _WATCHER.status(), None
+    return json.dumps(st, ensure_ascii=False)
+
+@mcp.tool()
+def watch_status() -> str:
+    """감시 상태: 방식, 대기 중인 변경 경로 수, 처리한 묶음/폴링 수, 마지막 반영 결과."""
+    return json.dumps(_WATCHER.status() if _WATCHER else {"running": False}, ensure_ascii=False)
 
 @mcp.tool()
 def search_db(q: str = "",
               types: str = "pdf,docx,md,txt",
               scope: str = "all",  # 'all' | 'name' | 'content'
-              limit: int = 50) -> str:
+              limit: int = 50,
+              syntax: bool = False) -> str:
     """
     DB(FTS5) 검색. q 비우면 최신 파일명/경로 순(ctime/mtime가 아닌 files.mtime 기준)으로 보여줌.
     - scope='name' → name/path 대상만
-    - scope='content' → content 대상만(본문 인덱싱한 경우에 한함)
+    - scope='content' → content(+형태소) 대상만(본문 인덱싱한 경우에 한함)
+    - 검색어는 단어별 AND. unicode61 이면 마지막 단어는 접두 검색, trigram 이면 부분 문자열 검색.
+      FTS_MORPH 인덱스면 검색어를 형태소로 바꾼 조건도 OR 로 함께 본다('보고서를' ↔ '보고서').
+    - syntax=True → q 를 FTS5 질의문법(OR/NEAR/"구절" 등) 그대로 사용
+    - 순위: bm25(name, path, content, morph 가중치 = FTS_WEIGHTS)
     """
-    db = IndexDB(INDEX_DB)
-    cur = db.conn.cursor()
     type_set = {t.strip().lstrip(".").lower() for t in types.split(",") if t.strip()}
+    with _DB.read() as db:
+        return json.dumps(_search_rows(db, q, type_set, scope, limit, syntax), ensure_ascii=False)
 
+def _search_rows(db: "IndexDB", q: str, type_set: set, scope: str, limit: int, syntax: bool = False) -> list:
+    cur = db.conn.cursor()
     if not q.strip():
         # q 없으면 메타에서 최신순
         if type_set:
@@ -387,43 +1450,109 @@ def search_db(q: str = "",
               LIMIT ?
             """, (int(limit),))
         rows = cur.fetchall()
-        return json.dumps([{
+        return [{
             "path": r[0], "name": r[1], "ext": r[2], "size": r[3], "mtime": r[4], "mime": r[5]
-        } for r in rows], ensure_ascii=False)
+        } for r in rows]
 
-    # FTS MATCH 구성
-    # scope에 따라 필드 한정
-    fts_q = q
-    if scope == "name":
-        fts_q = f'(name:{q}) OR (path:{q})'
-    elif scope == "content":
-        fts_q = f'(content:{q})'
+    # FTS MATCH 구성 — scope 에 따라 열 한정
+    has_morph = "morph" in db.fts_cols
+    cols = {"name": "{name path}", "content": "{content morph}" if has_morph else "{content}"}.get(scope, "")
+    like_terms = []
+    if syntax:
+        fts_q = f"{cols} : ({q})" if cols else q
+    else:
+        terms, like_terms = _search_terms(q, db.trigram)
+        toks = [_fts_quote(t) + ("*" if not db.trigram and i == len(terms) - 1 else "") for i, t in enumerate(terms)]
+        fts_q = (f"{cols} : ({' AND '.join(toks)})" if cols else " AND ".join(toks)) if toks else ""
+        mq = _morphs(q) if (has_morph and scope != "name") else ""
+        if fts_q and mq:
+            fts_q = f"({fts_q}) OR (morph : ({' AND '.join(_fts_quote(m) for m in mq.split())}))"
 
+    where, params = [], []
+    if fts_q:
+        where.append("files_fts MATCH ?")
+        params.append(fts_q)
+    for t in like_terms:                       # trigram 으로 못 찾는 짧은 단어 → LIKE
+        fields = {"name": ["f.name", "f.path"], "content": ["files_fts.content"]}.get(
+            scope, ["f.name", "f.path", "files_fts.content"])
+        where.append("(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in fields) + ")")
+        params += [_like(t)] * len(fields)
     if type_set:
-        placeholders = ",".join(["?"]*len(type_set))
-        cur.execute(f"""
-          SELECT f.path, f.name, f.ext, f.size, f.mtime, f.mime
-          FROM files f
-          JOIN files_fts ft ON f.id = ft.rowid
-          WHERE ft MATCH ?
-            AND f.ext IN ({placeholders})
-          ORDER BY bm25(ft)
-          LIMIT ?
-        """, (fts_q, *type_set, int(limit)))
-    else:
-        cur.execute("""
-          SELECT f.path, f.name, f.ext, f.size, f.mtime, f.mime
-          FROM files f
-          JOIN files_fts ft ON f.id = ft.rowid
-          WHERE ft MATCH ?
-          ORDER BY bm25(ft)
-          LIMIT ?
-        """, (fts_q, int(limit)))
+        where.append(f"f.ext IN ({','.join('?' * len(type_set))})")
+        params += list(type_set)
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS[:len(db.fts_cols)])
+    order = f"bm25(files_fts, {weights})" if fts_q else "f.mtime DESC"
+    cur.execute(f"""
+      SELECT f.path, f.name, f.ext, f.size, f.mtime, f.mime,
+             snippet(files_fts, 2, '[', ']', '…', 12)
+      FROM files f
+      JOIN files_fts ON f.id = files_fts.rowid
+      WHERE {' AND '.join(where)}
+      ORDER BY {order}
+      LIMIT ?
+    """, (*params, int(limit)))
     rows = cur.fetchall()
-    return json.dumps([{
-        "path": r[0], "name": r[1], "ext": r[2], "size": r[3], "mtime": r[4], "mime": r[5]
-    } for r in rows], ensure_ascii=False)
+    return [{
+        "path": r[0], "name": r[1], "ext": r[2], "size": r[3], "mtime": r[4], "mime": r[5], "snippet": r[6]
+    } for r in rows]
+
+@mcp.tool()
+def search_semantic(q: str, types: str = "pdf,docx,md,txt", limit: int = 20) -> str:
+    """의미 검색 — 단어가 달라도 뜻이 가까운 문서(index_new embed=True 로 만든 벡터 색인 필요)."""
+    if not EMBED_AVAILABLE:
+        return json.dumps({"error": "sentence-transformers 미설치: pip install sentence-transformers"}, ensure_ascii=False)
+    type_set = {t.strip().lstrip(".").lower() for t in types.split(",") if t.strip()}
+    with _DB.read() as db:
+        return json.dumps(_vector_hits(db, q, int(limit), type_set), ensure_ascii=False)
+
+@mcp.tool()
+def search_hybrid(q: str, types: str = "pdf,docx,md,txt", limit: int = 20,
+                  lexical_weight: float = 1.0, semantic_weight: float = 1.0) -> str:
+    """
+    키워드(bm25) + 의미(벡터) 결과를 한 번에 합쳐 순위 매김(RRF: Σ 가중치/(60+순위)).
+    파일명·고유명사는 bm25 가, 표현이 다른 문장은 벡터가 잡는다. 벡터 색인이 없으면 bm25 만.
+    """
+    type_set = {t.strip().lstrip(".").lower() for t in types.split(",") if t.strip()}
+    k = max(int(limit) * 3, 30)
+    with _DB.read() as db:
+        lists = [("lex_rank", lexical_weight, _search_rows(db, q, type_set, "all", k))]
+        if EMBED_AVAILABLE and db.conn.execute("SELECT 1 FROM chunks WHERE model=? LIMIT 1", (EMBED_MODEL,)).fetchone():
+            lists.append(("sem_rank", semantic_weight, _vector_hits(db, q, k, type_set)))
+    fused: dict = {}
+    for rank_key, w, rows in lists:
+        for rank, r in enumerate(rows, 1):
+            e = fused.setdefault(r["path"], {**r, "score": 0.0})
+            e["score"] += w / (60 + rank)
+            e[rank_key] = rank
+            if not e.get("snippet") and r.get("snippet"):
+                e["snippet"] = r["snippet"]
+    out = sorted(fused.values(), key=lambda e: -e["score"])[:int(limit)]
+    for e in out:
+        e["score"] = round(e["score"], 5)
+    return json.dumps(out, ensure_ascii=False)
+
+@mcp.tool()
+def suggest(prefix: str, limit: int = 10) -> str:
+    """파일명 자동완성 — 입력 중인 접두어로 시작하는 단어를 이름에 가진 파일(unicode61 접두 인덱스 사용)."""
+    prefix = prefix.strip()
+    if not prefix:
+        return "[]"
+    with _DB.read() as db:
+        if db.trigram and len(prefix) >= 3:
+            where, arg = "files_fts MATCH ?", "name : " + _fts_quote(prefix)
+        elif db.trigram:
+            where, arg = "f.name LIKE ? ESCAPE '\\'", _like(prefix)[1:]     # 'pre%'
+        else:
+            where, arg = "files_fts MATCH ?", "name : " + _fts_quote(prefix) + "*"
+        rows = db.conn.execute(f"""
+          SELECT f.name, f.path FROM files f JOIN files_fts ON f.id = files_fts.rowid
+          WHERE {where} ORDER BY length(f.name), f.mtime DESC LIMIT ?
+        """, (arg, int(limit))).fetchall()
+    return json.dumps([{"name": r[0], "path": r[1]} for r in rows], ensure_ascii=False)
 
 if __name__ == "__main__":
-    print(f"[start] ROOT={ROOT} | DB={INDEX_DB}")
+    # 추출 프로세스 풀은 (Windows spawn 에서) 이 스크립트를 다시 import 하므로 실행은 반드시 이 블록 안에서
+    print(f"[start] ROOT={ROOT} | DB={INDEX_DB} | workers={INDEX_WORKERS}")
+    if os.getenv("WATCH_DIR") is not None:        # 예: WATCH_DIR="" → ROOT 전체 감시하며 서버 실행
+        print(f"[watch] {watch_start(dir=os.getenv('WATCH_DIR', ''))}")
     mcp.run()
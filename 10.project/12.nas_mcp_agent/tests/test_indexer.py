@@ -0,0 +1,114 @@
+# tests/test_indexer.py
+"""
+3.mcp_filescan_indexer_db.py 회귀 테스트 — 작은 임시 폴더를 색인해 보고 결과를 확인한다.
+
+실행 (12.nas_mcp_agent/ 에서):  python -m pytest -q tests
+"""
+import os
+import sys
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("chardet")
+pytest.importorskip("dotenv")
+pytest.importorskip("mcp")
+
+HERE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HERE))
+
+
+@pytest.fixture
+def nas(tmp_path, monkeypatch):
+    """tmp_path/root 를 SCAN_ROOT 로, tmp_path/index.db 를 INDEX_DB 로 잡고 모듈을 새로 읽는다."""
+    root = tmp_path / "root"
+    (root / "docs").mkdir(parents=True)
+    monkeypatch.setenv("SCAN_ROOT", str(root))
+    monkeypatch.setenv("INDEX_DB", str(tmp_path / "index.db"))
+    monkeypatch.setenv("TEXT_CACHE_DB", "0")
+    spec = importlib.util.spec_from_file_location("nas_indexer", HERE / "3.mcp_filescan_indexer_db.py")
+    m = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(m)
+    m.root = root
+    return m
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    (root / rel).parent.mkdir(parents=True, exist_ok=True)
+    (root / rel).write_text(text, encoding="utf-8")
+
+
+def _index(m, **kw) -> dict:
+    return json.loads(m.index_new(dir="docs", include="light", workers=1, **kw))
+
+
+def test_sync_with_narrower_types_keeps_other_types(nas):
+    for i in range(3):
+        _write(nas.root, f"docs/a{i}.md", f"마크다운 {i}")
+        _write(nas.root, f"docs/b{i}.txt", f"텍스트 {i}")
+    assert _index(nas, types="md,txt", mode="sync")["added"] == 6
+
+    r = _index(nas, types="md", mode="sync")          # md 만 다시 훑어도 txt 행은 그대로여야 한다
+    assert r["deleted"] == 0
+    with nas._DB.read() as db:
+        assert db.conn.execute("SELECT COUNT(*) FROM files WHERE ext='txt'").fetchone()[0] == 3
+
+    os.remove(nas.root / "docs" / "a0.md")           # 필터 안의 형식은 여전히 삭제가 반영된다
+    assert _index(nas, types="md", mode="sync")["deleted"] == 1
+
+
+def _grep(m, q, **kw) -> list:
+    return json.loads(m.grep(q, dir="docs", **kw))
+
+
+def test_grep_with_index_still_finds_unindexed_files(nas):
+    _write(nas.root, "docs/a.md", "needle in markdown")
+    _index(nas, types="md,txt", mode="sync")
+    _write(nas.root, "docs/data.csv", "id,needle")     # 인덱스에 없는 형식
+    _write(nas.root, "docs/new.txt", "needle later")   # 인덱스 이후 추가된 파일
+
+    hits = {Path(h["path"]).name for h in _grep(nas, "needle")}
+    assert hits == {"a.md", "data.csv", "new.txt"}
+    assert _grep(nas, "needle", types="csv") == _grep(nas, "needle", types="csv", use_index=False)
+
+
+def test_grep_skips_modified_file_that_fails_extraction(nas, monkeypatch):
+    real = nas.extract_text_any
+    monkeypatch.setattr(nas, "extract_text_any", lambda p, **k: "needle pdf" if p.suffix == ".pdf" else real(p, **k))
+    _write(nas.root, "docs/a.pdf", "%PDF-stub")
+    _write(nas.root, "docs/b.md", "needle md")
+    _index(nas, types="pdf,md", mode="sync")
+
+    _write(nas.root, "docs/a.pdf", "%PDF-stub changed")  # 인덱스 이후 수정 + 재추출 실패
+    os.utime(nas.root / "docs" / "a.pdf", (1, 1))
+    monkeypatch.setattr(nas, "extract_text_any", lambda p, **k: "(PDF 텍스트 추출 실패: boom)"
+                        if p.suffix == ".pdf" else real(p, **k))
+    assert [Path(h["path"]).name for h in _grep(nas, "needle", types="pdf,md")] == ["b.md"]
+
+
+class _StopAfter:
+    """n 번째 확인부터 켜지는 stop 이벤트 (탐색 도중 watch_stop 이 불린 상황)."""
+    def __init__(self, n):
+        self.n = n
+
+    def is_set(self):
+        self.n -= 1
+        return self.n < 0
+
+
+def test_stopped_sync_keeps_checkpoint_and_resumes(nas):
+    for i in range(6):
+        _write(nas.root, f"docs/f{i}.txt", f"본문 {i}")
+    base = (nas.root / "docs").resolve()
+    run = lambda stop=None: nas._run_index(base, {"txt"}, "light", 10**9, 1, (10, 200_000, 1_000_000),
+                                           mode="sync", resume=True, workers=1, queue_depth=8, stop=stop)
+    r = run(_StopAfter(3))
+    assert (r["complete"], r["added"], r["deleted"]) == (False, 3, 0)
+    assert nas._PROGRESS["status"] == "stopped"
+
+    r = run()                                           # 체크포인트에서 이어서 나머지만
+    assert (r["complete"], r["resumed"], r["added"]) == (True, True, 6)
+    with nas._DB.read() as db:
+        assert db.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 6
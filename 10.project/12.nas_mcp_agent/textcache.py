@@ -0,0 +1,164 @@
+# textcache.py — 추출 텍스트 디스크 캐시 (2.mcp_filescan_contents_nodb.py / 3.mcp_filescan_indexer_db.py 공용)
+# - 같은 PDF/Docx 를 head/grep/index_new 가 매번 다시 파싱하지 않도록 추출 결과를 SQLite 파일에 압축 저장
+# - 키: (path, PDF 페이지 한도) + (size, mtime) 검사 — 파일이 바뀌면 자동으로 무효(다음 추출 때 덮어씀)
+#   PDF 는 페이지 한도가 다르면 결과가 달라지므로 한도별로 따로 저장(head 3쪽 / index 10쪽 공존)
+# - 압축: zstandard 있으면 zstd, 없으면 zlib
+# - 용량 상한(TEXT_CACHE_MB)을 넘으면 가장 오래 안 쓴 것부터 삭제(LRU)
+# 환경변수:
+#   TEXT_CACHE_DB  캐시 파일 경로(기본: 현재 폴더 nas_textcache.db, 빈 값/'0' 이면 캐시 끔)
+#   TEXT_CACHE_MB  최대 크기(압축 후, 기본 512)
+
+import os, sqlite3, threading, time, zlib
+from pathlib import Path
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except Exception:
+    ZSTD_AVAILABLE = False
+
+_db_env = os.getenv("TEXT_CACHE_DB", "nas_textcache.db").strip()
+TEXT_CACHE_DB = Path(_db_env).resolve() if _db_env not in ("", "0") else None
+TEXT_CACHE_MAX = int(float(os.getenv("TEXT_CACHE_MB", "512")) * 1024 * 1024)
+PLAIN_TEXT_EXT = {"txt","md","csv","json","yaml","yml","html","htm","rtf"}
+
+ATIME_GRACE = 300    # 적중 시 atime 갱신은 이보다 오래됐을 때만(읽기마다 쓰기 방지, LRU 엔 충분한 정밀도)
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+CREATE TABLE IF NOT EXISTS text_cache(
+  path  TEXT NOT NULL,
+  size  INTEGER,
+  mtime REAL,
+  pages INTEGER NOT NULL,  -- PDF 는 pdf_max_pages, 그 외 0 (키의 일부)
+  chars INTEGER,           -- 추출할 때 쓴 한도(max_chars / max_bytes_plain)
+  bytes INTEGER,
+  codec TEXT,        -- 'zstd' | 'zlib'
+  data  BLOB,
+  nbytes INTEGER,    -- 압축 후 크기(용량 계산용)
+  atime REAL,        -- 마지막 사용 시각(LRU)
+  PRIMARY KEY(path, pages)
+);
+CREATE INDEX IF NOT EXISTS idx_text_cache_atime ON text_cache(atime);
+"""
+
+_lock = threading.Lock()
+_conn = None
+_conn_pid = None      # 프로세스 풀 워커(fork)는 부모 연결을 쓰면 안 됨 → pid 가 바뀌면 새로 연결
+_puts = 0
+
+def _db():
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        _conn = sqlite3.connect(str(TEXT_CACHE_DB), timeout=30, check_same_thread=False)
+        pk = [r[1] for r in _conn.execute("PRAGMA table_info(text_cache)") if r[5]]
+        if pk == ["path"]:                         # 예전 형식(path 단독 키) 캐시 → 버리고 새로
+            _conn.execute("DROP TABLE text_cache")
+        _conn.executescript(SCHEMA)
+        _conn_pid = os.getpid()
+    return _conn
+
+def _pack(text: str):
+    raw = text.encode("utf-8")
+    if ZSTD_AVAILABLE:
+        return "zstd", zstd.ZstdCompressor(level=3).compress(raw)
+    return "zlib", zlib.compress(raw, 6)
+
+def _unpack(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            return None
+        raw = zstd.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    return raw.decode("utf-8")
+
+def _page_key(ext: str, pdf_max_pages: int) -> int:
+    """페이지 한도가 결과를 바꾸는 건 PDF 뿐 — 그 외는 0 으로 한 칸만 쓴다."""
+    return pdf_max_pages if ext == "pdf" else 0
+
+def _covers(ext: str, size: int, have: tuple, want: tuple) -> bool:
+    """저장된 추출 한도(have)로 요청 한도(want)의 결과를 낼 수 있는지. 페이지 한도는 키에서 이미 일치."""
+    chars, nbytes = have
+    w_chars, w_bytes = want
+    if ext in PLAIN_TEXT_EXT:        # 평문은 바이트 한도만 의미 있음(파일이 한도보다 작으면 같은 결과)
+        return min(size, nbytes) == min(size, w_bytes)
+    return chars >= w_chars          # 같은 페이지 범위를 더 길게 뽑아 둔 것 → 앞부분 자르면 같은 결과
+
+def get(path: str, size: int, mtime: float, limits: tuple):
+    if TEXT_CACHE_DB is None:
+        return None
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    pages = _page_key(ext, limits[0])
+    with _lock:
+        c = _db()
+        r = c.execute("SELECT chars, bytes, codec, data, atime FROM text_cache "
+                      "WHERE path=? AND pages=? AND size=? AND mtime=?", (path, pages, size, mtime)).fetchone()
+        if not r or not _covers(ext, size, r[:2], limits[1:]):
+            return None
+        now = time.time()
+        if now - (r[4] or 0) > ATIME_GRACE:
+            c.execute("UPDATE text_cache SET atime=? WHERE path=? AND pages=?", (now, path, pages))
+            c.commit()
+    text = _unpack(r[2], r[3])
+    if text is None or ext in PLAIN_TEXT_EXT:
+        return text
+    return text[:limits[1]]          # 더 큰 한도로 추출해 둔 것 → 요청 max_chars 로 자름
+
+def put(path: str, size: int, mtime: float, limits: tuple, text: str):
+    global _puts
+    if TEXT_CACHE_DB is None:
+        return
+    codec, data = _pack(text)
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    with _lock:
+        c = _db()
+        c.execute("DELETE FROM text_cache WHERE path=? AND (size<>? OR mtime<>?)", (path, size, mtime))  # 옛 버전
+        c.execute("INSERT OR REPLACE INTO text_cache(path,size,mtime,pages,chars,bytes,codec,data,nbytes,atime) "
+                  "VALUES(?,?,?,?,?,?,?,?,?,?)", (path, size, mtime, _page_key(ext, limits[0]), limits[1], limits[2],
+                                                 codec, data, len(data), time.time()))
+        _puts += 1
+        if _puts % 100 == 0:
+            _evict(c)
+        c.commit()
+
+def _evict(c):
+    """용량 초과 시 최근 사용순 누적 크기가 상한의 90% 를 넘는 (오래된) 항목 삭제."""
+    total = c.execute("SELECT IFNULL(SUM(nbytes),0) FROM text_cache").fetchone()[0]
+    if total <= TEXT_CACHE_MAX:
+        return
+    c.execute("DELETE FROM text_cache WHERE rowid IN ("
+              " SELECT rowid FROM (SELECT rowid, SUM(nbytes) OVER (ORDER BY atime DESC) AS run FROM text_cache)"
+              " WHERE run > ?)", (int(TEXT_CACHE_MAX * 0.9),))
+
+def stat() -> dict:
+    if TEXT_CACHE_DB is None:
+        return {"enabled": False}
+    with _lock:
+        n, b = _db().execute("SELECT COUNT(*), IFNULL(SUM(nbytes),0) FROM text_cache").fetchone()
+    return {"enabled": True, "db": str(TEXT_CACHE_DB), "codec": "zstd" if ZSTD_AVAILABLE else "zlib",
+            "entries": n, "bytes": b, "max_bytes": TEXT_CACHE_MAX}
+
+def _is_failure(text: str) -> bool:
+    return text.startswith("(") and ("미설치" in text or "미지원" in text or "실패" in text)
+
+def cached_extract(extract, path: Path, max_bytes_plain: int = 1_000_000,
+                   pdf_max_pages: int = 10, max_chars: int = 200_000) -> str:
+    """extract(path, max_bytes_plain=, pdf_max_pages=, max_chars=) 결과를 캐시 경유로.
+    캐시 적중이면 PyMuPDF/python-docx 를 아예 부르지 않는다. 실패/미지원 메시지는 저장 안 함."""
+    limits = (pdf_max_pages, max_chars, max_bytes_plain)
+    try:
+        st = os.stat(path)
+        hit = get(str(path), st.st_size, st.st_mtime, limits)
+    except (OSError, sqlite3.Error):
+        st, hit = None, None
+    if hit is not None:
+        return hit
+    text = extract(path, max_bytes_plain=max_bytes_plain, pdf_max_pages=pdf_max_pages, max_chars=max_chars)
+    if st is not None and not _is_failure(text):
+        try:
+            put(str(path), st.st_size, st.st_mtime, limits, text)
+        except sqlite3.Error:
+            pass
+    return text
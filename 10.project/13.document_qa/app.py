@@ -2,6 +2,8 @@
 
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify, Response, render_template
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
@@ -15,6 +17,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 
+from embedding_cache import cached
+from answer_cache import AnswerCache
+
 load_dotenv()
 
 # 1. 기본 설정
@@ -27,12 +32,24 @@ ALLOWED_EXTENSIONS = {"pdf", "txt"}
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # 2. LangChain 컴포넌트 초기화
-embeddings = OpenAIEmbeddings()
+embeddings = cached(OpenAIEmbeddings())   # 같은 청크/질문은 디스크 캐시에서 (embedding_cache.py)
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
 
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# 의미 기반 답변 캐시 — 거의 같은 질문은 검색/생성 없이 저장된 답을 바로 스트리밍 (answer_cache.py)
+answer_cache = AnswerCache(os.path.join(os.path.dirname(__file__), "answer_cache.sqlite3"), embeddings)
+
+
+def _version_of(filename):
+    """문서 버전 = 업로드 파일의 크기+수정시각. 다시 올리면 바뀌고, 지우면 None."""
+    try:
+        st = os.stat(os.path.join(UPLOAD_DIR, filename))
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
 prompt = ChatPromptTemplate.from_template("""
 다음 문서들을 참고하여 질문에 답변해주세요.
 문서에 관련 내용이 없으면 "문서에서 관련 정보를 찾을 수 없습니다"라고 답변하세요.
@@ -49,13 +66,24 @@ chain = prompt | llm | StrOutputParser()
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# 벡터 저장소는 프로세스에 하나만 만들어 두고 계속 쓴다(요청마다 Chroma 클라이언트를 새로 만들지 않음)
+vectorstore = Chroma(
+    collection_name="document_qa",
+    embedding_function=embeddings,
+    persist_directory=CHROMA_DIR,
+)
+
+# 질문 임베딩을 요청 처리와 겹쳐 돌리기 위한 스레드 풀
+_embed_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed")
+
+
 def get_vectorstore():
-    """ChromaDB 벡터 저장소 가져오기 (없으면 생성)"""
-    return Chroma(
-        collection_name="document_qa",
-        embedding_function=embeddings,
-        persist_directory=CHROMA_DIR,
-    )
+    """ChromaDB 벡터 저장소 (앱 시작 때 만든 것 재사용)"""
+    return vectorstore
+
+
+def _sse(payload) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
 # 3. 메인 페이지
 @app.route('/')
@@ -97,8 +125,8 @@ def upload():
         chunks = text_splitter.split_documents(documents)
 
         # 벡터 저장소에 추가
-        vectorstore = get_vectorstore()
-        vectorstore.add_documents(chunks)
+        get_vectorstore().add_documents(chunks)
+        answer_cache.invalidate(filename)      # 같은 이름으로 다시 올린 경우 예전 답 폐기
 
         return jsonify({
             "message": f"'{filename}' 업로드 완료",
@@ -110,29 +138,53 @@ def upload():
         return jsonify({"error": f"파일 처리 중 오류: {str(e)}"}), 500
 
 # 5. SSE 스트리밍 QA 엔드포인트
+#   이벤트 순서: {sources} → {content}… → {timing} → [DONE]
+#   · 출처를 먼저 보내 첫 바이트를 앞당기고, 마지막 timing 이벤트에 단계별 소요(ms)를 싣는다
+#     (embed: 질문 임베딩, search: 벡터 검색, first_token: 요청 시작→첫 토큰, total: 전체)
 @app.route('/ask', methods=['POST'])
 def ask():
-    data = request.json
-    question = data.get('question', '')
+    t0 = time.perf_counter()
+    ms = lambda: round((time.perf_counter() - t0) * 1000, 1)
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or '').strip()
 
     if not question:
         return jsonify({"error": "질문을 입력하세요"}), 400
 
-    # 벡터 검색
-    vectorstore = get_vectorstore()
-
-    try:
-        docs = vectorstore.similarity_search(question, k=3)
-    except Exception:
+    # 질문 임베딩을 먼저 걸어 두고, 그동안 컬렉션이 비었는지 확인
+    embed_future = _embed_pool.submit(embeddings.embed_query, question)
+    if vectorstore._collection.count() == 0:
         return jsonify({"error": "업로드된 문서가 없습니다. 먼저 문서를 업로드하세요."}), 400
+    try:
+        qvec = embed_future.result()
+    except Exception as e:
+        return jsonify({"error": f"질문 임베딩 실패: {str(e)}"}), 500
+    timing = {"embed": ms()}
+
+    # 예전에 답한 (거의) 같은 질문이면 저장된 답을 그대로 스트리밍 (같은 임베딩 재사용)
+    cached_answer, cache_vec = answer_cache.lookup(question, "", _version_of, vec=qvec)
+    if cached_answer:
+        def replay():
+            yield _sse({'sources': cached_answer['sources'], 'cached': True})
+            yield _sse({'content': cached_answer['answer']})
+            yield _sse({'timing': {**timing, 'search': 0.0, 'first_token': ms(), 'total': ms()}})
+            yield "data: [DONE]\n\n"
+        return Response(replay(), mimetype='text/event-stream')
+
+    # 벡터 검색 — 이미 만든 질문 벡터로 (다시 임베딩하지 않음). 캐시 조회 시간은 빼고 검색만 잰다
+    t_search = time.perf_counter()
+    docs = vectorstore.similarity_search_by_vector(qvec, k=3)
+    timing["search"] = round((time.perf_counter() - t_search) * 1000, 1)
 
     if not docs:
         return jsonify({"error": "관련 문서를 찾을 수 없습니다"}), 404
 
     context = "\n\n".join([f"[{doc.metadata.get('filename', '알 수 없음')}]\n{doc.page_content}" for doc in docs])
-    sources = list(set(doc.metadata.get('filename', '알 수 없음') for doc in docs))
+    sources = list(dict.fromkeys(doc.metadata.get('filename', '알 수 없음') for doc in docs))
 
     def generate():
+        # 소스 정보 먼저 전송 → 클라이언트는 LLM 첫 토큰 전에 응답을 받기 시작
+        yield _sse({'sources': sources})
         try:
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
@@ -145,17 +197,27 @@ def ask():
                 max_tokens=1000,
             )
 
+            parts = []
             for chunk in response:
-                if chunk.choices[0].delta.content:
+                if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
-                    yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
-
-            # 소스 정보 전송
-            yield f"data: {json.dumps({'sources': sources}, ensure_ascii=False)}\n\n"
+                    if not parts:
+                        timing["first_token"] = ms()
+                    parts.append(content)
+                    yield _sse({'content': content})
+
+            # 캐시 저장은 [DONE] 전에 — 클라이언트가 [DONE] 을 받고 끊으면 그 뒤 코드는 돌지 않는다
+            cited = {s: _version_of(s) for s in sources}
+            if parts and all(v is not None for v in cited.values()):
+                answer_cache.store(question, cache_vec, "", {"answer": "".join(parts), "sources": sources}, cited)
+
+            timing["total"] = ms()
+            timing.setdefault("first_token", timing["total"])     # 내용 없이 끝나도 네 항목은 항상 보냄
+            yield _sse({'timing': timing})
             yield "data: [DONE]\n\n"
 
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+            yield _sse({'error': str(e)})
 
     return Response(generate(), mimetype='text/event-stream')
 
@@ -182,6 +244,7 @@ def delete_document(filename):
     filepath = os.path.join(UPLOAD_DIR, secure_filename(filename))
     if os.path.exists(filepath):
         os.remove(filepath)
+        answer_cache.invalidate(secure_filename(filename))
         return jsonify({"message": f"'{filename}' 삭제 완료"})
     return jsonify({"error": "파일을 찾을 수 없습니다"}), 404
 
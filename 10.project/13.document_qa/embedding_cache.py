@@ -0,0 +1,117 @@
+"""
+임베딩 캐시 — 어떤 LangChain Embeddings 든 감싸서, 한 번 계산한 벡터는 디스크에서 꺼내 쓴다.
+
+같은 청크/질문을 다시 임베딩하느라 API 를 부르던 곳(재업로드, 서버 재시작 때 코퍼스 재색인,
+반복 질문)에서 호출이 사라진다. 캐시 파일 하나를 여러 RAG 앱이 같이 쓴다.
+
+  키   : (모델 이름, sha256(텍스트))   ※ 질문용 벡터는 모델 이름 뒤에 '#query' 를 붙여 따로 보관
+  값   : float16 으로 줄여 저장(1536차원 ≈ 3KB) — 검색 순위에는 사실상 영향 없음
+  미스 : 한 번의 embed_documents 호출로 몰아서 계산(같은 텍스트가 여러 번 있어도 1번만)
+
+  사용: embeddings = cached(OpenAIEmbeddings(model="text-embedding-3-small"))
+
+원본: 2.langchain/7.RAG/8.web_app/shared/embedding_cache.py 의 복사본이다.
+이 폴더만으로 실행되는 예제라 파일을 그대로 두었다 — 고칠 때는 원본을 고치고 다시 복사한다.
+
+환경변수
+  EMBED_CACHE_DB   캐시 파일 경로(기본 ~/.cache/rag_embeddings.sqlite3, 빈 값/'0' 이면 캐시 끔)
+"""
+
+import os
+import struct
+import hashlib
+import sqlite3
+import threading
+
+from langchain_core.embeddings import Embeddings
+
+_db_env = os.getenv("EMBED_CACHE_DB", os.path.expanduser("~/.cache/rag_embeddings.sqlite3")).strip()
+EMBED_CACHE_DB = _db_env if _db_env not in ("", "0") else None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings(
+  model TEXT NOT NULL,
+  hash  TEXT NOT NULL,
+  dim   INTEGER NOT NULL,
+  vec   BLOB NOT NULL,          -- float16 little-endian
+  PRIMARY KEY(model, hash)
+) WITHOUT ROWID;
+"""
+_LOOKUP = 500                 # IN (...) 한 번에 묻는 키 수(SQLite 변수 한도 안쪽)
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vec) -> bytes:
+    return struct.pack(f"<{len(vec)}e", *vec)
+
+
+def _unpack(dim: int, blob: bytes) -> list[float]:
+    return list(struct.unpack(f"<{dim}e", blob))
+
+
+def _model_name(inner: Embeddings) -> str:
+    name = getattr(inner, "model", None) or getattr(inner, "model_name", None) or type(inner).__name__
+    dims = getattr(inner, "dimensions", None)          # OpenAI text-embedding-3-* 의 축소 차원
+    return f"{name}:{dims}" if dims else str(name)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, path: str, model: str | None = None):
+        self.inner = inner
+        self.model = model or _model_name(inner)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _get(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP):
+                part = hashes[i:i + _LOOKUP]
+                rows = self._conn.execute(
+                    f"SELECT hash, dim, vec FROM embeddings WHERE model=? AND hash IN ({','.join('?' * len(part))})",
+                    (model, *part)).fetchall()
+                found.update((h, _unpack(d, v)) for h, d, v in rows)
+        return found
+
+    def _put(self, model: str, items: dict[str, list[float]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings(model, hash, dim, vec) VALUES(?,?,?,?)",
+                [(model, h, len(v), _pack(v)) for h, v in items.items()])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [_hash(t) for t in texts]
+        found = self._get(self.model, list(set(hashes)))
+        miss = {h: t for h, t in zip(hashes, texts) if h not in found}     # 중복 텍스트는 한 번만
+        if miss:
+            vecs = self.inner.embed_documents(list(miss.values()))
+            fresh = dict(zip(miss.keys(), vecs))
+            self._put(self.model, fresh)
+            found.update(fresh)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        model, h = self.model + "#query", _hash(text)
+        hit = self._get(model, [h])
+        if h in hit:
+            return hit[h]
+        vec = self.inner.embed_query(text)
+        self._put(model, {h: vec})
+        return vec
+
+    def stat(self) -> dict:
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), IFNULL(SUM(LENGTH(vec)),0) FROM embeddings").fetchone()
+        return {"model": self.model, "entries": n, "bytes": size}
+
+
+def cached(inner: Embeddings, path: str | None = None) -> Embeddings:
+    """inner 를 캐시로 감싼 Embeddings (EMBED_CACHE_DB 가 꺼져 있으면 inner 그대로)."""
+    path = path or EMBED_CACHE_DB
+    return CachedEmbeddings(inner, path) if path else inner
@@ -0,0 +1,219 @@
+"""
+게이트웨이 부하 테스트 — 게이트웨이가 '직접 호출' 대비 얼마나 지연을 더하는지 잰다.
+
+하는 일
+  1) 임시 DB 로 마켓플레이스(core/main.py)를 띄우고, standin_server.py 를 N개 띄운다.
+  2) 스탠드인들을 /api/servers 로 등록, 컨슈머 C개를 만들어 '모든' 서버를 구독시킨다(큰 구독 세트).
+  3) 같은 동시성으로
+       · direct  : 스탠드인에 바로 tools/call
+       · gateway : /mcp/consumers/<id> 로 tools/call (serverid__get_weather)
+       · list    : /mcp/consumers/<id> 로 tools/list
+       · stateless : /mcp/consumers/<id>?stateless=1 로 tools/call (세션 상태 없는 공유 경로)
+     를 돌리고 p50/p95/p99·처리량을 비교한다.
+  4) calls 테이블 증가분으로 SQLite 쓰기율, 마켓플레이스 RSS 증가분 / 실제로 열린 매니저 수(min(동시성, 컨슈머))로
+     '세션매니저(StreamableHTTPSessionManager) 1개당 메모리'를 추정한다.
+
+워커마다 MCP 세션을 하나 열어 두고 재사용하므로, 핸드셰이크가 아닌 '호출당' 오버헤드를 본다.
+
+실행 (17.mcp_marketplace/ 에서)
+  python bench/loadtest.py --servers 5 --consumers 20 --concurrency 32 --requests 2000
+  python bench/loadtest.py --delay-ms 20 --read-only      # 업스트림 지연 + 결과 캐시 효과
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+import requests
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+HERE = Path(__file__).resolve().parent
+CORE = HERE.parent / "core"
+CITIES = ["제주도", "도쿄", "파리", "방콕", "서울"]
+TOKEN = os.getenv("MARKET_TOKEN", "").strip()      # 마켓을 토큰 모드로 띄울 때만 필요
+HEADERS = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+
+
+# ─── 프로세스 기동/정리 ────────────────────────────────────
+def _wait_port(port: int, timeout: float = 20) -> None:
+    end = time.time() + timeout
+    while time.time() < end:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"포트 {port} 가 열리지 않음")
+
+
+def _start(cmd: list[str], cwd: Path, env: dict, log: Path) -> subprocess.Popen:
+    return subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log.open("w"), stderr=subprocess.STDOUT)
+
+
+def _rss_kb(pid: int) -> int:
+    """리눅스 /proc 기준 상주 메모리(KB). 못 읽으면 0."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _calls_count(db_path: str) -> int:
+    with sqlite3.connect(db_path) as c:
+        return c.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+
+# ─── 부하 발생 ─────────────────────────────────────────────
+async def _worker(url: str, jobs: asyncio.Queue, lat: list[float], errors: list[str], op) -> None:
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while True:
+                try:
+                    i = jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    await op(session, i)
+                    lat.append((time.perf_counter() - t0) * 1000)
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+
+async def _drive(urls: list[str], requests_n: int, concurrency: int, op) -> dict:
+    """urls 를 워커들에 라운드로빈으로 배정해 requests_n 건을 concurrency 로 실행."""
+    jobs: asyncio.Queue = asyncio.Queue()
+    for i in range(requests_n):
+        jobs.put_nowait(i)
+    lat, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker(urls[w % len(urls)], jobs, lat, errors, op) for w in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return _summary(lat, errors, wall)
+
+
+def _pct(xs: list[float], p: float) -> float:
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else float("nan")
+
+
+def _summary(lat: list[float], errors: list[str], wall: float) -> dict:
+    lat = sorted(lat)
+    return {
+        "ok": len(lat), "errors": len(errors), "first_error": errors[0] if errors else "",
+        "rps": len(lat) / wall if wall else 0.0, "wall_s": wall,
+        "p50": _pct(lat, .50), "p95": _pct(lat, .95), "p99": _pct(lat, .99),
+        "mean": statistics.fmean(lat) if lat else float("nan"),
+    }
+
+
+def _call_op(tool_of):
+    async def op(session: ClientSession, i: int):
+        r = await session.call_tool(tool_of(i), {"city": CITIES[i % len(CITIES)]})
+        if r.isError:
+            raise RuntimeError(r.content[0].text if r.content else "isError")
+    return op
+
+
+async def _list_op(session: ClientSession, i: int):
+    await session.list_tools()
+
+
+# ─── 시나리오 ──────────────────────────────────────────────
+def main() -> None:
+    ap = argparse.ArgumentParser(description="MCP 게이트웨이 부하 테스트")
+    ap.add_argument("--servers", type=int, default=5, help="스탠드인 서버 수")
+    ap.add_argument("--consumers", type=int, default=20, help="컨슈머 수(각자 모든 서버 구독)")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=2000, help="시나리오별 요청 수")
+    ap.add_argument("--delay-ms", type=float, default=0, help="스탠드인 도구 처리 지연")
+    ap.add_argument("--read-only", action="store_true", help="스탠드인 도구에 readOnlyHint(게이트웨이 캐시 대상)")
+    ap.add_argument("--market-port", type=int, default=8090)
+    ap.add_argument("--base-port", type=int, default=8100)
+    a = ap.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="mcp_bench_"))
+    db_path = str(work / "bench.db")
+    env = dict(os.environ, DB_PATH=db_path, ALLOW_PRIVATE_ENDPOINTS="1",
+               HEALTH_POLL_SEC="3600", CALLS_MAX="10000000")
+    market = f"http://127.0.0.1:{a.market_port}"
+    procs = []
+    try:
+        procs.append(_start([sys.executable, "-m", "uvicorn", "main:app", "--port", str(a.market_port),
+                             "--log-level", "warning"], CORE, env, work / "market.log"))
+        ports = [a.base_port + i for i in range(a.servers)]
+        for p in ports:
+            cmd = [sys.executable, str(HERE / "standin_server.py"), "--port", str(p), "--delay-ms", str(a.delay_ms)]
+            procs.append(_start(cmd + (["--read-only"] if a.read_only else []), HERE, env, work / f"standin_{p}.log"))
+        for p in [a.market_port] + ports:
+            _wait_port(p)
+
+        sids = [f"bench{p}" for p in ports]
+        for sid, p in zip(sids, ports):
+            r = requests.post(f"{market}/api/servers", headers=HEADERS, timeout=30, json={
+                "id": sid, "name": f"Bench {p}", "endpoint": f"http://127.0.0.1:{p}/mcp", "namespace": "bench"})
+            r.raise_for_status()
+        cids = [f"bench-c{i}" for i in range(a.consumers)]
+        for cid in cids:
+            requests.post(f"{market}/api/consumers", headers=HEADERS, timeout=10,
+                          json={"id": cid, "name": cid}).raise_for_status()
+            requests.put(f"{market}/api/consumers/{cid}/subscriptions", headers=HEADERS, timeout=10,
+                         json={"server_ids": sids}).raise_for_status()
+
+        market_pid = procs[0].pid
+        rss0 = _rss_kb(market_pid)
+        direct_urls = [f"http://127.0.0.1:{p}/mcp" for p in ports]
+        gw_urls = [f"{market}/mcp/consumers/{cid}" for cid in cids]
+
+        res = {}
+        res["direct"] = asyncio.run(_drive(direct_urls, a.requests, a.concurrency,
+                                           _call_op(lambda i: "get_weather")))
+        n0, t0 = _calls_count(db_path), time.perf_counter()
+        res["gateway"] = asyncio.run(_drive(gw_urls, a.requests, a.concurrency,
+                                            _call_op(lambda i: f"{sids[i % len(sids)]}__get_weather")))
+        writes = (_calls_count(db_path) - n0) / (time.perf_counter() - t0)
+        res["list"] = asyncio.run(_drive(gw_urls, a.requests, a.concurrency, _list_op))
+        res["stateless"] = asyncio.run(_drive([u + "?stateless=1" for u in gw_urls], a.requests, a.concurrency,
+                                              _call_op(lambda i: f"{sids[i % len(sids)]}__get_weather")))
+        rss1 = _rss_kb(market_pid)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    print(f"\n=== 게이트웨이 부하 테스트  servers={a.servers} consumers={a.consumers} "
+          f"concurrency={a.concurrency} requests={a.requests} delay={a.delay_ms}ms ===")
+    print(f"{'scenario':<10}{'ok':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>9}  (ms)")
+    for name, r in res.items():
+        print(f"{name:<10}{r['ok']:>7}{r['errors']:>6}{r['rps']:>9.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['mean']:>9.1f}")
+        if r["first_error"]:
+            print(f"           첫 오류: {r['first_error'][:120]}")
+    d, g = res["direct"], res["gateway"]
+    print(f"\n게이트웨이 추가 지연  p50 +{g['p50'] - d['p50']:.1f}ms  p95 +{g['p95'] - d['p95']:.1f}ms")
+    print(f"처리량 비율          {g['rps'] / d['rps'] * 100 if d['rps'] else 0:.0f}% (gateway/direct)")
+    print(f"SQLite 쓰기율        {writes:.0f} rows/s (calls 테이블)")
+    if rss0 and rss1:
+        managers = min(a.concurrency, len(cids))         # 워커 w 는 gw_urls[w % n] 만 씀 → 실제로 열린 세션매니저 수
+        print(f"마켓 RSS            {rss0 / 1024:.1f}MB → {rss1 / 1024:.1f}MB  "
+              f"(세션매니저 1개당 ≈ {(rss1 - rss0) / max(1, managers):.0f}KB, 세션매니저 {managers}개 / 컨슈머 {len(cids)}개)")
+    print(f"로그/DB: {work}")
+
+
+if __name__ == "__main__":
+    main()
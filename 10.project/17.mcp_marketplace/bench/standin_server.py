@@ -0,0 +1,46 @@
+# standin_server.py — [벤치 픽스처] weather_server.py 를 본뜬 부하 테스트용 MCP 서버
+#   loadtest.py 가 포트만 바꿔 N개를 띄운다. 셀프 등록은 하지 않는다(등록은 loadtest 가 직접).
+#   python standin_server.py --port 8101 [--delay-ms 20] [--read-only]
+
+import os
+import asyncio
+import argparse
+
+from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+
+FORECAST = {
+    "제주도": "맑음, 24℃",
+    "도쿄": "흐림, 21℃",
+    "파리": "비, 17℃",
+    "방콕": "소나기, 32℃",
+    "서울": "맑음, 23℃",
+}
+
+
+def build(port: int, delay_ms: float, read_only: bool) -> FastMCP:
+    mcp = FastMCP(f"standin-{port}", host=os.getenv("MCP_HOST", "127.0.0.1"), port=port)
+    hints = ToolAnnotations(readOnlyHint=True) if read_only else None   # 켜면 게이트웨이 결과 캐시 대상
+
+    @mcp.tool(annotations=hints)
+    async def get_weather(city: str) -> str:
+        """도시의 현재 날씨를 알려준다."""
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)    # 업스트림 처리 시간 흉내
+        return f"{city}: {FORECAST.get(city, '예보 없음 (데모 데이터)')}"
+
+    @mcp.tool(annotations=hints)
+    def echo(text: str = "") -> str:
+        """받은 문자열을 그대로 돌려준다(페이로드 크기 실험용)."""
+        return text
+
+    return mcp
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, required=True)
+    ap.add_argument("--delay-ms", type=float, default=0)
+    ap.add_argument("--read-only", action="store_true")
+    a = ap.parse_args()
+    build(a.port, a.delay_ms, a.read_only).run(transport="streamable-http")
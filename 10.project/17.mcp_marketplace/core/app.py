@@ -15,8 +15,11 @@ nginx 가 앞에 prefix(예: /mcp-market)를 붙여도, ProxyFix + 상대경로
   GET  /api/consumers / POST / DELETE
   GET/PUT /api/consumers/<id>/subscriptions
   GET  /api/health                         상태 재계산 후 요약
+
+async 작업(probe/채팅/프록시)은 요청마다 asyncio.run 하지 않고 bgloop 의 공용 루프에서 실행한다.
 """
 
+import os
 import asyncio
 from functools import wraps
 
@@ -24,11 +27,17 @@ from flask import Flask, request, jsonify, render_template
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 import db
+import bgloop
+import cache
+import breaker
 import gateway
+import validation
 import security
 import chat
 from mcp_client import probe_tools
 
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "5"))
+
 flask_app = Flask(__name__)
 # nginx reverse proxy 의 X-Forwarded-* (Host/Proto/Prefix) 신뢰 → url_for/script_root 가 prefix 반영
 flask_app.wsgi_app = ProxyFix(flask_app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
@@ -47,17 +56,32 @@ def require_token(f):
     return wrapper
 
 
-def _probe_and_store(server_id: str, endpoint: str) -> bool:
-    """서버에 접속해 도구 수집 + 생존표시. 실패해도 등록 자체는 막지 않는다."""
-    try:
-        tools = asyncio.run(probe_tools(endpoint))
-        db.set_tools(server_id, tools)
+def _probe_many(targets: list[tuple[str, str]]) -> dict[str, bool]:
+    """여러 서버 [(id, endpoint)] 를 '동시에' probe 해서 도구 수집 + 생존표시.
+       실패해도 등록 자체는 막지 않는다. 서버별 성공 여부를 돌려준다."""
+    async def probe_all():
+        return await asyncio.gather(
+            *(asyncio.wait_for(probe_tools(ep), timeout=PROBE_TIMEOUT) for _, ep in targets),
+            return_exceptions=True,
+        )
+
+    ok = {}
+    for (server_id, endpoint), res in zip(targets, bgloop.run(probe_all())):
+        if isinstance(res, BaseException):
+            flask_app.logger.warning("probe 실패 %s (%s): %r", server_id, endpoint, res)
+            ok[server_id] = False
+            continue
+        db.set_tools(server_id, res)
         db.mark_seen(server_id)
-        return True
-    except Exception as e:
-        flask_app.logger.warning("probe 실패 %s (%s): %s", server_id, endpoint, e)
+        ok[server_id] = True
+    if not all(ok.values()):
         db.recompute_statuses()
-        return False
+    return ok
+
+
+def _probe_and_store(server_id: str, endpoint: str) -> bool:
+    """서버 1개 probe (_probe_many 의 단건 버전)."""
+    return _probe_many([(server_id, endpoint)])[server_id]
 
 
 # ─── 페이지 ────────────────────────────────────────────────
@@ -102,16 +126,17 @@ def guide():
 @flask_app.get("/api/stats")
 def api_stats():
     db.recompute_statuses()
-    return jsonify(db.stats())
+    # 브레이커·세션매니저는 프로세스 메모리 상태
+    return jsonify({**db.stats(), "breakers": breaker.snapshot(), "gateway": gateway.snapshot()})
 
 
 @flask_app.get("/api/calls")
 def api_calls():
-    page = request.args.get("page", 1, type=int)
     size = request.args.get("size", 20, type=int)
     q = request.args.get("q", "", type=str)
     field = request.args.get("field", "all", type=str)
-    return jsonify(db.list_calls(page, size, q, field))
+    before = request.args.get("before", None, type=int)    # keyset 커서(직전 페이지 마지막 id)
+    return jsonify(db.list_calls(size, q, field, before))
 
 
 @flask_app.get("/api/token-hint")
@@ -134,7 +159,7 @@ def api_chat():
     cid = body.get("consumer_id")
     if not cid:
         return jsonify({"error": "'consumer_id' 필수"}), 400
-    result = asyncio.run(chat.run_chat(
+    result = bgloop.run(chat.run_chat(
         cid, body.get("messages", []), body.get("enabled_tools"),
         ip=request.remote_addr or "-", prov=body.get("provider"),
     ))
@@ -164,10 +189,17 @@ def api_register_server():
     if reason:
         return jsonify({"error": "ENDPOINT_REJECTED", "detail": reason}), 400
     ns = body.get("namespace", "default")
+    policy = body.get("cache") or {}                        # {도구명: TTL초} — 결과 캐시 선언(선택)
+    if not isinstance(policy, dict) or not all(
+            isinstance(v, (int, float)) and v >= 0 for v in policy.values()):
+        return jsonify({"error": "'cache' 는 {도구명: TTL초(>=0)} 형식"}), 400
     db.upsert_server(
         id=body["id"], name=body["name"], endpoint=body["endpoint"],
         owner=body.get("owner", ""), namespace=ns, description=body.get("description", ""),
+        cache=policy,
     )
+    breaker.forget(body["id"])   # 재등록(주소 변경 등)이면 이전 실패 기록·캐시는 버린다
+    cache.forget(body["id"])
     if ns == "demo":          # 데모는 '다시 등록' 버튼용으로 기억(삭제돼도 보존)
         db.remember_seed(body["id"], body["name"], body["endpoint"],
                          body.get("owner", ""), ns, body.get("description", ""))
@@ -178,12 +210,13 @@ def api_register_server():
 @flask_app.post("/api/demo/seed")
 @require_token
 def api_demo_seed():
-    """기억해 둔 데모 서버들을 재등록 + 재탐지한다('데모 서버 다시 등록' 버튼)."""
+    """기억해 둔 데모 서버들을 재등록 + 재탐지한다('데모 서버 다시 등록' 버튼). probe 는 동시에."""
     seeds = db.get_demo_seeds()
     for s in seeds:
         db.upsert_server(id=s["id"], name=s["name"], endpoint=s["endpoint"],
                          owner=s["owner"], namespace=s["namespace"], description=s["description"])
-        _probe_and_store(s["id"], s["endpoint"])
+    if seeds:
+        _probe_many([(s["id"], s["endpoint"]) for s in seeds])
     return jsonify({"seeded": [s["id"] for s in seeds]})
 
 
@@ -193,6 +226,7 @@ def api_refresh_server(server_id):
     s = db.get_server(server_id)
     if not s:
         return jsonify({"error": "없는 서버"}), 404
+    cache.forget(server_id)      # 도구를 다시 읽으므로 결과 캐시도 새로
     _probe_and_store(server_id, s["endpoint"])
     return jsonify(db.get_server(server_id))
 
@@ -201,6 +235,10 @@ def api_refresh_server(server_id):
 @require_token
 def api_delete_server(server_id):
     db.delete_server(server_id)
+    bgloop.run(gateway.drop(f"s:{server_id}"))   # 그 서버 전용 세션매니저도 바로 정리
+    breaker.forget(server_id)
+    cache.forget(server_id)
+    validation.forget(server_id)
     return jsonify({"ok": True})
 
 
@@ -209,6 +247,10 @@ def api_delete_server(server_id):
 def api_delete_all_servers():
     """등록된 모든 서버를 일괄 삭제(도구·구독 포함). UI에서 '삭제' 타이핑 확인 후 호출."""
     n = db.delete_all_servers()
+    bgloop.run(gateway.drop_prefix("s:"))
+    breaker.clear()              # 단건 삭제와 같게 — 브레이커·캐시·검증기 상태도 전부 정리
+    cache.clear()
+    validation.clear()
     return jsonify({"ok": True, "deleted": n})
 
 
@@ -232,8 +274,8 @@ def api_call_tool(server_id):
     if not tool:
         return jsonify({"error": "'tool' 필수"}), 400
     # ProxyFix 가 X-Forwarded-For 를 remote_addr 로 반영 → 실제 클라이언트 IP
-    blocks = asyncio.run(gateway._proxy(server_id, tool, body.get("arguments") or {},
-                                        via="ui", client_ip=request.remote_addr or "-"))
+    blocks = bgloop.run(gateway._proxy(server_id, tool, body.get("arguments") or {},
+                                       via="ui", client_ip=request.remote_addr or "-"))
     return jsonify({"result": _blocks_to_text(blocks)})
 
 
@@ -270,6 +312,7 @@ def api_register_consumer():
 @require_token
 def api_delete_consumer(consumer_id):
     db.delete_consumer(consumer_id)
+    bgloop.run(gateway.drop(f"c:{consumer_id}"))   # 지운 컨슈머의 세션매니저가 남지 않게
     return jsonify({"ok": True})
 
 
@@ -278,6 +321,7 @@ def api_delete_consumer(consumer_id):
 def api_delete_all_consumers():
     """모든 컨슈머를 일괄 삭제(구독 포함). UI에서 '삭제' 타이핑 확인 후 호출."""
     n = db.delete_all_consumers()
+    bgloop.run(gateway.drop_prefix("c:"))
     return jsonify({"ok": True, "deleted": n})
 
 
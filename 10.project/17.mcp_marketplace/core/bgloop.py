@@ -0,0 +1,36 @@
+"""
+Flask(WSGI) 핸들러에서 async 코드(probe/채팅/프록시)를 실행하는 '오래 사는' 이벤트 루프.
+
+예전엔 요청마다 asyncio.run(...) 으로 루프를 새로 만들고 부쉈다. 이제는
+  · main.py(ASGI) 로 실행되면 : lifespan 이 자기 루프를 bind() — 게이트웨이와 '같은 루프'에서 돈다.
+  · app.py 단독 실행(개발용)  : 처음 쓸 때 데몬 스레드 루프를 하나 띄워 계속 재사용한다.
+
+Flask 핸들러는 WSGIMiddleware 의 워커 스레드에서 돌기 때문에, 코루틴을 루프에 넘기고
+결과만 기다리면 된다(run). 루프 스레드 안에서 run() 을 부르면 교착이므로 금지.
+"""
+
+import asyncio
+import threading
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def bind(loop: asyncio.AbstractEventLoop | None) -> None:
+    """앱 시작 시 ASGI 루프를 등록한다(종료 시 None)."""
+    global _loop
+    _loop = loop
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="bgloop", daemon=True).start()
+        return _loop
+
+
+def run(coro, timeout: float | None = None):
+    """코루틴을 공용 루프에서 실행하고 결과를 돌려준다(워커 스레드에서 호출)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
@@ -0,0 +1,141 @@
+"""
+업스트림 서버별 서킷 브레이커 — '실제 호출 결과'로 죽은 서버를 즉시 차단한다.
+
+헬스 폴링(HEALTH_POLL_SEC)은 느려서, 방금 죽은 서버로도 한동안 호출이 가고 매번 타임아웃까지 기다린다.
+브레이커는 게이트웨이를 지나가는 호출의 최근 WINDOW_SEC 성공/실패·지연을 보고 상태를 바꾼다.
+
+  CLOSED    : 정상 — 모두 통과
+  OPEN      : 최근 오류율 ≥ ERROR_RATE 또는 느린 호출 비율 ≥ ERROR_RATE → COOLDOWN_SEC 동안 즉시 거절
+  HALF_OPEN : 쿨다운이 지나면 시험 호출 1건만 통과 → 성공이면 CLOSED, 실패면 다시 OPEN
+
+'실패'는 업스트림 통신 실패/타임아웃만 센다. 도구 레벨 오류(TOOL_ERROR)는 서버가 응답한 것이므로 성공.
+
+환경변수
+  BREAKER_WINDOW_SEC(60)  BREAKER_MIN_CALLS(5)  BREAKER_ERROR_RATE(0.5)
+  BREAKER_SLOW_MS(10000)  BREAKER_COOLDOWN_SEC(30)
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+WINDOW_SEC = float(os.getenv("BREAKER_WINDOW_SEC", "60"))
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))          # 이 건수 미만이면 판단 보류
+ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+SLOW_MS = float(os.getenv("BREAKER_SLOW_MS", "10000"))        # 이보다 느린 성공도 '나쁜 호출'로 센다
+COOLDOWN_SEC = float(os.getenv("BREAKER_COOLDOWN_SEC", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "CLOSED", "OPEN", "HALF_OPEN"
+
+
+class Breaker:
+    """서버 1개의 브레이커. 게이트웨이 루프에서 갱신하고 Flask 스레드가 snapshot 을 읽는다."""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial = False                 # HALF_OPEN 시험 호출이 진행 중인지
+        self.calls = deque()               # (ts, ok, slow)
+
+    def _trim(self, t: float) -> None:
+        while self.calls and self.calls[0][0] < t - WINDOW_SEC:
+            self.calls.popleft()
+
+    def allow(self) -> bool:
+        t = time.time()
+        if self.state == OPEN and t - self.opened_at >= COOLDOWN_SEC:
+            self.state, self.trial = HALF_OPEN, False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """시험 호출이 결과 없이 끝남(취소 등) → 시험 슬롯만 반납, 상태는 HALF_OPEN 그대로."""
+        if self.state == HALF_OPEN:
+            self.trial = False
+
+    def record(self, ok: bool, latency_ms: float) -> None:
+        t = time.time()
+        slow = ok and latency_ms >= SLOW_MS
+        if self.state == HALF_OPEN:
+            self.trial = False
+            if ok and not slow:
+                self.state = CLOSED
+                self.calls.clear()
+            else:
+                self.state, self.opened_at = OPEN, t
+            return
+        self.calls.append((t, ok, slow))
+        self._trim(t)
+        n = len(self.calls)
+        bad = sum(1 for _, o, s in self.calls if not o or s)
+        if self.state == CLOSED and n >= MIN_CALLS and bad / n >= ERROR_RATE:
+            self.state, self.opened_at = OPEN, t
+
+    def retry_after(self) -> float:
+        return max(0.0, COOLDOWN_SEC - (time.time() - self.opened_at)) if self.state == OPEN else 0.0
+
+    def snapshot(self) -> dict:
+        self._trim(time.time())
+        n = len(self.calls)
+        fails = sum(1 for _, o, _ in self.calls if not o)
+        slow = sum(1 for _, _, s in self.calls if s)
+        return {"state": self.state, "calls": n, "fails": fails, "slow": slow,
+                "error_rate": round(fails / n * 100, 1) if n else None,
+                "retry_after": round(self.retry_after(), 1)}
+
+
+_breakers: dict[str, Breaker] = {}
+_lock = threading.Lock()
+
+
+def _get(server_id: str) -> Breaker:
+    b = _breakers.get(server_id)
+    if b is None:
+        b = _breakers.setdefault(server_id, Breaker())
+    return b
+
+
+def allow(server_id: str) -> bool:
+    """이 서버로 지금 호출을 보내도 되는지(OPEN 이면 False)."""
+    with _lock:
+        return _get(server_id).allow()
+
+
+def record(server_id: str, ok: bool, latency_ms: float) -> None:
+    """업스트림 호출 결과 반영. ok=False 는 통신 실패/타임아웃."""
+    with _lock:
+        _get(server_id).record(ok, latency_ms)
+
+
+def release(server_id: str) -> None:
+    """호출이 record 없이 끝났을 때(취소) HALF_OPEN 시험 슬롯을 돌려준다."""
+    with _lock:
+        _get(server_id).release()
+
+
+def retry_after(server_id: str) -> float:
+    with _lock:
+        return _get(server_id).retry_after()
+
+
+def forget(server_id: str) -> None:
+    """서버 삭제/재등록 시 상태 초기화."""
+    with _lock:
+        _breakers.pop(server_id, None)
+
+
+def clear() -> None:
+    """서버 일괄 삭제 시 모든 상태 초기화."""
+    with _lock:
+        _breakers.clear()
+
+
+def snapshot() -> dict[str, dict]:
+    """대시보드용 — {server_id: {state, calls, fails, slow, error_rate, retry_after}}"""
+    with _lock:
+        return {sid: b.snapshot() for sid, b in sorted(_breakers.items())}
@@ -0,0 +1,78 @@
+"""
+멱등(읽기 전용) 도구의 결과 캐시 — 같은 인자로 또 부르면 업스트림에 가지 않고 바로 돌려준다.
+
+날씨 조회·상품 검색처럼 부작용 없는 도구는 여러 컨슈머가 같은 인자로 반복 호출한다.
+게이트웨이(_proxy)가 (server_id, tool, 정규화된 인자) 를 키로 결과를 메모리에 잠깐 보관한다.
+
+캐시 대상(opt-in)
+  · 등록 시 선언 : POST /api/servers  {"cache": {"도구명": TTL초}}   (0 이면 이 도구는 캐시 안 함)
+  · 자동 추론    : 선언이 없고 MCP 도구 힌트가 readOnlyHint=true 면 CACHE_TTL 초
+도구 오류(isError) 결과는 캐시하지 않는다. 서버 재등록/재수집/삭제 시 그 서버 항목은 비운다.
+
+환경변수
+  CACHE_TTL(60)    readOnlyHint 도구의 기본 TTL(초). 0 이면 자동 추론 끔(선언한 도구만).
+  CACHE_MAX(1000)  최대 항목 수 — 넘치면 가장 오래 안 쓴 것부터(LRU) 버린다.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX = int(os.getenv("CACHE_MAX", "1000"))
+
+_items: OrderedDict[tuple, tuple[float, object]] = OrderedDict()   # key → (만료시각, 값)
+_lock = threading.Lock()
+
+
+def ttl_for(server: dict, tool: dict | None) -> float:
+    """이 도구의 캐시 TTL(초). 0 이면 캐시하지 않는다."""
+    name = (tool or {}).get("name")
+    declared = (server.get("cache_ttl") or {}).get(name)
+    if declared is not None:
+        return float(declared)
+    if ((tool or {}).get("annotations") or {}).get("readOnlyHint"):
+        return CACHE_TTL
+    return 0.0
+
+
+def key(server_id: str, tool: str, arguments: dict | None) -> tuple:
+    """인자 순서·공백과 무관한 키 — {"b":1,"a":2} 와 {"a":2,"b":1} 은 같은 호출."""
+    canon = json.dumps(arguments or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return server_id, tool, canon
+
+
+def get(k: tuple):
+    """살아있는 항목이면 값, 없거나 만료면 None."""
+    with _lock:
+        hit = _items.get(k)
+        if hit is None:
+            return None
+        if hit[0] < time.time():
+            del _items[k]
+            return None
+        _items.move_to_end(k)
+        return hit[1]
+
+
+def put(k: tuple, value, ttl: float) -> None:
+    with _lock:
+        _items[k] = (time.time() + ttl, value)
+        _items.move_to_end(k)
+        while len(_items) > CACHE_MAX:
+            _items.popitem(last=False)
+
+
+def forget(server_id: str) -> None:
+    """서버의 모든 항목 삭제(재등록·재수집·삭제 시)."""
+    with _lock:
+        for k in [k for k in _items if k[0] == server_id]:
+            del _items[k]
+
+
+def clear() -> None:
+    """모든 항목 삭제(서버 일괄 삭제 시)."""
+    with _lock:
+        _items.clear()
@@ -5,15 +5,19 @@
   · 컨슈머가 구독한 도구(serverid__tool)를 LLM 에 노출(원하는 것만 on/off).
   · LLM 이 도구를 호출하면 '게이트웨이 프록시(_proxy)'로 실행 → 요청 로그·대시보드 통계에도 잡힘.
   · OpenAI / Anthropic(Claude) 둘 다 지원. LLM_PROVIDER 로 선택(미설정이면 키 있는 쪽 자동).
+  · async SDK 클라이언트 사용(이벤트 루프를 막지 않음). 한 턴의 도구 호출들은 asyncio.gather 로
+    동시에 실행하되 채팅당 CHAT_TOOL_CONCURRENCY 개까지만. 구독 목록은 채팅당 한 번만 조회.
 
 환경변수
   LLM_PROVIDER      'openai' | 'anthropic' (미설정 시 자동 감지)
   OPENAI_API_KEY / OPENAI_MODEL(기본 gpt-4o-mini)
   ANTHROPIC_API_KEY / ANTHROPIC_MODEL(기본 claude-haiku-4-5-20251001)
+  CHAT_TOOL_CONCURRENCY  한 채팅에서 동시에 실행할 도구 호출 수 상한(기본 4)
 """
 
 import os
 import json
+import asyncio
 import importlib.util
 
 import db
@@ -24,11 +28,12 @@ def _installed(mod: str) -> bool:
     return importlib.util.find_spec(mod) is not None
 
 MAX_ITERS = 6   # tool-call 왕복 최대 횟수(무한루프 방지)
+TOOL_CONCURRENCY = int(os.getenv("CHAT_TOOL_CONCURRENCY", "4"))   # 채팅당 동시 도구 호출 상한
 
 SYSTEM = (
     "너는 사용자를 돕는 에이전트다. 사용할 수 있는 도구는 '서버id__도구명' 형식이며 여러 외부 팀의 "
     "MCP 서버에서 마켓플레이스 게이트웨이를 통해 받은 것이다. 요청에 맞는 도구를 골라 처리하고, "
-    "복합 요청은 여러 도구를 순서대로 사용하라. 도구가 없으면 솔직히 모른다고 답하라. 한국어로 답하라."
+    "복합 요청은 여러 도구를 사용하되, 서로 독립적인 호출은 한 번에 함께 요청하라(동시에 실행된다). 도구가 없으면 솔직히 모른다고 답하라. 한국어로 답하라."
 )
 
 
@@ -56,10 +61,10 @@ def provider() -> str:
     return av[0]["provider"] if av else ""
 
 
-def _collect_tools(consumer_id: str, enabled: list[str] | None) -> list[dict]:
-    """컨슈머 구독 도구를 모아 enabled 로 필터. [{name, description, schema}]"""
+def _collect_tools(subs: list[dict], enabled: list[str] | None) -> list[dict]:
+    """구독 서버들의 도구를 모아 enabled 로 필터. [{name, description, schema}]"""
     out = []
-    for s in db.get_subscriptions(consumer_id):
+    for s in subs:
         for t in s["tools"]:
             name = f"{s['id']}{gateway.NS}{t['name']}"
             if enabled is not None and name not in enabled:
@@ -72,69 +77,87 @@ def _collect_tools(consumer_id: str, enabled: list[str] | None) -> list[dict]:
     return out
 
 
-async def _exec(consumer_id: str, namespaced: str, args: dict, ip: str) -> str:
+class _Ctx:
+    """채팅 1건 동안 공유하는 실행 문맥 — 구독 id 집합(한 번만 조회) + 동시 실행 상한."""
+
+    def __init__(self, consumer_id: str, subs: list[dict], ip: str):
+        self.consumer_id = consumer_id
+        self.sub_ids = {s["id"] for s in subs}
+        self.ip = ip
+        self.sem = asyncio.Semaphore(max(1, TOOL_CONCURRENCY))
+
+
+async def _exec(ctx: _Ctx, namespaced: str, args: dict) -> str:
     """도구 1건을 게이트웨이 프록시로 실행하고 텍스트 결과를 돌려준다(로그에도 기록됨)."""
     if gateway.NS not in namespaced:
         return json.dumps({"error": "BAD_TOOL_NAME", "name": namespaced}, ensure_ascii=False)
     sid, tool = namespaced.split(gateway.NS, 1)
-    subs = {s["id"] for s in db.get_subscriptions(consumer_id)}
-    if sid not in subs:
+    if sid not in ctx.sub_ids:
         return json.dumps({"error": "NOT_SUBSCRIBED", "server": sid}, ensure_ascii=False)
-    blocks = await gateway._proxy(sid, tool, args or {}, via=f"chat:{consumer_id}", client_ip=ip)
+    async with ctx.sem:
+        blocks = await gateway._proxy(sid, tool, args or {}, via=f"chat:{ctx.consumer_id}", client_ip=ctx.ip)
     return gateway._text(blocks)
 
 
+async def _exec_all(ctx: _Ctx, calls: list[tuple[str, dict]]) -> list[str]:
+    """한 턴의 도구 호출들을 동시에 실행(순서 유지)."""
+    return list(await asyncio.gather(*(_exec(ctx, name, args) for name, args in calls)))
+
+
 # ─── OpenAI ────────────────────────────────────────────────
-async def _run_openai(consumer_id, history, tools, ip) -> dict:
-    from openai import OpenAI
-    client = OpenAI()
+async def _run_openai(ctx: _Ctx, history, tools) -> dict:
+    from openai import AsyncOpenAI
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     spec = [{"type": "function", "function": {
         "name": t["name"], "description": t["description"], "parameters": t["schema"]}} for t in tools]
     msgs = [{"role": "system", "content": SYSTEM}] + history
     steps = []
-    for _ in range(MAX_ITERS):
-        resp = client.chat.completions.create(model=model, messages=msgs, tools=spec or None)
-        m = resp.choices[0].message
-        if not m.tool_calls:
-            return {"reply": m.content or "", "steps": steps, "provider": "openai", "model": model}
-        msgs.append({"role": "assistant", "content": m.content or "", "tool_calls": [
-            {"id": tc.id, "type": "function",
-             "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
-            for tc in m.tool_calls]})
-        for tc in m.tool_calls:
-            try:
-                args = json.loads(tc.function.arguments or "{}")
-            except Exception:
-                args = {}
-            result = await _exec(consumer_id, tc.function.name, args, ip)
-            steps.append({"tool": tc.function.name, "args": args, "result": result})
-            msgs.append({"role": "tool", "tool_call_id": tc.id, "content": result})
+    async with AsyncOpenAI() as client:
+        for _ in range(MAX_ITERS):
+            resp = await client.chat.completions.create(model=model, messages=msgs, tools=spec or None)
+            m = resp.choices[0].message
+            if not m.tool_calls:
+                return {"reply": m.content or "", "steps": steps, "provider": "openai", "model": model}
+            msgs.append({"role": "assistant", "content": m.content or "", "tool_calls": [
+                {"id": tc.id, "type": "function",
+                 "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+                for tc in m.tool_calls]})
+            calls = []
+            for tc in m.tool_calls:
+                try:
+                    args = json.loads(tc.function.arguments or "{}")
+                except Exception:
+                    args = {}
+                calls.append((tc.function.name, args))
+            results = await _exec_all(ctx, calls)
+            for tc, (name, args), result in zip(m.tool_calls, calls, results):
+                steps.append({"tool": name, "args": args, "result": result})
+                msgs.append({"role": "tool", "tool_call_id": tc.id, "content": result})
     return {"reply": "(도구 호출이 너무 많아 중단했습니다)", "steps": steps, "provider": "openai", "model": model}
 
 
 # ─── Anthropic(Claude) ─────────────────────────────────────
-async def _run_anthropic(consumer_id, history, tools, ip) -> dict:
+async def _run_anthropic(ctx: _Ctx, history, tools) -> dict:
     import anthropic
-    client = anthropic.Anthropic()
     model = os.getenv("ANTHROPIC_MODEL", "claude-haiku-4-5-20251001")
     spec = [{"name": t["name"], "description": t["description"], "input_schema": t["schema"]} for t in tools]
     msgs = list(history)
     steps = []
-    for _ in range(MAX_ITERS):
-        resp = client.messages.create(model=model, max_tokens=1024, system=SYSTEM,
-                                      tools=spec or None, messages=msgs)
-        uses = [b for b in resp.content if b.type == "tool_use"]
-        if not uses:
-            text = "".join(b.text for b in resp.content if b.type == "text")
-            return {"reply": text, "steps": steps, "provider": "anthropic", "model": model}
-        msgs.append({"role": "assistant", "content": [b.model_dump() for b in resp.content]})
-        results = []
-        for u in uses:
-            result = await _exec(consumer_id, u.name, u.input or {}, ip)
-            steps.append({"tool": u.name, "args": u.input, "result": result})
-            results.append({"type": "tool_result", "tool_use_id": u.id, "content": result})
-        msgs.append({"role": "user", "content": results})
+    async with anthropic.AsyncAnthropic() as client:
+        for _ in range(MAX_ITERS):
+            resp = await client.messages.create(model=model, max_tokens=1024, system=SYSTEM,
+                                                tools=spec or None, messages=msgs)
+            uses = [b for b in resp.content if b.type == "tool_use"]
+            if not uses:
+                text = "".join(b.text for b in resp.content if b.type == "text")
+                return {"reply": text, "steps": steps, "provider": "anthropic", "model": model}
+            msgs.append({"role": "assistant", "content": [b.model_dump() for b in resp.content]})
+            results = await _exec_all(ctx, [(u.name, u.input or {}) for u in uses])
+            for u, result in zip(uses, results):
+                steps.append({"tool": u.name, "args": u.input, "result": result})
+            msgs.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": u.id, "content": result}
+                for u, result in zip(uses, results)]})
     return {"reply": "(도구 호출이 너무 많아 중단했습니다)", "steps": steps, "provider": "anthropic", "model": model}
 
 
@@ -150,10 +173,12 @@ async def run_chat(consumer_id: str, history: list[dict], enabled: list[str] | N
         p = provider()
     if p not in ("openai", "anthropic"):
         return {"error": "NO_LLM", "detail": "서버에 OPENAI_API_KEY 또는 ANTHROPIC_API_KEY 가 없습니다."}
-    tools = _collect_tools(consumer_id, enabled)
+    subs = db.get_subscriptions(consumer_id)          # 채팅당 한 번 — 도구 목록·구독 검사에 공유
+    tools = _collect_tools(subs, enabled)
+    ctx = _Ctx(consumer_id, subs, ip)
     try:
         if p == "openai":
-            return await _run_openai(consumer_id, history, tools, ip)
-        return await _run_anthropic(consumer_id, history, tools, ip)
+            return await _run_openai(ctx, history, tools)
+        return await _run_anthropic(ctx, history, tools)
     except Exception as e:
         return {"error": "LLM_ERROR", "detail": f"{type(e).__name__}: {e}"}
@@ -7,6 +7,7 @@ SQLite 데이터 레이어 — MCP 레지스트리 + 게이트웨이.
   consumers      : 에이전트(소비자)
   subscriptions  : 컨슈머 ↔ 서버 구독 관계
   tools          : 레지스트리가 서버에서 '자동 수집'한 도구 (inputSchema 포함 — 프록시가 그대로 미러링)
+                   + annotations (readOnlyHint/idempotentHint 등 — 게이트웨이 재시도 정책에 사용)
 
 상태 전이(절대 즉시 삭제하지 않음 — 메타는 보존하고 status 만 바꾼다):
   ONLINE  : 최근 ONLINE_SEC 이내 응답
@@ -54,7 +55,8 @@ def init_db():
             description TEXT NOT NULL DEFAULT '',
             status      TEXT NOT NULL DEFAULT 'UNHEALTHY',
             last_seen   REAL,                        -- 마지막으로 살아있던 시각(epoch)
-            registered_at REAL
+            registered_at REAL,
+            cache_ttl   TEXT NOT NULL DEFAULT '{}'   -- 등록 시 선언한 도구별 결과 캐시 TTL(초) JSON
         );
         CREATE TABLE IF NOT EXISTS consumers (
             id          TEXT PRIMARY KEY,
@@ -73,6 +75,7 @@ def init_db():
             description   TEXT NOT NULL DEFAULT '',
             input_schema  TEXT NOT NULL DEFAULT '{}', -- JSON 문자열 (프록시가 그대로 노출)
             output_schema TEXT NOT NULL DEFAULT '{}', -- JSON 문자열 (있으면 출력 구조)
+            annotations   TEXT NOT NULL DEFAULT '{}', -- JSON 문자열 (MCP ToolAnnotations 힌트)
             PRIMARY KEY (server_id, name)
         );
         CREATE TABLE IF NOT EXISTS calls (        -- 프록시를 통과한 모든 호출 기록
@@ -86,7 +89,8 @@ def init_db():
             error      TEXT,                      -- 에러 코드(실패 시)
             args       TEXT,                      -- 입력 인자(JSON, 잘림)
             result     TEXT,                      -- 출력/에러 텍스트(잘림)
-            ip         TEXT                       -- 요청자 IP (X-Forwarded-For 우선)
+            ip         TEXT,                      -- 요청자 IP (X-Forwarded-For 우선)
+            cache      TEXT                       -- 결과 캐시 대상이면 HIT/MISS, 아니면 NULL
         );
         CREATE INDEX IF NOT EXISTS idx_calls_id ON calls(id DESC);
         CREATE TABLE IF NOT EXISTS demo_seeds (   -- 데모 서버 재등록용 기억(삭제돼도 보존)
@@ -94,9 +98,56 @@ def init_db():
             name        TEXT, endpoint TEXT, owner TEXT, namespace TEXT, description TEXT
         );
         """)
+        _add_column(c, "tools", "annotations", "TEXT NOT NULL DEFAULT '{}'")
+        _add_column(c, "servers", "cache_ttl", "TEXT NOT NULL DEFAULT '{}'")
+        _add_column(c, "calls", "cache", "TEXT")
+        _init_calls_fts(c)
         c.commit()
 
 
+def _add_column(c, table: str, col: str, decl: str) -> None:
+    """기존 DB 업그레이드 — 예전 스키마로 만들어진 테이블에 없는 컬럼만 추가."""
+    if col not in {r["name"] for r in c.execute(f"PRAGMA table_info({table})")}:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
+
+
+# ─── 호출 로그 검색 인덱스(FTS5) ────────────────────────────
+# calls 를 원본(external content)으로 하는 FTS5 인덱스. 트리거가 INSERT/DELETE 를 따라가므로
+# record_call 의 보관 상한 삭제까지 자동 반영된다. trigram 토크나이저면 LIKE '%q%' 와 같은
+# 부분일치를 인덱스로 처리한다(SQLite 3.34+). 없으면 unicode61 + 접두 검색으로 대체.
+_CALLS_FTS_COLS = ["ip", "via", "server_id", "tool", "args", "result"]
+_fts_trigram = True
+
+
+def _init_calls_fts(c) -> None:
+    global _fts_trigram
+    cols = ", ".join(_CALLS_FTS_COLS)
+    new = ", ".join(f"new.{col}" for col in _CALLS_FTS_COLS)
+    old = ", ".join(f"old.{col}" for col in _CALLS_FTS_COLS)
+    exists = c.execute("SELECT sql FROM sqlite_master WHERE name='calls_fts'").fetchone()
+    if exists:
+        _fts_trigram = "trigram" in (exists[0] or "")
+    else:
+        for tok in ("trigram", "unicode61"):
+            try:
+                c.execute(f"""CREATE VIRTUAL TABLE calls_fts USING fts5(
+                    {cols}, content='calls', content_rowid='id', tokenize='{tok}')""")
+                _fts_trigram = tok == "trigram"
+                break
+            except sqlite3.OperationalError:
+                continue
+        # 기존 DB 업그레이드 — 이미 쌓인 로그를 한 번에 색인
+        c.execute("INSERT INTO calls_fts(calls_fts) VALUES('rebuild')")
+    c.executescript(f"""
+    CREATE TRIGGER IF NOT EXISTS calls_fts_ai AFTER INSERT ON calls BEGIN
+        INSERT INTO calls_fts(rowid, {cols}) VALUES (new.id, {new});
+    END;
+    CREATE TRIGGER IF NOT EXISTS calls_fts_ad AFTER DELETE ON calls BEGIN
+        INSERT INTO calls_fts(calls_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+    END;
+    """)
+
+
 def status_for(last_seen: float | None) -> str:
     """last_seen 으로부터 현재 상태를 계산한다."""
     if not last_seen:
@@ -112,15 +163,18 @@ def status_for(last_seen: float | None) -> str:
 
 
 # ─── 서버(SERVER) ──────────────────────────────────────────
-def upsert_server(id, name, endpoint, owner="", namespace="default", description="") -> None:
+def upsert_server(id, name, endpoint, owner="", namespace="default", description="", cache=None) -> None:
+    """cache: {도구명: TTL초} — 등록자가 선언한 결과 캐시 정책. None 이면 기존 선언 유지."""
+    policy = json.dumps(cache, ensure_ascii=False) if cache is not None else None
     with get_conn() as c:
         c.execute(
-            """INSERT INTO servers (id, name, endpoint, owner, namespace, description, registered_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?)
+            """INSERT INTO servers (id, name, endpoint, owner, namespace, description, registered_at, cache_ttl)
+               VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, '{}'))
                ON CONFLICT(id) DO UPDATE SET
                    name=excluded.name, endpoint=excluded.endpoint, owner=excluded.owner,
-                   namespace=excluded.namespace, description=excluded.description""",
-            (id, name, endpoint, owner, namespace, description, now()),
+                   namespace=excluded.namespace, description=excluded.description,
+                   cache_ttl=COALESCE(?, servers.cache_ttl)""",
+            (id, name, endpoint, owner, namespace, description, now(), policy, policy),
         )
         c.commit()
 
@@ -159,15 +213,16 @@ def recompute_statuses() -> None:
 
 
 def set_tools(server_id: str, tools: list[dict]) -> None:
-    """수집한 도구로 통째 교체. tools: [{name, description, input_schema, output_schema}]"""
+    """수집한 도구로 통째 교체. tools: [{name, description, input_schema, output_schema, annotations}]"""
     with get_conn() as c:
         c.execute("DELETE FROM tools WHERE server_id=?", (server_id,))
         c.executemany(
-            """INSERT OR REPLACE INTO tools (server_id, name, description, input_schema, output_schema)
-               VALUES (?, ?, ?, ?, ?)""",
+            """INSERT OR REPLACE INTO tools (server_id, name, description, input_schema, output_schema, annotations)
+               VALUES (?, ?, ?, ?, ?, ?)""",
             [(server_id, t["name"], t.get("description", ""),
               json.dumps(t.get("input_schema", {}), ensure_ascii=False),
-              json.dumps(t.get("output_schema", {}), ensure_ascii=False)) for t in tools],
+              json.dumps(t.get("output_schema", {}), ensure_ascii=False),
+              json.dumps(t.get("annotations", {}), ensure_ascii=False)) for t in tools],
         )
         c.commit()
 
@@ -175,6 +230,7 @@ def set_tools(server_id: str, tools: list[dict]) -> None:
 def _row_to_server(r) -> dict:
     d = dict(r)
     d["status"] = status_for(d.get("last_seen"))  # 항상 실시간 계산값으로 노출
+    d["cache_ttl"] = json.loads(d.get("cache_ttl") or "{}")
     d["tools"] = get_tools(d["id"])
     return d
 
@@ -219,7 +275,8 @@ def delete_all_servers() -> int:
 def get_tools(server_id: str) -> list[dict]:
     with get_conn() as c:
         rows = c.execute(
-            "SELECT name, description, input_schema, output_schema FROM tools WHERE server_id=? ORDER BY name",
+            """SELECT name, description, input_schema, output_schema, annotations
+               FROM tools WHERE server_id=? ORDER BY name""",
             (server_id,),
         ).fetchall()
         out = []
@@ -227,6 +284,7 @@ def get_tools(server_id: str) -> list[dict]:
             d = dict(r)
             d["input_schema"] = json.loads(d["input_schema"] or "{}")
             d["output_schema"] = json.loads(d["output_schema"] or "{}")
+            d["annotations"] = json.loads(d["annotations"] or "{}")
             out.append(d)
         return out
 
@@ -297,16 +355,18 @@ def get_subscriptions(consumer_id: str) -> list[dict]:
 CALL_TEXT_MAX = int(os.getenv("CALL_TEXT_MAX", "800"))   # 로그에 담는 입력/출력 텍스트 길이 상한
 
 
-def record_call(server_id, tool, via, ok, latency_ms, error=None, args=None, result=None, ip=None) -> None:
-    """프록시를 통과한 호출 1건 기록(요청자 IP·입력 args·출력 result 포함) + 상한 초과분 삭제."""
+def record_call(server_id, tool, via, ok, latency_ms, error=None, args=None, result=None, ip=None,
+                cache=None) -> None:
+    """프록시를 통과한 호출 1건 기록(요청자 IP·입력 args·출력 result 포함) + 상한 초과분 삭제.
+       cache: 결과 캐시 대상 도구면 'HIT'(업스트림 생략) / 'MISS'."""
     if isinstance(args, (dict, list)):
         args = json.dumps(args, ensure_ascii=False)
     with get_conn() as c:
         c.execute(
-            """INSERT INTO calls (ts, server_id, tool, via, ok, latency_ms, error, args, result, ip)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            """INSERT INTO calls (ts, server_id, tool, via, ok, latency_ms, error, args, result, ip, cache)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (now(), server_id, tool, via, 1 if ok else 0, int(latency_ms), error,
-             (args or "")[:CALL_TEXT_MAX] or None, (result or "")[:CALL_TEXT_MAX] or None, ip or "-"),
+             (args or "")[:CALL_TEXT_MAX] or None, (result or "")[:CALL_TEXT_MAX] or None, ip or "-", cache),
         )
         # 건수 기준 보관: 최신 CALLS_MAX 개만 남기고 나머지 삭제
         c.execute(
@@ -315,34 +375,69 @@ def record_call(server_id, tool, via, ok, latency_ms, error=None, args=None, res
         c.commit()
 
 
-# 검색 필드 → 대상 컬럼. '통합'은 여러 컬럼을 OR 로 묶어 한 번에 검색.
+# 검색 필드 → 대상 컬럼. '통합'은 여러 컬럼을 한 번에 검색(FTS 컬럼 필터).
 _CALL_SEARCH_FIELDS = {
-    "all":    ["ip", "via", "server_id", "tool"],   # 통합
+    "all":    ["ip", "via", "server_id", "tool", "args", "result"],   # 통합
     "ip":     ["ip"],
     "path":   ["via"],                              # 경로(via)
     "server": ["server_id", "tool"],                # 서버·도구
+    "io":     ["args", "result"],                   # 입력·출력 본문
 }
 
+# 검색 결과 건수는 이 수까지만 센다(넘으면 'N+' 근사치). 수백만 건에서도 COUNT 가 O(상한).
+CALLS_COUNT_CAP = int(os.getenv("CALLS_COUNT_CAP", "1000"))
+
 
-def list_calls(page: int = 1, size: int = 20, q: str = "", field: str = "all") -> dict:
-    """요청 로그 페이지네이션. 최신순(id DESC). q/field 로 검색 필터링."""
-    page = max(1, page); size = max(1, min(size, 200))
+def _fts_match(q: str, cols: list[str]) -> str | None:
+    """검색어 → FTS5 MATCH 식. 인덱스로 못 푸는 짧은 검색어(trigram 은 3글자 미만)면 None."""
+    if _fts_trigram and len(q) < 3:
+        return None
+    phrase = '"' + q.replace('"', '""') + '"' + ("" if _fts_trigram else " *")
+    return "{" + " ".join(cols) + "} : " + phrase
+
+
+def list_calls(size: int = 20, q: str = "", field: str = "all", before: int | None = None) -> dict:
+    """요청 로그 keyset 페이지네이션. 최신순(id DESC), before(직전 페이지 마지막 id) 다음부터.
+       OFFSET 없이 id 인덱스로 바로 점프하므로 로그가 수백만 건이어도 페이지 비용이 일정하다.
+       q/field 검색은 calls_fts 인덱스로 거른다. total 은 근사치(approx=True 면 'total 이상')."""
+    size = max(1, min(size, 200))
     cols = _CALL_SEARCH_FIELDS.get(field, _CALL_SEARCH_FIELDS["all"])
     q = (q or "").strip()
-    where, params = "", []
-    if q:
-        like = f"%{q}%"
-        where = " WHERE (" + " OR ".join(f"{col} LIKE ?" for col in cols) + ")"
-        params = [like] * len(cols)
+    match = _fts_match(q, cols) if q else None
     with get_conn() as c:
-        total = c.execute("SELECT COUNT(*) FROM calls" + where, params).fetchone()[0]
-        rows = c.execute(
-            "SELECT * FROM calls" + where + " ORDER BY id DESC LIMIT ? OFFSET ?",
-            params + [size, (page - 1) * size]
-        ).fetchall()
-    pages = max(1, (total + size - 1) // size)
-    return {"items": [dict(r) for r in rows], "total": total,
-            "page": page, "size": size, "pages": pages, "q": q, "field": field}
+        if match:
+            # FTS 쪽에서 rowid 역순으로 바로 LIMIT — 일치 건 전체를 먼저 모으지 않는다
+            rows = c.execute(
+                "SELECT calls.* FROM calls_fts JOIN calls ON calls.id = calls_fts.rowid"
+                " WHERE calls_fts MATCH ?" + (" AND calls_fts.rowid < ?" if before else "")
+                + " ORDER BY calls_fts.rowid DESC LIMIT ?",
+                [match] + ([before] if before else []) + [size + 1]
+            ).fetchall()
+            total = c.execute("SELECT COUNT(*) FROM (SELECT 1 FROM calls_fts WHERE calls_fts MATCH ? LIMIT ?)",
+                              (match, CALLS_COUNT_CAP + 1)).fetchone()[0]
+        elif q:                                 # 짧은 검색어 — 최신순으로 훑다가 size 채우면 멈춘다
+            like = "(" + " OR ".join(f"{col} LIKE ?" for col in cols) + ")"
+            params = [f"%{q}%"] * len(cols)
+            rows = c.execute(
+                f"SELECT * FROM calls WHERE {like}" + (" AND id < ?" if before else "")
+                + " ORDER BY id DESC LIMIT ?", params + ([before] if before else []) + [size + 1]
+            ).fetchall()
+            total = c.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM calls WHERE {like} LIMIT ?)",
+                              params + [CALLS_COUNT_CAP + 1]).fetchone()[0]
+        else:
+            rows = c.execute(
+                "SELECT * FROM calls" + (" WHERE id < ?" if before else "") + " ORDER BY id DESC LIMIT ?",
+                ([before] if before else []) + [size + 1]
+            ).fetchall()
+            # id 는 연속(앞에서부터만 삭제) → 범위로 건수 계산
+            lo, hi = c.execute("SELECT MIN(id), MAX(id) FROM calls").fetchone()
+            total = (hi - lo + 1) if hi else 0
+        approx = total > CALLS_COUNT_CAP if q else False
+        total = min(total, CALLS_COUNT_CAP) if q else total
+    items = [dict(r) for r in rows[:size]]
+    return {"items": items, "total": total, "approx": approx, "size": size,
+            "next": items[-1]["id"] if len(rows) > size else None,
+            "before": before, "q": q, "field": field}
 
 
 def stats() -> dict:
@@ -14,20 +14,33 @@ MCP 프록시 게이트웨이 (저수준 mcp.server.Server 기반).
   · types.Tool(inputSchema=...) 로 업스트림 스키마를 '그대로' 미러링 → 인자 정보 보존.
   · list_tools/call_tool 는 매 요청마다 DB를 읽으므로, 구독·도구가 바뀌면 즉시 반영(캐시 staleness 없음).
   · OFFLINE/ARCHIVED 서버 호출은 업스트림에 가지 않고 즉시 SERVER_OFFLINE 로 응답.
-  · 세션 매니저는 stateless + json_response → 프록시에 가장 단순한 형태.
+  · 헬스 폴링보다 빠른 차단은 서버별 서킷 브레이커(breaker.py) — 열려 있으면 즉시 CIRCUIT_OPEN.
+  · 도구별 타임아웃(TOOL_TIMEOUT / TOOL_TIMEOUTS), 멱등 도구는 느리면 한 번 더 보내는 hedge(HEDGE_MS).
+  · 인자는 호출 전에 도구 inputSchema 로 검증(validation.py) — 틀리면 업스트림 없이 INVALID_ARGUMENTS.
+  · 읽기 전용 도구는 결과 캐시(cache.py) — 같은 인자 재호출은 업스트림 없이 응답(로그에 HIT/MISS).
+  · 세션 매니저는 엔드포인트별 세션형(json_response) — LRU·유휴 TTL 로 개수를 묶고, 밀려난 매니저는
+    자기 태스크에서 run() 을 빠져나와 세션·태스크를 정리한다(GATEWAY_MANAGERS_MAX / GATEWAY_MANAGER_IDLE_SEC).
+  · 단순 JSON 클라이언트용 stateless 빠른 경로(?stateless=1, X-MCP-Stateless: 1, GATEWAY_STATELESS=1):
+    대상을 요청 경로에서 읽는 '공유 서버 1개'가 처리 → 컨슈머별 세션 상태가 아예 없다.
 """
 
+import os
 import json
 import time
 import asyncio
 import logging
 import contextlib
+from collections import OrderedDict
+from urllib.parse import parse_qs
 
 import mcp.types as types
 from mcp.server.lowlevel import Server
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 
 import db
+import cache
+import breaker
+import validation
 from mcp_client import call_upstream
 
 log = logging.getLogger("gateway")
@@ -35,16 +48,36 @@ log = logging.getLogger("gateway")
 NS = "__"          # 네임스페이스 구분자: travel__search_trips
 DEAD = {"OFFLINE", "ARCHIVED"}
 
-# 엔드포인트별 세션매니저 캐시. list_tools/call_tool 는 DB를 매번 읽으므로 캐시해도 안전.
-_managers: dict[str, StreamableHTTPSessionManager] = {}
-_lock = asyncio.Lock()
-_stack: contextlib.AsyncExitStack | None = None
+# 업스트림 호출 타임아웃(초). 기본값 + 도구별 재정의 'serverid__tool=초,...'
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+TOOL_TIMEOUTS = {
+    k.strip(): float(v) for k, v in
+    (item.split("=", 1) for item in os.getenv("TOOL_TIMEOUTS", "").split(",") if "=" in item)
+}
+# 멱등(readOnlyHint/idempotentHint) 도구가 이 시간(ms) 안에 안 끝나면 같은 호출을 한 번 더 보내
+# 먼저 끝난 쪽을 쓴다(hedged request). 0 이면 끔.
+HEDGE_MS = float(os.getenv("HEDGE_MS", "0"))
+
+# 엔드포인트별 세션매니저 캐시(LRU). list_tools/call_tool 는 DB를 매번 읽으므로 캐시해도 안전.
+MANAGERS_MAX = int(os.getenv("GATEWAY_MANAGERS_MAX", "256"))             # 동시에 살려 둘 매니저 수
+MANAGER_IDLE_SEC = float(os.getenv("GATEWAY_MANAGER_IDLE_SEC", "600"))   # 이만큼 안 쓰이면 정리
+STATELESS_DEFAULT = os.getenv("GATEWAY_STATELESS", "0") == "1"           # 모든 요청을 stateless 로
+_STATELESS_KEY = "*stateless*"
+
 
+class _Slot:
+    """캐시된 세션매니저 1개 + 그 run() 을 붙잡고 있는 전용 태스크."""
 
-def set_exit_stack(stack: contextlib.AsyncExitStack) -> None:
-    """앱 시작 시 호출 — 매니저들의 run() 컨텍스트를 여기에 보관(앱 종료까지 유지)."""
-    global _stack
-    _stack = stack
+    def __init__(self, mgr: StreamableHTTPSessionManager):
+        self.mgr = mgr
+        self.stop = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.active = 0                    # 처리 중인 요청 수(>0 이면 정리 대상 아님)
+        self.used = time.monotonic()
+
+
+_managers: OrderedDict[str, _Slot] = OrderedDict()
+_lock = asyncio.Lock()
 
 
 def _err(payload: dict) -> list[types.ContentBlock]:
@@ -60,6 +93,16 @@ def _text(content: list[types.ContentBlock]) -> str:
     return "\n".join(parts)
 
 
+def _annotations(t: dict) -> types.ToolAnnotations | None:
+    """레지스트리에 저장된 도구 힌트를 그대로 미러링."""
+    return types.ToolAnnotations(**t["annotations"]) if t.get("annotations") else None
+
+
+def _idempotent(t: dict | None) -> bool:
+    a = (t or {}).get("annotations") or {}
+    return bool(a.get("readOnlyHint") or a.get("idempotentHint"))
+
+
 def _ip_of(server: Server) -> str:
     """현재 MCP 요청의 클라이언트 IP. nginx 뒤면 X-Forwarded-For 우선."""
     try:
@@ -70,119 +113,294 @@ def _ip_of(server: Server) -> str:
         return "-"
 
 
-# ─── 서버 빌더 ─────────────────────────────────────────────
-def _consumer_server(consumer_id: str) -> Server:
-    """컨슈머의 구독 서버들을 네임스페이스로 합쳐 노출하는 저수준 MCP 서버."""
-    server = Server(f"marketplace-consumer-{consumer_id}")
-
-    @server.list_tools()
-    async def list_tools() -> list[types.Tool]:
+# ─── 도구 목록 / 호출 (세션형·stateless 공통) ──────────────
+async def _list_tools(kind: str, ident: str) -> list[types.Tool]:
+    """통합(consumers): 구독 서버 도구를 'serverid__tool' 로 합침 / 개별(servers): 이름 그대로."""
+    if kind == "consumers":
         out = []
-        for s in db.get_subscriptions(consumer_id):           # 매 요청 DB 조회 → 항상 최신
+        for s in db.get_subscriptions(ident):                  # 매 요청 DB 조회 → 항상 최신
             for t in s["tools"]:
                 out.append(types.Tool(
                     name=f"{s['id']}{NS}{t['name']}",
                     description=f"[{s['name']}] {t['description']}",
                     inputSchema=t["input_schema"] or {"type": "object", "properties": {}},
+                    annotations=_annotations(t),
                 ))
         return out
+    s = db.get_server(ident)
+    if not s:
+        return []
+    return [types.Tool(
+        name=t["name"], description=t["description"],
+        inputSchema=t["input_schema"] or {"type": "object", "properties": {}},
+        annotations=_annotations(t),
+    ) for t in s["tools"]]
+
+
+async def _call_tool(kind: str, ident: str, name: str, arguments: dict, ip: str) -> list[types.ContentBlock]:
+    if kind == "servers":
+        return await _proxy(ident, name, arguments, via=f"server:{ident}", client_ip=ip)
+    if NS not in name:
+        return _err({"error": "BAD_TOOL_NAME", "detail": f"'serverid{NS}tool' 형식이어야 함", "name": name})
+    sid, tool = name.split(NS, 1)
+    subscribed = {s["id"] for s in db.get_subscriptions(ident)}
+    if sid not in subscribed:
+        return _err({"error": "NOT_SUBSCRIBED", "server": sid, "consumer": ident})
+    return await _proxy(sid, tool, arguments, via=f"consumer:{ident}", client_ip=ip)
+
+
+# ─── 서버 빌더 ─────────────────────────────────────────────
+def _build(kind: str, ident: str) -> Server:
+    """엔드포인트 1개(컨슈머 통합 또는 단일 서버)를 노출하는 저수준 MCP 서버 — 세션형 매니저용."""
+    server = Server(f"marketplace-{kind[:-1]}-{ident}")
+
+    @server.list_tools()
+    async def list_tools() -> list[types.Tool]:
+        return await _list_tools(kind, ident)
 
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[types.ContentBlock]:
-        if NS not in name:
-            return _err({"error": "BAD_TOOL_NAME", "detail": f"'serverid{NS}tool' 형식이어야 함", "name": name})
-        sid, tool = name.split(NS, 1)
-        subscribed = {s["id"] for s in db.get_subscriptions(consumer_id)}
-        if sid not in subscribed:
-            return _err({"error": "NOT_SUBSCRIBED", "server": sid, "consumer": consumer_id})
-        return await _proxy(sid, tool, arguments, via=f"consumer:{consumer_id}", client_ip=_ip_of(server))
+        return await _call_tool(kind, ident, name, arguments, _ip_of(server))
 
     return server
 
 
-def _server_server(server_id: str) -> Server:
-    """단일 서버만 프록시 (도구 이름 그대로)."""
-    server = Server(f"marketplace-server-{server_id}")
+def _shared_server() -> Server:
+    """stateless 빠른 경로 — 대상(kind/id)을 매 요청의 경로에서 읽는 서버 1개를 모든 엔드포인트가 공유."""
+    server = Server("marketplace-stateless")
+
+    def target() -> tuple[str, str]:
+        return _route(server.request_context.request.scope["path"])
 
     @server.list_tools()
     async def list_tools() -> list[types.Tool]:
-        s = db.get_server(server_id)
-        if not s:
-            return []
-        return [types.Tool(
-            name=t["name"], description=t["description"],
-            inputSchema=t["input_schema"] or {"type": "object", "properties": {}},
-        ) for t in s["tools"]]
+        return await _list_tools(*target())
 
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[types.ContentBlock]:
-        return await _proxy(server_id, name, arguments, via=f"server:{server_id}", client_ip=_ip_of(server))
+        return await _call_tool(*target(), name, arguments, _ip_of(server))
 
     return server
 
 
 # ─── 중계 + 사용량 로그 + 장애 처리 ─────────────────────────
+async def _call(endpoint: str, tool: str, arguments: dict, timeout: float, hedge: bool):
+    """타임아웃을 건 업스트림 호출. hedge 면 HEDGE_MS 뒤에도 안 끝날 때 한 번 더 보내 먼저 온 결과를 쓴다."""
+    def once():
+        return asyncio.ensure_future(asyncio.wait_for(call_upstream(endpoint, tool, arguments), timeout))
+
+    first = once()
+    if not hedge:
+        return await first
+    pending, err = {first}, None
+    try:                                        # 기다리는 중 취소돼도 띄운 호출은 finally 에서 같이 취소
+        done, _ = await asyncio.wait(pending, timeout=HEDGE_MS / 1000)
+        if done:
+            return first.result()
+        log.info("HEDGE %s %s (%.0fms 초과)", endpoint, tool, HEDGE_MS)
+        pending.add(once())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for d in done:
+                if d.exception() is None:
+                    return d.result()
+                err = d.exception()
+        raise err
+    finally:
+        for p in pending:
+            p.cancel()
+
+
 async def _proxy(server_id: str, tool: str, arguments: dict, via: str, client_ip: str = "-") -> list[types.ContentBlock]:
     t0 = time.perf_counter()
     s = db.get_server(server_id)
     if not s:
         db.record_call(server_id, tool, via, False, 0, "UNKNOWN_SERVER", arguments, "없는 서버", client_ip)
         return _err({"error": "UNKNOWN_SERVER", "server": server_id})
-    if s["status"] in DEAD:                                    # 죽은 서버 → 업스트림 호출 안 함
+    meta = next((t for t in s["tools"] if t["name"] == tool), None)
+    problems = validation.check(server_id, meta, arguments)
+    if problems:                                               # 스키마 위반 → 업스트림에 보내지 않음
+        db.record_call(server_id, tool, via, False, (time.perf_counter() - t0) * 1000, "INVALID_ARGUMENTS",
+                       arguments, json.dumps(problems, ensure_ascii=False), client_ip)
+        return _err({"error": "INVALID_ARGUMENTS", "server": server_id, "tool": tool, "problems": problems})
+    if s["status"] in DEAD:                                    # 죽은 서버 → 캐시도 업스트림도 안 씀
         log.warning("BLOCK %s %s.%s status=%s", via, server_id, tool, s["status"])
         db.record_call(server_id, tool, via, False, 0, "SERVER_OFFLINE", arguments,
                        f"status={s['status']}", client_ip)
         return _err({"error": "SERVER_OFFLINE", "server": server_id, "status": s["status"]})
+    ttl = cache.ttl_for(s, meta)
+    ckey = cache.key(server_id, tool, arguments) if ttl > 0 else None
+    if ckey and (hit := cache.get(ckey)) is not None:         # 캐시 적중 → 업스트림 생략
+        db.record_call(server_id, tool, via, True, (time.perf_counter() - t0) * 1000, None,
+                       arguments, _text(hit), client_ip, cache="HIT")
+        return hit
+    if not breaker.allow(server_id):                           # 최근 실패가 많음 → 쿨다운 동안 즉시 거절
+        wait = round(breaker.retry_after(server_id), 1)
+        log.warning("CIRCUIT_OPEN %s %s.%s retry_after=%ss", via, server_id, tool, wait)
+        db.record_call(server_id, tool, via, False, 0, "CIRCUIT_OPEN", arguments,
+                       f"retry_after={wait}s", client_ip)
+        return _err({"error": "CIRCUIT_OPEN", "server": server_id, "retry_after": wait})
+    timeout = TOOL_TIMEOUTS.get(f"{server_id}{NS}{tool}", TOOL_TIMEOUT)
     try:
         log.info("PROXY %s(%s) -> %s.%s args=%s", via, client_ip, server_id, tool, arguments)
-        content, is_error = await call_upstream(s["endpoint"], tool, arguments)
-        db.record_call(server_id, tool, via, not is_error, (time.perf_counter() - t0) * 1000,
-                       "TOOL_ERROR" if is_error else None, arguments, _text(content), client_ip)
+        content, is_error = await _call(s["endpoint"], tool, arguments, timeout,
+                                        hedge=HEDGE_MS > 0 and _idempotent(meta))
+        ms = (time.perf_counter() - t0) * 1000
+        breaker.record(server_id, True, ms)                    # 도구 오류도 '서버는 응답함'
+        if ckey and not is_error:
+            cache.put(ckey, content, ttl)
+        db.record_call(server_id, tool, via, not is_error, ms,
+                       "TOOL_ERROR" if is_error else None, arguments, _text(content), client_ip,
+                       cache="MISS" if ckey else None)
         return content   # 도구 오류라도 content(에러 메시지)는 그대로 컨슈머에게 전달
+    except asyncio.TimeoutError:
+        ms = (time.perf_counter() - t0) * 1000
+        log.warning("TIMEOUT %s %s.%s %.0fs", via, server_id, tool, timeout)
+        breaker.record(server_id, False, ms)
+        db.record_call(server_id, tool, via, False, ms, "UPSTREAM_TIMEOUT", arguments,
+                       f"timeout={timeout}s", client_ip)
+        return _err({"error": "UPSTREAM_TIMEOUT", "server": server_id, "timeout": timeout})
     except Exception as e:                                     # 업스트림 통신 실패
+        ms = (time.perf_counter() - t0) * 1000
         log.warning("FAIL %s %s.%s: %s", via, server_id, tool, e)
-        db.record_call(server_id, tool, via, False, (time.perf_counter() - t0) * 1000,
-                       "UPSTREAM_ERROR", arguments, str(e), client_ip)
-        db.recompute_statuses()
+        breaker.record(server_id, False, ms)
+        db.record_call(server_id, tool, via, False, ms, "UPSTREAM_ERROR", arguments, str(e), client_ip)
         return _err({"error": "UPSTREAM_ERROR", "server": server_id, "detail": str(e)})
+    except BaseException:                                      # 취소(클라이언트 끊김 등) → 결과 없음
+        breaker.release(server_id)                             # HALF_OPEN 시험 슬롯을 반납해야 다음 호출이 시험됨
+        raise
 
 
-# ─── 세션 매니저 (엔드포인트별 캐시) ────────────────────────
-async def _get_manager(key: str, build) -> StreamableHTTPSessionManager:
+# ─── 세션 매니저 (엔드포인트별 LRU 캐시) ────────────────────
+async def _serve(slot: _Slot, ready: asyncio.Future) -> None:
+    """매니저의 run() 을 '이 태스크 안에서' 열고 닫는다(anyio 태스크그룹은 같은 태스크에서 나와야 함)."""
+    try:
+        async with slot.mgr.run():
+            ready.set_result(None)
+            await slot.stop.wait()
+    except BaseException as e:
+        if not ready.done():
+            ready.set_exception(e)
+        raise
+
+
+async def _open(mgr: StreamableHTTPSessionManager) -> _Slot:
+    slot = _Slot(mgr)
+    ready = asyncio.get_running_loop().create_future()
+    slot.task = asyncio.create_task(_serve(slot, ready))
+    await ready
+    return slot
+
+
+async def _close(slot: _Slot) -> None:
+    """매니저 1개 종료 — run() 이 빠져나오며 그 매니저의 세션·태스크가 정리된다."""
+    slot.stop.set()
+    with contextlib.suppress(Exception, asyncio.CancelledError):
+        await slot.task
+
+
+def _pop_victims() -> list[_Slot]:
+    """유휴 TTL 을 넘겼거나 상한을 넘친 매니저를 오래된 순으로 골라 캐시에서 뺀다(요청 처리 중인 건 제외)."""
+    t = time.monotonic()
+    over = len(_managers) - MANAGERS_MAX
+    out = []
+    for key, slot in list(_managers.items()):
+        if key == _STATELESS_KEY or slot.active:
+            continue
+        if over > 0 or t - slot.used > MANAGER_IDLE_SEC:
+            out.append(_managers.pop(key))
+            over -= 1
+    return out
+
+
+async def _acquire(key: str, build, stateless: bool = False) -> _Slot:
+    """캐시에서 매니저를 꺼내(없으면 만들어) active 로 표시. 밀려난 매니저는 락 밖에서 닫는다."""
+    async with _lock:
+        slot = _managers.get(key)
+        if slot is None:
+            slot = await _open(StreamableHTTPSessionManager(app=build(), stateless=stateless, json_response=True))
+            _managers[key] = slot
+        _managers.move_to_end(key)
+        slot.active += 1
+        slot.used = time.monotonic()
+        victims = _pop_victims()
+    for v in victims:
+        await _close(v)
+    if victims:
+        log.info("manager 정리 %d개 (남은 %d)", len(victims), len(_managers))
+    return slot
+
+
+async def drop(key: str) -> None:
+    """엔드포인트 매니저 즉시 종료('c:<컨슈머id>' / 's:<서버id>'). 컨슈머·서버 삭제 시 호출."""
     async with _lock:
-        mgr = _managers.get(key)
-        if mgr is None:
-            mgr = StreamableHTTPSessionManager(app=build(), stateless=False, json_response=True)
-            await _stack.enter_async_context(mgr.run())        # 앱 종료까지 유지
-            _managers[key] = mgr
-        return mgr
+        slot = _managers.pop(key, None)
+    if slot:
+        await _close(slot)
+
+
+async def drop_prefix(prefix: str) -> None:
+    """일괄 삭제용 — prefix('c:' / 's:') 로 시작하는 매니저 모두 종료."""
+    async with _lock:
+        slots = [_managers.pop(k) for k in [k for k in _managers if k.startswith(prefix)]]
+    for slot in slots:
+        await _close(slot)
+
+
+async def shutdown() -> None:
+    """앱 종료 시 모든 매니저 종료."""
+    await drop_prefix("")
+
+
+def snapshot() -> dict:
+    """대시보드/벤치용 — 살아있는 매니저 수."""
+    return {"managers": len(_managers), "max": MANAGERS_MAX, "idle_sec": MANAGER_IDLE_SEC}
 
 
 # ─── ASGI 진입점 (main 에서 /mcp 아래에 마운트) ─────────────
+def _route(path: str) -> tuple[str, str]:
+    """경로에서 'consumers'/'servers' 키워드를 찾고, 대상 id 는 '마지막 세그먼트'.
+        · /mcp/consumers/<id>                 (통합)
+        · /mcp/servers/<id>                   (개별 — 구버전)
+        · /mcp/servers/<namespace>/<id>       (개별 — namespace 표시, id 가 유일하므로 라우팅 동일)
+       (nginx prefix·root_path·마운트 방식에 무관하게 동작)"""
+    segs = [p for p in path.split("/") if p]
+    ident = segs[-1] if segs else ""
+    kind = "consumers" if "consumers" in segs else ("servers" if "servers" in segs else "")
+    return kind, ident
+
+
+def _wants_stateless(scope) -> bool:
+    if STATELESS_DEFAULT:
+        return True
+    if parse_qs(scope.get("query_string", b"").decode()).get("stateless") == ["1"]:
+        return True
+    return any(k == b"x-mcp-stateless" and v == b"1" for k, v in scope.get("headers", []))
+
+
 async def gateway_asgi(scope, receive, send) -> None:
     if scope["type"] != "http":
         return
     # 게이트웨이(MCP streamable-http)는 토큰 불필요 — MCP 표준대로 개방.
     # (인증이 필요한 건 레지스트리 관리 API 와 채팅뿐이다. → app.py require_token)
-    # 경로에서 'consumers'/'servers' 키워드를 찾고, 대상 id 는 '마지막 세그먼트'.
-    #  · /mcp/consumers/<id>                 (통합)
-    #  · /mcp/servers/<id>                   (개별 — 구버전)
-    #  · /mcp/servers/<namespace>/<id>       (개별 — namespace 표시, id 가 유일하므로 라우팅 동일)
-    #  (nginx prefix·root_path·마운트 방식에 무관하게 동작)
-    segs = [p for p in scope["path"].split("/") if p]
-    ident = segs[-1] if segs else ""
-    kind = "consumers" if "consumers" in segs else ("servers" if "servers" in segs else "")
+    kind, ident = _route(scope["path"])
     if kind == "consumers":
         if not db.get_consumer(ident):
             return await _send_404(send, f"unknown consumer: {ident}")
-        mgr = await _get_manager(f"c:{ident}", lambda: _consumer_server(ident))
     elif kind == "servers":
         if not db.get_server(ident):
             return await _send_404(send, f"unknown server: {ident}")
-        mgr = await _get_manager(f"s:{ident}", lambda: _server_server(ident))
     else:
         return await _send_404(send, "use /mcp/consumers/<id> or /mcp/servers/<id>")
-    await mgr.handle_request(scope, receive, send)
+    if _wants_stateless(scope):
+        slot = await _acquire(_STATELESS_KEY, _shared_server, stateless=True)
+    else:
+        slot = await _acquire(f"{kind[0]}:{ident}", lambda: _build(kind, ident))
+    try:
+        await slot.mgr.handle_request(scope, receive, send)
+    finally:
+        slot.active -= 1
+        slot.used = time.monotonic()
 
 
 async def _send_404(send, msg: str) -> None:
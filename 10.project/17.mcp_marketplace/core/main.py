@@ -7,7 +7,8 @@
 
 부가 기능
   · lifespan 에서 헬스 폴링 태스크 시작 — 주기적으로 모든 서버에 접속해 last_seen/도구 갱신.
-  · AsyncExitStack 을 게이트웨이에 넘겨, 엔드포인트별 세션매니저 run() 을 앱 종료까지 유지.
+  · 게이트웨이 세션매니저는 각자 전용 태스크에서 run() — 종료 시 gateway.shutdown() 으로 모두 정리.
+  · 이 ASGI 루프를 bgloop 에 등록 → Flask 핸들러의 async 작업도 같은 루프에서 실행(요청마다 asyncio.run 없음).
 
 실행 (개발)   : uvicorn main:app --port 8000   (core/ 안에서)
 실행 (배포)   : uvicorn main:app --host 0.0.0.0 --port 8000 --root-path /mcp-market
@@ -31,6 +32,7 @@ from starlette.routing import Mount
 from starlette.middleware.wsgi import WSGIMiddleware
 
 import db
+import bgloop
 import gateway
 from app import flask_app
 from mcp_client import probe_tools
@@ -45,14 +47,18 @@ PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "5"))
 
 
 async def _poll_once() -> None:
-    """모든 등록 서버에 접속해 살아있으면 last_seen/도구 갱신. 죽었으면 상태만 내려간다."""
-    for s in db.all_endpoints():
-        try:
-            tools = await asyncio.wait_for(probe_tools(s["endpoint"]), timeout=PROBE_TIMEOUT)
-            db.set_tools(s["id"], tools)
-            db.mark_seen(s["id"])
-        except Exception as e:
-            log.info("health: %s 응답없음 (%s)", s["id"], type(e).__name__)
+    """모든 등록 서버에 '동시에' 접속해 살아있으면 last_seen/도구 갱신. 죽었으면 상태만 내려간다."""
+    servers = db.all_endpoints()
+    results = await asyncio.gather(
+        *(asyncio.wait_for(probe_tools(s["endpoint"]), timeout=PROBE_TIMEOUT) for s in servers),
+        return_exceptions=True,
+    )
+    for s, res in zip(servers, results):
+        if isinstance(res, BaseException):
+            log.info("health: %s 응답없음 (%s)", s["id"], type(res).__name__)
+            continue
+        db.set_tools(s["id"], res)
+        db.mark_seen(s["id"])
     db.recompute_statuses()
 
 
@@ -68,16 +74,17 @@ async def _health_loop() -> None:
 @contextlib.asynccontextmanager
 async def lifespan(app):
     db.init_db()
-    async with contextlib.AsyncExitStack() as stack:
-        gateway.set_exit_stack(stack)          # 게이트웨이 세션매니저들이 여기서 살아있음
-        poller = asyncio.create_task(_health_loop())
-        log.info("마켓플레이스 시작 — 헬스 폴링 %ds 주기", POLL_SEC)
-        try:
-            yield
-        finally:
-            poller.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await poller
+    bgloop.bind(asyncio.get_running_loop())   # Flask 핸들러의 async 작업도 이 루프에서
+    poller = asyncio.create_task(_health_loop())
+    log.info("마켓플레이스 시작 — 헬스 폴링 %ds 주기", POLL_SEC)
+    try:
+        yield
+    finally:
+        bgloop.bind(None)
+        poller.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await poller
+        await gateway.shutdown()               # 남은 세션매니저들의 run() 정리
 
 
 app = Starlette(
@@ -25,6 +25,9 @@ async def probe_tools(endpoint: str) -> list[dict]:
                     "description": t.description or "",
                     "input_schema": t.inputSchema or {"type": "object", "properties": {}},
                     "output_schema": getattr(t, "outputSchema", None) or {},
+                    # readOnlyHint/idempotentHint 등 — 게이트웨이가 재시도(hedge)·캐시 판단에 쓴다
+                    "annotations": (t.annotations.model_dump(exclude_none=True)
+                                    if getattr(t, "annotations", None) else {}),
                 }
                 for t in tools
             ]
@@ -0,0 +1,71 @@
+"""
+게이트웨이 입구의 인자 검증 — 레지스트리에 저장된 도구 inputSchema 로 미리 걸러낸다.
+
+잘못된 인자는 예전엔 업스트림에 접속·핸드셰이크·호출까지 다 한 뒤에야 TOOL_ERROR 로 돌아왔다.
+이제 _proxy 가 호출 전에 검사해서 INVALID_ARGUMENTS 로 즉시 응답한다(업스트림 왕복·부하 0).
+
+  · 검증기(jsonschema Validator)는 (서버, 도구)마다 한 번만 컴파일해 메모리에 둔다.
+    스키마가 바뀌면(재수집으로 '도구 버전'이 바뀜) 지문이 달라져 자동으로 다시 컴파일.
+  · jsonschema 미설치 / 스키마 자체가 잘못된 경우엔 검사를 건너뛴다(업스트림이 판단).
+
+환경변수
+  VALIDATE_ARGS   '0' 이면 검증 끔(기본 1)
+"""
+
+import os
+import json
+import hashlib
+import importlib.util
+
+ENABLED = os.getenv("VALIDATE_ARGS", "1") == "1" and importlib.util.find_spec("jsonschema") is not None
+MAX_ERRORS = 5     # 응답에 담을 오류 개수 상한
+
+_validators: dict[tuple[str, str], tuple[str, object | None]] = {}   # (서버, 도구) → (스키마 지문, 검증기)
+
+
+def _fingerprint(schema: dict) -> str:
+    return hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+def _compile(schema: dict):
+    from jsonschema import validators
+    from jsonschema.exceptions import SchemaError
+    cls = validators.validator_for(schema)
+    try:
+        cls.check_schema(schema)
+    except SchemaError:
+        return None                                      # 스키마가 잘못됨 → 검사 생략
+    return cls(schema)
+
+
+def _validator(server_id: str, tool: str, schema: dict):
+    fp = _fingerprint(schema)
+    hit = _validators.get((server_id, tool))
+    if hit and hit[0] == fp:
+        return hit[1]
+    v = _compile(schema)
+    _validators[(server_id, tool)] = (fp, v)
+    return v
+
+
+def check(server_id: str, tool: dict | None, arguments: dict | None) -> list[dict]:
+    """인자가 도구 inputSchema 에 맞는지. 문제가 있으면 [{path, message}], 없으면 []."""
+    if not ENABLED or not tool or not tool.get("input_schema"):
+        return []
+    v = _validator(server_id, tool["name"], tool["input_schema"])
+    if v is None:
+        return []
+    errors = sorted(v.iter_errors(arguments or {}), key=lambda e: [str(p) for p in e.absolute_path])
+    return [{"path": "/".join(str(p) for p in e.absolute_path) or "(root)", "message": e.message}
+            for e in errors[:MAX_ERRORS]]
+
+
+def forget(server_id: str) -> None:
+    """서버 삭제 시 그 서버 검증기 정리."""
+    for k in [k for k in list(_validators) if k[0] == server_id]:
+        _validators.pop(k, None)
+
+
+def clear() -> None:
+    """서버 일괄 삭제 시 검증기 전부 정리."""
+    _validators.clear()
@@ -21,8 +21,9 @@ TOKEN = os.getenv("MARKET_TOKEN", "").strip()
 _HEADERS = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
 
 
-def self_register(server_id, name, port, owner="", description="", namespace="demo", delay=2.0):
-    """백그라운드 스레드에서 잠시 후 레지스트리에 등록한다(서버가 뜬 뒤 등록되도록)."""
+def self_register(server_id, name, port, owner="", description="", namespace="demo", delay=2.0, cache=None):
+    """백그라운드 스레드에서 잠시 후 레지스트리에 등록한다(서버가 뜬 뒤 등록되도록).
+       cache: {도구명: TTL초} — 게이트웨이 결과 캐시를 쓸 읽기 전용 도구 선언(선택)."""
     endpoint = f"http://{SELF_HOST}:{port}/mcp"
 
     def _register():
@@ -31,6 +32,7 @@ def self_register(server_id, name, port, owner="", description="", namespace="de
             r = requests.post(f"{REGISTRY}/api/servers", timeout=15, headers=_HEADERS, json={
                 "id": server_id, "name": name, "endpoint": endpoint,
                 "owner": owner, "namespace": namespace, "description": description,
+                **({"cache": cache} if cache else {}),
             })
             tools = [t["name"] for t in r.json().get("tools", [])]
             print(f"[self-register] {server_id} → {REGISTRY}  tools={tools}")
@@ -45,6 +45,8 @@ def list_orders() -> str:
 
 
 if __name__ == "__main__":
-    self_register("shopping", "Shopping MCP", PORT, owner="2조", description="상품 검색/주문")
+    # 등록 시 결과 캐시 선언 — 검색은 30초 캐시, 주문(place_order)은 부작용이 있으니 선언하지 않는다
+    self_register("shopping", "Shopping MCP", PORT, owner="2조", description="상품 검색/주문",
+                  cache={"search_products": 30})
     print(f"Shopping MCP → http://127.0.0.1:{PORT}/mcp")
     mcp.run(transport="streamable-http")
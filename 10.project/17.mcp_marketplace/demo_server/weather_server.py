@@ -2,6 +2,7 @@
 
 import os
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 from _selfreg import self_register
 
 PORT = 8002
@@ -16,13 +17,14 @@ FORECAST = {
 }
 
 
-@mcp.tool()
+# 읽기 전용 힌트 → 게이트웨이가 같은 인자 호출을 결과 캐시로 응답한다(CACHE_TTL)
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 def get_weather(city: str) -> str:
     """도시의 현재 날씨를 알려준다."""
     return f"{city}: {FORECAST.get(city, '예보 없음 (데모 데이터)')}"
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 def pack_advice(city: str) -> str:
     """도시 날씨에 맞춰 챙길 물건을 추천한다."""
     w = FORECAST.get(city, "")
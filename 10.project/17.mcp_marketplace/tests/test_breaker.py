@@ -0,0 +1,88 @@
+# tests/test_breaker.py
+"""
+서킷 브레이커 테스트 — HALF_OPEN 시험 호출이 취소돼도 브레이커가 영구히 막히지 않는지
+
+실행 (17.mcp_marketplace/ 에서):  python -m pytest -q tests
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import breaker
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """쿨다운 0 으로 OPEN 까지 몰아넣은 서버 id (다음 allow 가 HALF_OPEN 시험 호출)."""
+    monkeypatch.setattr(breaker, "COOLDOWN_SEC", 0)
+    sid = "bt-server"
+    breaker.forget(sid)
+    for _ in range(breaker.MIN_CALLS):
+        breaker.record(sid, False, 1)
+    assert breaker.snapshot()[sid]["state"] == breaker.OPEN
+    yield sid
+    breaker.forget(sid)
+
+
+def test_half_open_allows_single_trial(half_open):
+    assert breaker.allow(half_open) is True
+    assert breaker.allow(half_open) is False          # 시험 호출 진행 중 → 나머지는 거절
+
+
+def test_released_trial_can_be_retried(half_open):
+    assert breaker.allow(half_open) is True
+    breaker.release(half_open)                        # 시험 호출이 결과 없이 끝남
+    assert breaker.snapshot()[half_open]["state"] == breaker.HALF_OPEN
+    assert breaker.allow(half_open) is True
+
+
+def test_cancelled_trial_through_proxy_releases_slot(half_open, monkeypatch):
+    pytest.importorskip("mcp")
+    import db
+    import cache
+    import gateway
+
+    monkeypatch.setattr(db, "get_server", lambda sid: {
+        "id": sid, "endpoint": "http://upstream.invalid/mcp", "status": "ONLINE", "tools": []})
+    monkeypatch.setattr(db, "record_call", lambda *a, **k: None)
+    monkeypatch.setattr(cache, "ttl_for", lambda server, tool: 0)
+
+    async def cancelled(*a, **k):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(gateway, "_call", cancelled)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(gateway._proxy(half_open, "get_weather", {}, "test"))
+    assert breaker.allow(half_open) is True           # 슬롯이 반납돼 다음 호출이 시험 호출이 된다
+
+
+def test_cancelled_hedge_wait_cancels_upstream_call(monkeypatch):
+    pytest.importorskip("mcp")
+    import gateway
+
+    state = {}
+
+    async def slow_upstream(endpoint, tool, arguments):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    monkeypatch.setattr(gateway, "call_upstream", slow_upstream)
+    monkeypatch.setattr(gateway, "HEDGE_MS", 1000)
+
+    async def scenario():
+        task = asyncio.ensure_future(gateway._call("http://upstream.invalid/mcp", "t", {}, 30, hedge=True))
+        await asyncio.sleep(0.05)                     # 첫 호출의 hedge 대기 중에 호출자가 취소됨
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)
+        assert state.get("cancelled") is True         # 업스트림 호출이 고아로 남지 않는다
+
+    asyncio.run(scenario())
@@ -12,11 +12,15 @@ app.py 는 이 함수들을 호출만 하는 얇은 컨트롤러가 된다.
 """
 
 import os
+import sys
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # 8.web_app
+from shared.embedding_cache import cached     # #4/#5 공유 모듈 (8.web_app/shared/)
+
 DATA_DIR        = "../DATA"         # 1~5 공유 (= 8.web_app/DATA)
 PERSIST_DIR     = "../chroma_db"    # 벡터 DB 도 8.web_app 안에서 공유
 COLLECTION_NAME = "rag_web"
@@ -24,7 +28,8 @@ COLLECTION_NAME = "rag_web"
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # persist_directory 를 주면, 이 객체를 만드는 순간 디스크의 기존 문서를 로드한다.
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# 임베딩은 디스크 캐시(../shared/embedding_cache.py)를 거친다 — 같은 청크/질문은 API 재호출 없음
+embeddings = cached(OpenAIEmbeddings(model="text-embedding-3-small"))
 store = Chroma(
     collection_name=COLLECTION_NAME,
     embedding_function=embeddings,
@@ -11,15 +11,19 @@ Flask RAG REST API #5 (1단계) — REST API + 최소 GUI(정적 HTML).
   ※ 삭제는 2단계(app2_delete.py), 문서 선택 검색은 3단계(app3_select.py).
 
 REST 답게 리소스 중심 경로:
-  POST /files   (파일 리소스 생성=업로드, 여러 개 가능)
-  GET  /files   (목록)
-  POST /ask     (질문)
+  POST /files      (파일 리소스 생성=업로드, 여러 개 가능) → 202 + 작업 id (바로 응답)
+  GET  /jobs/<id>  (수집 작업 상태: queued/parsing/embedding/done/error)
+  GET  /files      (목록)
+  POST /ask        (질문)
+
+  ※ 파싱·임베딩은 services/jobs.py 의 워커 풀이 뒤에서 처리한다.
 
 실행:
   python app.py        # → http://localhost:5004  (브라우저로 열면 GUI)
 
 테스트 (curl, GUI 없이 API 만):
   curl -F "file=@sample.pdf" http://localhost:5004/files
+  curl http://localhost:5004/jobs/<id>
   curl http://localhost:5004/files
   curl -X POST http://localhost:5004/ask -H "Content-Type: application/json" -d "{\"question\":\"질문\"}"
 """
@@ -27,8 +31,9 @@ REST 답게 리소스 중심 경로:
 import os
 from flask import Flask, request, jsonify, send_from_directory
 
-from services.vectorstore import add_pdf, list_documents, DATA_DIR
+from services.vectorstore import list_documents, staging_path, DATA_DIR
 from services.qa_service import answer_question
+from services import jobs
 
 app = Flask(__name__)
 
@@ -47,26 +52,27 @@ def upload():
     if not uploaded:
         return jsonify({"error": "파일이 없습니다"}), 400
 
-    results = []
+    queued = []
     for file in uploaded:
         if not file or not file.filename:
             continue
         path = os.path.join(DATA_DIR, file.filename)
-        file.save(path)
-        results.append(add_pdf(path))
-
-    added   = [r["source"] for r in results if r["added"]]
-    skipped = [r["source"] for r in results if not r["added"]]
-    parts = []
-    if added:
-        parts.append(f"추가됨: {', '.join(added)}")
-    if skipped:
-        parts.append(f"건너뜀(중복): {', '.join(skipped)}")
+        staged = staging_path(path)          # 같은 이름을 아직 처리 중일 수 있으니 임시 이름으로 받고
+        file.save(staged)
+        queued.append(jobs.submit(path, staged=staged))     # 문서 락 안에서 제자리로 옮긴 뒤 파싱/임베딩
 
     return jsonify({
-        "message": " / ".join(parts) or "처리할 파일이 없습니다",
-        "files": list_documents(),
-    }), 201
+        "message": f"접수됨: {', '.join(j['source'] for j in queued)}" if queued else "처리할 파일이 없습니다",
+        "jobs": queued,
+    }), 202
+
+
+@app.get("/jobs/<job_id>")
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "작업이 없습니다"}), 404
+    return jsonify(job)
 
 
 @app.get("/files")
@@ -24,7 +24,7 @@ app2_delete.py(2단계) 와의 diff — 딱 세 군데만 늘어남:
 import os
 from flask import Flask, request, jsonify, send_from_directory
 
-from services.vectorstore import add_pdf, list_documents, delete_document, DATA_DIR
+from services.vectorstore import add_pdf, list_documents, delete_document, staging_path, DATA_DIR
 from services.qa_service import answer_question
 
 app = Flask(__name__)
@@ -49,8 +49,9 @@ def upload():
         if not file or not file.filename:
             continue
         path = os.path.join(DATA_DIR, file.filename)
-        file.save(path)
-        results.append(add_pdf(path))
+        staged = staging_path(path)
+        file.save(staged)
+        results.append(add_pdf(path, staged=staged))
 
     added   = [r["source"] for r in results if r["added"]]
     skipped = [r["source"] for r in results if not r["added"]]
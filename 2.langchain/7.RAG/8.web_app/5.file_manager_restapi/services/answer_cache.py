@@ -0,0 +1,130 @@
+"""
+의미 기반 답변 캐시 — 거의 같은 질문이 다시 오면 검색·LLM 생성 없이 저장해 둔 답을 바로 돌려준다.
+
+  · 질문을 임베딩해서, 예전에 답한 질문들 중 코사인 유사도가 ANSWER_CACHE_THRESHOLD 이상인 것을 찾는다.
+  · 답을 저장할 때 '근거로 쓴 문서와 그 문서의 버전' 을 같이 적어 둔다.
+    꺼낼 때 문서가 지워졌거나 다시 올라와 버전이 바뀌었으면 그 항목은 버리고 새로 답한다.
+  · 문서 삭제/재업로드 시 invalidate(source) 로 그 문서를 인용한 항목을 바로 지운다.
+  · scope: 같은 질문이라도 검색 범위(선택 문서)가 다르면 다른 답 → 범위가 같은 항목끼리만 비교.
+
+저장은 SQLite(질문 벡터는 float16), 비교는 메모리의 numpy 행렬 한 번 곱셈.
+
+이 파일이 원본이다. 10.project/13.document_qa/answer_cache.py 는 폴더 하나로 따로 실행되는 예제라
+복사본을 두었다 — 고칠 때는 여기를 고치고 그대로 복사한다.
+
+환경변수
+  ANSWER_CACHE             '0' 이면 끔(기본 1, numpy 없으면 자동으로 끔)
+  ANSWER_CACHE_THRESHOLD   같은 질문으로 볼 코사인 유사도(기본 0.95)
+  ANSWER_CACHE_MAX         최대 항목 수(넘으면 오래된 것부터 삭제, 기본 2000)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+ENABLED   = os.getenv("ANSWER_CACHE", "1") == "1" and NUMPY_AVAILABLE
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+MAX_ITEMS = int(os.getenv("ANSWER_CACHE_MAX", "2000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers(
+  id         INTEGER PRIMARY KEY,
+  scope      TEXT NOT NULL,
+  question   TEXT NOT NULL,
+  vec        BLOB NOT NULL,        -- float16, 정규화된 질문 벡터
+  answer     TEXT NOT NULL,        -- JSON (앱이 돌려줄 응답 그대로)
+  created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answer_sources(
+  answer_id INTEGER NOT NULL REFERENCES answers(id) ON DELETE CASCADE,
+  source    TEXT NOT NULL,
+  version   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answer_sources_source ON answer_sources(source);
+"""
+
+
+class AnswerCache:
+    def __init__(self, path: str, embeddings):
+        self.embeddings = embeddings
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._ids, self._scopes, self._mat = [], [], None    # 메모리 행렬 (쓰기 후 다시 만듦)
+
+    def _load(self) -> None:
+        """SQLite → 메모리 행렬(_lock 안에서 호출)."""
+        rows = self._conn.execute("SELECT id, scope, vec FROM answers ORDER BY id").fetchall()
+        self._ids = [r[0] for r in rows]
+        self._scopes = [r[1] for r in rows]
+        self._mat = (np.stack([np.frombuffer(r[2], dtype=np.float16) for r in rows]).astype(np.float32)
+                     if rows else np.zeros((0, 0), dtype=np.float32))
+
+    def _embed(self, question: str, vec=None):
+        v = np.asarray(vec if vec is not None else self.embeddings.embed_query(question), dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def lookup(self, question: str, scope: str, version_of, vec=None) -> tuple[dict | None, object]:
+        """(저장된 답 또는 None, 질문 벡터). version_of(source) → 현재 버전(없으면 None).
+        vec: 이미 계산한 질문 임베딩이 있으면 넘긴다(없으면 여기서 임베딩).
+        돌려준 질문 벡터는 miss 뒤 store() 에 넘겨 다시 임베딩하지 않게 한다."""
+        if not ENABLED:
+            return None, None
+        vec = self._embed(question, vec)
+        with self._lock:
+            if self._mat is None:
+                self._load()
+            if not self._ids or self._mat.shape[1] != vec.shape[0]:
+                return None, vec
+            sims = self._mat @ vec
+            for i in np.argsort(-sims):
+                if sims[i] < THRESHOLD:
+                    break
+                if self._scopes[i] != scope:
+                    continue
+                aid = self._ids[i]
+                cited = self._conn.execute("SELECT source, version FROM answer_sources WHERE answer_id=?",
+                                           (aid,)).fetchall()
+                if any(version_of(s) != v for s, v in cited):     # 근거 문서가 지워졌거나 바뀜 → 버림
+                    with self._conn:
+                        self._conn.execute("DELETE FROM answers WHERE id=?", (aid,))
+                    self._mat = None
+                    return None, vec
+                row = self._conn.execute("SELECT answer FROM answers WHERE id=?", (aid,)).fetchone()
+                return json.loads(row[0]), vec
+        return None, vec
+
+    def store(self, question: str, vec, scope: str, answer: dict, cited: dict[str, str]) -> None:
+        """answer 를 저장. cited = {근거 문서: 그 문서의 현재 버전}."""
+        if not ENABLED or vec is None:
+            return
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO answers(scope, question, vec, answer, created_at) VALUES(?,?,?,?,?)",
+                (scope, question, vec.astype(np.float16).tobytes(), json.dumps(answer, ensure_ascii=False),
+                 time.time()))
+            self._conn.executemany("INSERT INTO answer_sources(answer_id, source, version) VALUES(?,?,?)",
+                                   [(cur.lastrowid, s, str(v)) for s, v in cited.items()])
+            self._conn.execute("DELETE FROM answers WHERE id <= "
+                               "(SELECT id FROM answers ORDER BY id DESC LIMIT 1 OFFSET ?)", (MAX_ITEMS,))
+            self._mat = None
+
+    def invalidate(self, source: str) -> int:
+        """source 를 인용한 답을 모두 지운다(문서 삭제/재업로드 시)."""
+        with self._lock, self._conn:
+            n = self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT answer_id FROM answer_sources WHERE source=?)",
+                (source,)).rowcount
+            if n:
+                self._mat = None
+        return n
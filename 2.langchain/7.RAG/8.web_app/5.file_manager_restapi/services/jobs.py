@@ -0,0 +1,66 @@
+"""
+수집(ingestion) 작업 큐 — 업로드 요청은 파일 저장 + 작업 등록만 하고 바로 응답한다.
+
+예전 POST /files 는 요청 안에서 PDF 파싱 → 청킹 → 임베딩 API 호출까지 끝내야 응답했다
+→ 여러 파일을 올리면 Flask 워커 하나가 몇 분씩 묶였다.
+이제 워커 풀(INGEST_WORKERS 개 스레드)이 뒤에서 add_pdf 를 돌리고,
+클라이언트는 GET /jobs/<id> 로 상태를 확인한다.
+
+  status : queued → parsing → embedding → done   (실패하면 error)
+
+작업 기록은 메모리에만 둔다(서버 재시작 시 사라짐). 끝난 작업은 최근 JOBS_KEEP 개만 보관.
+"""
+
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.vectorstore import add_pdf
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOBS_KEEP      = int(os.getenv("JOBS_KEEP", "1000"))
+
+_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_jobs: dict[str, dict] = {}      # 삽입 순서 = 등록 순서
+_lock = threading.Lock()
+
+
+def _set(job_id: str, **fields) -> None:
+    with _lock:
+        _jobs[job_id].update(fields, updated_at=time.time())
+
+
+def _run(job_id: str, path: str, staged: str | None) -> None:
+    try:
+        result = add_pdf(path, on_status=lambda status: _set(job_id, status=status), staged=staged)
+        _set(job_id, status="done", result=result)
+    except Exception as e:
+        _set(job_id, status="error", error=f"{type(e).__name__}: {e}")
+
+
+def _trim() -> None:
+    """끝난 작업이 JOBS_KEEP 개를 넘으면 오래된 것부터 버림(_lock 안에서 호출)."""
+    finished = [k for k, j in _jobs.items() if j["status"] in ("done", "error")]
+    for k in finished[:max(0, len(finished) - JOBS_KEEP)]:
+        del _jobs[k]
+
+
+def submit(path: str, staged: str | None = None) -> dict:
+    """파일 하나를 큐에 넣고 작업 정보를 돌려준다. staged: 임시 이름으로 받은 업로드(add_pdf 참고)."""
+    job_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    job = {"id": job_id, "source": os.path.basename(path), "status": "queued",
+           "result": None, "error": None, "created_at": now, "updated_at": now}
+    with _lock:
+        _trim()
+        _jobs[job_id] = job
+    _pool.submit(_run, job_id, path, staged)
+    return dict(job)
+
+
+def get(job_id: str) -> dict | None:
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
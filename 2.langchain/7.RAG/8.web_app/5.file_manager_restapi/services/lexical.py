@@ -0,0 +1,91 @@
+"""
+어휘(BM25) 인덱스 — Chroma 와 같은 청크를 SQLite FTS5 에도 넣어 두고 키워드로 찾는다.
+
+벡터 검색은 '비슷한 뜻' 에 강하지만 모델명·오류코드·고유명사처럼 글자가 정확히 맞아야 하는
+질문에는 약하다. FTS5 의 bm25() 순위로 그 빈틈을 채우고, qa_service 가 두 결과를 합친다(RRF).
+
+  chunks_fts(id, source, page, content)   · id = Chroma 청크 ID (vectorstore.py 와 같은 값)
+    · 토크나이저 unicode61 + 접두 인덱스 → '문서를' 같은 조사 붙은 말도 '문서*' 로 맞춘다
+
+동기화: vectorstore.py 가 Chroma 에 청크를 넣고/지울 때 여기도 같이 반영한다(증분).
+처음 실행할 때 표가 비어 있고 Chroma 에 청크가 있으면 한 번만 전체를 옮겨 담는다.
+"""
+
+import re
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+  id UNINDEXED, source UNINDEXED, page UNINDEXED, content,
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+"""
+
+
+# 질문 쪽 단어 끝의 흔한 조사 — 떼어 낸 어간으로 접두 검색한다('에러는' → '에러*')
+_PARTICLES = ("에서는", "으로는", "에서", "으로", "에게", "까지", "부터", "보다", "은", "는", "이", "가",
+              "을", "를", "에", "의", "도", "로", "와", "과", "만")
+
+
+def _stem(word: str) -> str:
+    for p in _PARTICLES:
+        if word.endswith(p) and len(word) - len(p) >= 2:
+            return word[:-len(p)]
+    return word
+
+
+def _match_query(question: str) -> str:
+    """질문 → FTS5 MATCH 식. 단어마다 접두 검색, OR 로 묶어 bm25 가 많이 맞는 청크를 올리게 한다."""
+    words = {_stem(w) for w in re.findall(r"\w+", question) if len(w) >= 2}
+    return " OR ".join(f'"{w}"*' for w in sorted(words))
+
+
+class LexicalIndex:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def upsert(self, ids: list[str], texts: list[str], metadatas: list[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks_fts WHERE id=?", [(i,) for i in ids])
+            self._conn.executemany(
+                "INSERT INTO chunks_fts(id, source, page, content) VALUES(?,?,?,?)",
+                [(i, m.get("source"), m.get("page"), t) for i, t, m in zip(ids, texts, metadatas)])
+
+    def update_pages(self, ids: list[str], metadatas: list[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE chunks_fts SET page=? WHERE id=?",
+                                   [(m.get("page"), i) for i, m in zip(ids, metadatas)])
+
+    def delete_ids(self, ids: list[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks_fts WHERE id=?", [(i,) for i in ids])
+
+    def delete_source(self, source: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks_fts WHERE source=?", (source,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+
+    def search(self, question: str, k: int = 20, sources: list[str] | None = None) -> list[dict]:
+        """bm25 순위 상위 k 개 [{id, source, page, content}] (가까운 순)."""
+        q = _match_query(question)
+        if not q:
+            return []
+        sql = "SELECT id, source, page, content FROM chunks_fts WHERE chunks_fts MATCH ?"
+        args: list = [q]
+        if sources:
+            sql += f" AND source IN ({','.join('?' * len(sources))})"
+            args += sources
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, (*args, k)).fetchall()
+            except sqlite3.OperationalError:         # 이상한 입력으로 MATCH 식이 깨지면 어휘 검색만 생략
+                return []
+        return [{"id": i, "source": s, "page": p, "content": c} for i, s, p, c in rows]
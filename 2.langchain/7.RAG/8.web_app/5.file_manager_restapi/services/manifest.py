@@ -0,0 +1,80 @@
+"""
+문서 매니페스트 — 벡터 DB 에 어떤 문서가 몇 청크로 들어있는지 기록하는 작은 SQLite 표.
+
+예전에는 목록/중복검사/삭제 때마다 Chroma 의 '모든 청크 메타데이터' 를 읽어 와서 센 뒤
+문서 목록을 만들었다(_distinct_sources) → 청크 수에 비례해서 느려짐.
+이제 문서 1건당 1행만 관리하므로 목록·중복검사는 문서 수에만 비례한다.
+
+  sources(source, chunks, pages, sha256, added_at, version)
+    · version : 같은 문서가 다시 들어올 때마다 +1 (답변 캐시 등 '문서가 바뀌었나' 판단용)
+
+vectorstore.py 의 add_pdf / delete_document 가 Chroma 반영 직후 여기를 갱신한다.
+처음 실행할 때 표가 비어 있고 Chroma 에는 문서가 있으면, 딱 한 번 메타데이터를 훑어 채운다.
+"""
+
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources(
+  source   TEXT PRIMARY KEY,
+  chunks   INTEGER NOT NULL,
+  pages    INTEGER,
+  sha256   TEXT,
+  added_at REAL,
+  version  INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+
+class Manifest:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()   # Flask 스레드 여러 개가 같은 연결을 쓰므로
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, chunks, pages, sha256, added_at, version FROM sources ORDER BY source").fetchall()
+        return [dict(zip(("source", "chunks", "pages", "sha256", "added_at", "version"), r)) for r in rows]
+
+    def get(self, source: str) -> dict | None:
+        with self._lock:
+            r = self._conn.execute(
+                "SELECT source, chunks, pages, sha256, added_at, version FROM sources WHERE source=?",
+                (source,)).fetchone()
+        return dict(zip(("source", "chunks", "pages", "sha256", "added_at", "version"), r)) if r else None
+
+    def clear_hash(self, source: str) -> None:
+        """sha256 을 비워 '반영 중' 으로 표시 — 중간에 실패하면 다음 업로드 때 같은 파일이어도 다시 처리된다."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sources SET sha256=NULL WHERE source=?", (source,))
+
+    def put(self, source: str, chunks: int, pages: int | None, sha256: str | None) -> int:
+        """추가/갱신 후 새 version 을 돌려준다."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sources(source, chunks, pages, sha256, added_at) VALUES(?,?,?,?,?) "
+                "ON CONFLICT(source) DO UPDATE SET chunks=excluded.chunks, pages=excluded.pages, "
+                "sha256=excluded.sha256, added_at=excluded.added_at, version=version+1",
+                (source, chunks, pages, sha256, time.time()))
+            return self._conn.execute("SELECT version FROM sources WHERE source=?", (source,)).fetchone()[0]
+
+    def delete(self, source: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM sources WHERE source=?", (source,)).rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+
+    def rebuild(self, counts: dict[str, int]) -> None:
+        """{source: 청크수} 로 표를 통째로 다시 채움(최초 1회 마이그레이션용)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sources")
+            self._conn.executemany("INSERT INTO sources(source, chunks, added_at) VALUES(?,?,?)",
+                                   [(s, c, now) for s, c in counts.items()])
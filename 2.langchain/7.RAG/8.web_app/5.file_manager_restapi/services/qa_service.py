@@ -4,15 +4,64 @@ QA 서비스 — 4.refactor_with_score 와 동일한 표준 LCEL 파이프라인
 
 차이점: 입력이 {question, sources} 인 dict 다. sources(선택 문서) 가 주어지면
 그 문서들 안에서만 검색한다(문서 선택 검색, app3_select.py 에서 사용).
+
+검색 단계(retrieve) = 하이브리드:
+  1) 벡터 검색(Chroma) 과 BM25 키워드 검색(services/lexical.py) 을 동시에 돌리고
+  2) 순위를 RRF(1 / (60 + 순위)) 로 합친 뒤
+  3) (선택) 로컬 cross-encoder 로 다시 줄 세우고(RERANK_MODEL, CPU)
+  4) 토큰 예산(CONTEXT_TOKENS) 안에서 위에서부터 청크를 담는다.
+  → 작은 k 에서도 정확한 청크가 올라오니 프롬프트가 짧아지고 LLM 응답도 빨라진다.
+
+거의 같은 질문이 다시 오면 services/answer_cache.py 의 의미 기반 캐시에서 바로 답한다
+(근거 문서의 매니페스트 version 이 그대로일 때만, 응답에 "cached": true).
+
+환경변수
+  RETRIEVE_K       벡터/BM25 각각 가져올 후보 수(기본 20)
+  FINAL_K          프롬프트에 넣을 최대 청크 수(기본 5)
+  CONTEXT_TOKENS   프롬프트에 넣을 문서 토큰 상한(기본 2000)
+  RERANK_MODEL     cross-encoder 이름(예: cross-encoder/ms-marco-MiniLM-L-6-v2, 기본 끔)
+                   sentence-transformers 가 설치돼 있어야 함
 """
 
 import os
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+from langchain_core.documents import Document
+
+from services import vectorstore
+from services.vectorstore import search_with_score, search_lexical, chunk_id, is_empty
+from services.answer_cache import AnswerCache
+
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _enc = None
+
+RETRIEVE_K     = int(os.getenv("RETRIEVE_K", "20"))
+FINAL_K        = int(os.getenv("FINAL_K", "5"))
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "2000"))
+RERANK_MODEL   = os.getenv("RERANK_MODEL", "").strip()
+RERANK_AVAILABLE = bool(RERANK_MODEL) and importlib.util.find_spec("sentence_transformers") is not None
+RRF_K = 60
 
-from services.vectorstore import search_with_score, is_empty
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieve")
+
+answer_cache = AnswerCache(
+    os.path.join(vectorstore.PERSIST_DIR, f"{vectorstore.COLLECTION_NAME}_answers.sqlite3"),
+    vectorstore.embeddings,
+)
+vectorstore.on_change.append(answer_cache.invalidate)     # 문서 삭제/재업로드 → 그 문서를 인용한 답 삭제
+
+
+def _version_of(source: str):
+    m = vectorstore.manifest.get(source)
+    return str(m["version"]) if m else None
 
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 prompt = ChatPromptTemplate.from_messages([
@@ -26,14 +75,63 @@ def format_docs(docs):
     return "\n\n".join(d.page_content for d in docs)
 
 
+def _count_tokens(text: str) -> int:
+    return len(_enc.encode(text)) if _enc else len(text) // 2     # tiktoken 없으면 대략(한글 ≈ 2자/토큰)
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def _rerank(question: str, docs: list) -> list:
+    """cross-encoder 점수 순으로 다시 정렬. 모델은 처음 쓸 때 1번만 로드(CPU)."""
+    global _reranker
+    if not RERANK_AVAILABLE or len(docs) < 2:
+        return docs
+    with _reranker_lock:
+        if _reranker is None:
+            from sentence_transformers import CrossEncoder
+            _reranker = CrossEncoder(RERANK_MODEL, device="cpu")
+        scores = _reranker.predict([(question, d.page_content) for d in docs])
+    return [d for _, d in sorted(zip(scores, docs), key=lambda x: -x[0])]
+
+
+def _pack(docs: list) -> list:
+    """토큰 예산 안에서 순위대로 담는다(최소 1개, 최대 FINAL_K 개)."""
+    packed, used = [], 0
+    for d in docs:
+        n = _count_tokens(d.page_content)
+        if packed and (used + n > CONTEXT_TOKENS or len(packed) >= FINAL_K):
+            break
+        packed.append(d)
+        used += n
+    return packed
+
+
 # 검색 단계(교재 4.2 retrieve_and_split 패턴): {"question", "sources"} → docs + context
-# sources 가 있으면 그 문서들 안에서만 검색. 유사도 점수는 metadata['score'] 에 부착.
+# sources 가 있으면 그 문서들 안에서만 검색. 벡터 유사도는 metadata['score'] 에 부착
+# (BM25 로만 찾은 청크는 None).
 def retrieve(inputs: dict):
-    docs = []
-    for doc, distance in search_with_score(inputs["question"], k=5, sources=inputs.get("sources")):
+    question, sources = inputs["question"], inputs.get("sources")
+    dense_f = _pool.submit(search_with_score, question, RETRIEVE_K, sources)
+    lexical_f = _pool.submit(search_lexical, question, RETRIEVE_K, sources)
+
+    fused: dict[str, float] = {}
+    by_id: dict[str, Document] = {}
+    for rank, (doc, distance) in enumerate(dense_f.result()):
         doc.metadata["score"] = round((1 - distance) * 100, 1)
-        docs.append(doc)
-    return {"question": inputs["question"], "docs": docs, "context": format_docs(docs)}
+        cid = chunk_id(doc)
+        by_id[cid] = doc
+        fused[cid] = fused.get(cid, 0) + 1 / (RRF_K + rank + 1)
+    for rank, hit in enumerate(lexical_f.result()):
+        if hit["id"] not in by_id:
+            by_id[hit["id"]] = Document(page_content=hit["content"],
+                                        metadata={"source": hit["source"], "page": hit["page"] or 0, "score": None})
+        fused[hit["id"]] = fused.get(hit["id"], 0) + 1 / (RRF_K + rank + 1)
+
+    ranked = [by_id[i] for i in sorted(fused, key=lambda i: -fused[i])]
+    docs = _pack(_rerank(question, ranked[:RETRIEVE_K]))
+    return {"question": question, "docs": docs, "context": format_docs(docs)}
 
 
 # 전체 체인: 검색 → answer 를 assign
@@ -48,6 +146,11 @@ def answer_question(question: str, sources: list[str] | None = None) -> dict:
     if is_empty():
         return {"answer": "먼저 PDF를 업로드해주세요.", "sources": []}
 
+    scope = "\n".join(sorted(sources or []))
+    hit, qvec = answer_cache.lookup(question, scope, _version_of)
+    if hit:
+        return {**hit, "cached": True}
+
     # 검색+LLM 단일 파이프라인 실행 → {question, docs, context, answer}
     result = rag_chain.invoke({"question": question, "sources": sources})
     docs = result["docs"]
@@ -58,4 +161,8 @@ def answer_question(question: str, sources: list[str] | None = None) -> dict:
         "score": doc.metadata["score"],
     } for doc in docs]
 
-    return {"answer": result["answer"], "sources": out_sources}
+    out = {"answer": result["answer"], "sources": out_sources}
+    cited = {s: _version_of(s) for s in {doc.metadata.get("source") for doc in docs}}
+    if cited and all(v is not None for v in cited.values()):   # 근거 없는 답은 무효화할 길이 없으니 저장 안 함
+        answer_cache.store(question, qvec, scope, out, cited)
+    return out
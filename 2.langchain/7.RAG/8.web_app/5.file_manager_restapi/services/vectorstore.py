@@ -5,21 +5,49 @@ REST API 버전이라 화면 로직은 없지만, 서비스 계층(add/list/dele
   ※ app.py(1단계)        : add_pdf / list_documents
     app2_delete.py(2단계) : + delete_document
     app3_select.py(3단계) : + search_with_score(sources=...) 로 문서 선택 검색
+
+문서 목록/중복검사는 services/manifest.py 의 매니페스트(문서당 1행)로 한다.
+청크를 넣고/지울 때 services/lexical.py 의 BM25(FTS5) 인덱스에도 같이 반영한다(하이브리드 검색용).
+
+청크 ID = "정규화한 청크 텍스트의 sha256 @ 파일명" (내용 주소):
+  · 같은 파일을 고쳐서 다시 올리면 ID 가 그대로인 청크는 건너뛰고, 새/바뀐 청크만 임베딩,
+    더 이상 없는 청크는 삭제 → 500쪽 매뉴얼에서 1쪽 고치면 임베딩도 1쪽 분량.
+  · 다른 이름으로 같은 내용을 올리면 metadata.chunk_hash 로 기존 벡터를 찾아 그대로 복사(API 호출 0).
+
+임베딩 API 호출은 EMBED_BATCH 개씩 나눠 EMBED_WORKERS 개 스레드로 동시에 보내고,
+실패(429/일시 오류)하면 지수 백오프로 EMBED_RETRIES 번까지 다시 시도한다.
 """
 
 import os
+import sys
+import time
+import uuid
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 
+from services.manifest import Manifest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # 8.web_app
+from shared.embedding_cache import cached     # #4/#5 공유 모듈 (8.web_app/shared/)
+from services.lexical import LexicalIndex
+
 DATA_DIR        = "../DATA"         # 1~5 공유 (= 8.web_app/DATA)
 PERSIST_DIR     = "../chroma_db"    # 벡터 DB 도 8.web_app 안에서 공유
 COLLECTION_NAME = "rag_api"        # 같은 chroma_db 안에서 컬렉션만 분리(rag_web 과 별개)
 
+EMBED_BATCH   = int(os.getenv("EMBED_BATCH", "100"))    # 임베딩 API 1회 호출당 청크 수
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))    # 동시에 보내는 배치 수
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "5"))
+
 os.makedirs(DATA_DIR, exist_ok=True)
+os.makedirs(PERSIST_DIR, exist_ok=True)
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings = cached(OpenAIEmbeddings(model="text-embedding-3-small"))   # 디스크 임베딩 캐시 경유
 store = Chroma(
     collection_name=COLLECTION_NAME,
     embedding_function=embeddings,
@@ -27,8 +55,12 @@ store = Chroma(
 )
 
 
+manifest = Manifest(os.path.join(PERSIST_DIR, f"{COLLECTION_NAME}_manifest.sqlite3"))
+
+
 def _distinct_sources() -> dict:
-    """벡터 DB 안의 문서별 청크 수를 {파일명: 청크수} 로 집계."""
+    """벡터 DB 안의 문서별 청크 수를 {파일명: 청크수} 로 집계 — 모든 청크 메타데이터를 읽으므로
+    매니페스트를 처음 만들 때(아래 1회)만 쓴다."""
     data = store._collection.get(include=["metadatas"])
     counts: dict[str, int] = {}
     for m in data.get("metadatas", []):
@@ -37,33 +69,179 @@ def _distinct_sources() -> dict:
     return counts
 
 
+lexical = LexicalIndex(os.path.join(PERSIST_DIR, f"{COLLECTION_NAME}_bm25.sqlite3"))
+
+# 매니페스트 도입 전에 쌓인 벡터 DB 라면 한 번만 훑어서 채운다
+if manifest.count() == 0 and store._collection.count() > 0:
+    manifest.rebuild(_distinct_sources())
+
+# BM25 인덱스도 마찬가지 — 비어 있으면 Chroma 의 청크 본문을 한 번만 옮겨 담는다
+if lexical.count() == 0 and store._collection.count() > 0:
+    _all = store._collection.get(include=["documents", "metadatas"])
+    lexical.upsert(_all["ids"], _all["documents"], [m or {} for m in _all["metadatas"]])
+    del _all
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# 문서가 새로 반영되거나(재업로드 포함) 삭제될 때 불리는 콜백 f(source)
+# — qa_service 의 답변 캐시가 그 문서를 인용한 답을 지우는 데 쓴다.
+on_change: list = []
+
+
+def _changed(source: str) -> None:
+    for f in on_change:
+        f(source)
+
+
+def _normalize(text: str) -> str:
+    """공백/줄바꿈 차이만 있는 청크는 같은 청크로 본다."""
+    return " ".join(text.split())
+
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    for attempt in range(EMBED_RETRIES):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception:
+            if attempt == EMBED_RETRIES - 1:
+                raise
+            time.sleep(min(30, 2 ** attempt) + random.random())   # 1, 2, 4, 8… 초 + 지터
+
+
+def _embed_concurrent(texts: list[str]) -> list[list[float]]:
+    """배치로 나눠 동시에 임베딩(순서 유지)."""
+    batches = [texts[i:i + EMBED_BATCH] for i in range(0, len(texts), EMBED_BATCH)]
+    if len(batches) <= 1:
+        return _embed_batch(texts) if texts else []
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as ex:
+        return [v for vecs in ex.map(_embed_batch, batches) for v in vecs]
+
+
+_source_locks: dict[str, threading.Lock] = {}
+_source_locks_guard = threading.Lock()
+
+
+def _source_lock(source: str) -> threading.Lock:
+    """같은 파일을 두 작업이 동시에 반영하지 않도록 파일명별 잠금."""
+    with _source_locks_guard:
+        return _source_locks.setdefault(source, threading.Lock())
+
+
 def list_documents() -> list[dict]:
-    """벡터 DB 에 들어있는 문서 목록 (파일명 + 청크 수)."""
-    return [{"source": s, "chunks": c}
-            for s, c in sorted(_distinct_sources().items())]
+    """벡터 DB 에 들어있는 문서 목록 (파일명 + 청크 수 + 페이지 수 + 추가 시각)."""
+    return [{"source": m["source"], "chunks": m["chunks"], "pages": m["pages"], "added_at": m["added_at"]}
+            for m in manifest.all()]
 
 
-def add_pdf(file_path: str) -> dict:
-    """PDF 를 청킹해서 벡터 DB 에 추가. 이미 있는 문서면 건너뜀."""
+def staging_path(file_path: str) -> str:
+    """업로드를 일단 받아 둘 임시 경로 — add_pdf(file_path, staged=...) 가 문서 락 안에서 제자리로 옮긴다.
+    (바로 file_path 에 저장하면 같은 이름의 이전 작업이 아직 파싱 중인 PDF 를 덮어쓴다)"""
+    return f"{file_path}.{uuid.uuid4().hex[:8]}.upload"
+
+
+def add_pdf(file_path: str, on_status=None, staged: str | None = None) -> dict:
+    """PDF 를 청킹해서 벡터 DB 에 추가/갱신. 내용이 그대로인 문서면 건너뜀.
+
+    같은 이름의 바뀐 파일이면 바뀐 청크만 다시 임베딩하고 사라진 청크는 지운다.
+    on_status("parsing" | "embedding") 로 진행 단계를 알린다(services/jobs.py 가 사용).
+    staged: staging_path() 로 받은 업로드 파일 — 락을 잡은 뒤 file_path 로 이름을 바꾸고 처리.
+    돌려주는 값: {source, added, embedded(새로 임베딩), reused(다른 문서 벡터 복사), deleted}
+    """
     source = os.path.basename(file_path)
-    if source in _distinct_sources():
+    with _source_lock(source):
+        if staged:
+            os.replace(staged, file_path)
+        return _add_pdf(file_path, source, on_status or (lambda status: None))
+
+
+def _add_pdf(file_path: str, source: str, on_status) -> dict:
+    sha = _file_sha256(file_path)
+    prev = manifest.get(source)
+    if prev and prev["sha256"] == sha:
         return {"source": source, "added": False}
 
+    on_status("parsing")
     docs = PyPDFLoader(file_path).load()
     for d in docs:
         d.metadata["source"] = source
     chunks = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100).split_documents(docs)
-    store.add_documents(chunks)
-    return {"source": source, "added": True}
+    on_status("embedding")
+
+    # 청크 ID 계산 — 한 문서 안에서 같은 내용(반복 머리말 등)은 첫 번째 것 하나만
+    wanted: dict[str, tuple[str, object]] = {}
+    for c in chunks:
+        h = _chunk_hash(c.page_content)
+        c.metadata["chunk_hash"] = h
+        wanted.setdefault(f"{h}@{source}", (h, c))
+
+    # Chroma/FTS 를 건드리기 전에 해시를 비워 둔다 — 아래에서 실패하면 같은 파일을 다시 올려도 건너뛰지 않음.
+    # 매니페스트는 모든 반영이 끝난 뒤 맨 마지막에 쓴다.
+    if prev:
+        manifest.clear_hash(source)
+
+    have = set(store._collection.get(where={"source": source}, include=[])["ids"])
+    stale = list(have - wanted.keys())
+    kept = [i for i in wanted if i in have]
+    new = [i for i in wanted if i not in have]
+
+    # 남는 청크는 페이지 번호만 바뀌었을 수 있으니 메타데이터만 갱신(임베딩 없음)
+    if kept:
+        store._collection.update(ids=kept, metadatas=[wanted[i][1].metadata for i in kept])
+        lexical.update_pages(kept, [wanted[i][1].metadata for i in kept])
+
+    # 새 청크: 같은 내용의 벡터가 이미 (다른 문서에) 있으면 재사용, 없으면 그것만 임베딩
+    reused: dict[str, list[float]] = {}
+    missing: list[str] = []
+    if new:
+        got = store._collection.get(where={"chunk_hash": {"$in": list({wanted[i][0] for i in new})}},
+                                    include=["embeddings", "metadatas"])
+        for m, e in zip(got["metadatas"], got["embeddings"]):
+            reused[m["chunk_hash"]] = list(e)
+        missing = [i for i in new if wanted[i][0] not in reused]
+        if missing:
+            vecs = _embed_concurrent([wanted[i][1].page_content for i in missing])
+            for i, v in zip(missing, vecs):
+                reused.setdefault(wanted[i][0], v)
+        store._collection.upsert(
+            ids=new,
+            embeddings=[reused[wanted[i][0]] for i in new],
+            documents=[wanted[i][1].page_content for i in new],
+            metadatas=[wanted[i][1].metadata for i in new],
+        )
+        lexical.upsert(new, [wanted[i][1].page_content for i in new], [wanted[i][1].metadata for i in new])
+
+    if stale:
+        store._collection.delete(ids=stale)
+        lexical.delete_ids(stale)
+    manifest.put(source, len(wanted), len(docs), sha)
+    _changed(source)
+    return {"source": source, "added": True, "embedded": len(missing),
+            "reused": len(new) - len(missing), "deleted": len(stale)}
 
 
 def delete_document(source: str) -> bool:
     """문서 1건 삭제 — 해당 source 의 벡터 청크 제거 (원본 PDF 는 보존).
 
     원본까지 지우려면 아래 주석 해제.
+    같은 문서의 add_pdf 작업과 겹치지 않게 문서 락 안에서 지운다(진행 중인 작업이 끝난 뒤 삭제).
     """
-    existed = source in _distinct_sources()
-    store._collection.delete(where={"source": source})
+    with _source_lock(source):
+        existed = manifest.get(source) is not None
+        store._collection.delete(where={"source": source})
+        lexical.delete_source(source)
+        manifest.delete(source)
+        _changed(source)
 
     # path = os.path.join(DATA_DIR, source)
     # if os.path.exists(path):
@@ -81,3 +259,13 @@ def search_with_score(question: str, k: int = 5, sources: list[str] | None = Non
     None/빈 리스트면 전체 문서 대상. → app3_select.py(3단계) 에서 사용."""
     where = {"source": {"$in": sources}} if sources else None
     return store.similarity_search_with_score(question, k=k, filter=where)
+
+
+def search_lexical(question: str, k: int = 20, sources: list[str] | None = None) -> list[dict]:
+    """BM25(키워드) 검색 — [{id, source, page, content}] 가까운 순."""
+    return lexical.search(question, k=k, sources=sources)
+
+
+def chunk_id(doc) -> str:
+    """검색 결과 Document 의 청크 ID (BM25 결과와 같은 청크인지 맞춰 보는 데 사용)."""
+    return doc.id or f"{doc.metadata.get('chunk_hash')}@{doc.metadata.get('source')}"
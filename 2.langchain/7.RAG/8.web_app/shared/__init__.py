@@ -0,0 +1,6 @@
+"""shared 패키지 — 8.web_app 의 여러 앱(#4, #5)이 같이 쓰는 모듈.
+
+  embedding_cache : 디스크 임베딩 캐시 (앱들이 ../DATA, ../chroma_db 를 공유하듯 이 코드도 공유)
+
+각 앱의 services/vectorstore.py 가 8.web_app 을 sys.path 에 넣고 import 한다.
+"""
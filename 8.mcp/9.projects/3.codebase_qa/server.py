@@ -11,7 +11,8 @@
 
 준비:
   pip install mcp langchain-openai langchain-text-splitters python-dotenv
-  .env 에 OPENAI_API_KEY  (서버 시작 시 임베딩을 만든다)
+  .env 에 OPENAI_API_KEY  (서버 시작 시 임베딩을 만든다 — 바뀌지 않은 청크는 embedding_cache.py 의
+                          디스크 캐시에서 꺼내므로, 재시작해도 API 를 다시 부르지 않는다)
 
 단독 점검:
   pip install "mcp[cli]"
@@ -30,6 +31,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document       # (구) langchain_community.TextLoader 대신 — sunset 의존성 제거
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from embedding_cache import cached
+
 load_dotenv()
 
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -38,7 +41,7 @@ DATA_DIR = os.path.join(HERE, "data")
 mcp = FastMCP("codebase-qa")
 
 
-# ─── 인덱싱 (서버 시작 시 1회) ──────────────────────────────
+# ─── 인덱싱 (서버 시작 시 1회, 임베딩은 캐시 경유) ─────────────
 def _build_index():
     docs = []
     for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.md"))):
@@ -48,7 +51,7 @@ def _build_index():
         chunk_size=500, chunk_overlap=100
     ).split_documents(docs)
     store = InMemoryVectorStore.from_documents(
-        chunks, OpenAIEmbeddings(model="text-embedding-3-small")
+        chunks, cached(OpenAIEmbeddings(model="text-embedding-3-small"))
     )
     return store, chunks
 
@@ -29,6 +29,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document       # (구) langchain_community.TextLoader 대신 — sunset 의존성 제거
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from embedding_cache import cached
+
 load_dotenv()
 
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -44,7 +46,7 @@ SKIP = {".venv", "venv", "node_modules", "__pycache__", "site-packages", ".git",
 
 mcp = FastMCP("codebase-qa-docs")
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings = cached(OpenAIEmbeddings(model="text-embedding-3-small"))   # chroma_db 를 지우고 재인덱싱해도 API 재호출 없음
 store = Chroma(
     collection_name=COLLECTION,
     embedding_function=embeddings,